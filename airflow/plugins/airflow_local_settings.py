@@ -0,0 +1,10 @@
+"""Cluster policy applied by Airflow to every task when dags are loaded.
+
+The plugins folder is on the python path of Airflow, so this module is picked up as airflow_local_settings.
+"""
+from job_status_events import add_job_status_callbacks
+
+
+def policy(task) -> None:
+    """Publish state changes of the dag runs of all jobs to the openEO jobs service."""
+    add_job_status_callbacks(task)
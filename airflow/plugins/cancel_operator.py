@@ -6,6 +6,8 @@ from airflow.plugins_manager import AirflowPlugin
 from airflow.sensors.base_sensor_operator import BaseSensorOperator
 from airflow.utils.decorators import apply_defaults
 
+from job_stop_signals import StopSignalListener
+
 
 class CancelOp(BaseSensorOperator):
     """
@@ -13,15 +15,29 @@ class CancelOp(BaseSensorOperator):
 
     This is currently the only option in Airflow to stop a running task via code.
     see: https://stackoverflow.com/questions/49039386/how-do-i-stop-an-airflow-dag
+
+    The sensor mode is set with the environment variable OEO_CANCEL_SENSOR_MODE:
+    - poke (default): the sensor keeps its slot and additionally waits for the stop requests the jobs service publishes
+      on the RabbitMQ, so a job is stopped within a second.
+    - reschedule: the sensor frees its slot between two pokes and only checks the stop file every poke_interval.
     """
 
     @apply_defaults
     def __init__(self, stop_file: str, *args, **kwargs):
-        # TODO check if poke interval is feasible for bigger setup
-        super().__init__(mode='poke', poke_interval=5, *args, **kwargs)
+        mode = os.environ.get("OEO_CANCEL_SENSOR_MODE", "poke")
+        # In poke mode most of the poke interval is spent waiting for a stop request
+        poke_interval = 1 if mode == "poke" else 5
+        super().__init__(mode=mode, poke_interval=poke_interval, *args, **kwargs)
         self.stop_file = stop_file
+        self.signal_wait = 4
+        self._stop_listener = None
 
     def poke(self, context):
+        # Check if dag should be stopped
+        self.log.info('Poking for file')
+        if os.path.isfile(self.stop_file):
+            return True
+
         # Check if sensor and following worker are the last running tasks
         # happens if dag succeeds or fails (without being stopped manually)
         active_tasks = context['dag_run'].get_task_instances(
@@ -29,9 +45,20 @@ class CancelOp(BaseSensorOperator):
         if len(active_tasks) == 2:
             return True
 
-        # Check if dag should be stopped
-        self.log.info('Poking for file')
-        return os.path.isfile(self.stop_file)
+        if self.reschedule:
+            return False
+        if self._stop_listener is None:
+            self._stop_listener = StopSignalListener(context['dag_run'].dag_id)
+        # The stop file is written before the stop request is published
+        return self._stop_listener.wait(self.signal_wait) or os.path.isfile(self.stop_file)
+
+    def execute(self, context):
+        try:
+            super().execute(context)
+        finally:
+            if self._stop_listener is not None:
+                self._stop_listener.close()
+                self._stop_listener = None
 
 
 def flag_running_tasks_as_failed(dag: DAG, **kwargs) -> None:
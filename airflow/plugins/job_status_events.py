@@ -0,0 +1,87 @@
+"""Publishes state changes of dag runs to the RabbitMQ of the openEO services (see airflow_local_settings)."""
+import logging
+import os
+from datetime import timezone
+from typing import Callable, Optional
+
+from kombu import Connection, Exchange
+
+LOGGER = logging.getLogger(__name__)
+
+EVENT_SOURCE = "airflow"
+"""Name of the (nameko) service the events are dispatched from - the jobs service listens to it."""
+EVENT_TYPE = "dag_state_changed"
+"""Event type of a changed dag run state."""
+EXECUTION_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+"""Format of the execution date (UTC) sent with an event."""
+
+
+def get_amqp_uri() -> Optional[str]:
+    """Return the url of the RabbitMQ of the openEO services or None if it is not configured."""
+    if not os.environ.get("OEO_RABBIT_HOST"):
+        return None
+    return f"pyamqp://{os.environ.get('OEO_RABBIT_USER')}:{os.environ.get('OEO_RABBIT_PASSWORD')}" \
+           f"@{os.environ.get('OEO_RABBIT_HOST')}:{os.environ.get('OEO_RABBIT_PORT', 5672)}"
+
+
+def publish_dag_state(dag_id: str, state: str, execution_date) -> None:
+    """Publish the state of a dag run as nameko event.
+
+    The event is published to the same exchange a nameko EventDispatcher of a service called 'airflow' would use.
+    Errors are only logged, so a missing RabbitMQ never fails a task.
+
+    Arguments:
+        dag_id {str} -- Id of the dag
+        state {str} -- State of the dag run (running, success or failed)
+        execution_date {datetime} -- Execution date of the dag run
+    """
+    amqp_uri = get_amqp_uri()
+    if not amqp_uri:
+        return
+    payload = {
+        "dag_id": dag_id,
+        "state": state,
+        "execution_date": execution_date.astimezone(timezone.utc).strftime(EXECUTION_DATE_FORMAT),
+    }
+    exchange = Exchange(f"{EVENT_SOURCE}.events", type="topic", durable=True, auto_delete=False)
+    try:
+        with Connection(amqp_uri) as connection:
+            producer = connection.Producer(serializer="json")
+            producer.publish(payload, exchange=exchange, routing_key=EVENT_TYPE, declare=[exchange],
+                             delivery_mode=2, retry=True, retry_policy={"max_retries": 3})
+    except Exception:
+        LOGGER.exception(f"Could not publish state {state} of dag {dag_id}")
+
+
+def dag_state_callback(state: str, callback: Optional[Callable] = None) -> Callable:
+    """Return a callback publishing the given state of the dag run in the context before calling callback.
+
+    Arguments:
+        state {str} -- State of the dag run to publish
+        callback {Callable} -- Callback which was set before and is called afterwards (optional)
+    """
+    def publish(context) -> None:
+        dag_run = context["dag_run"]
+        publish_dag_state(dag_run.dag_id, state, dag_run.execution_date)
+        if callback:
+            callback(context)
+
+    # Mark the callback so it is not wrapped again if the policy is applied twice
+    publish.publishes_dag_state = True
+    return publish
+
+
+def add_job_status_callbacks(task) -> None:
+    """Add callbacks publishing the dag run state to a task and its dag.
+
+    The dag callbacks publish the final state (success / failed) of the dag run, each finished task publishes that the
+    dag run is running.
+    """
+    if not getattr(task.on_success_callback, "publishes_dag_state", False):
+        task.on_success_callback = dag_state_callback("running", task.on_success_callback)
+    dag = task.dag
+    if dag is not None:
+        if not getattr(dag.on_success_callback, "publishes_dag_state", False):
+            dag.on_success_callback = dag_state_callback("success", dag.on_success_callback)
+        if not getattr(dag.on_failure_callback, "publishes_dag_state", False):
+            dag.on_failure_callback = dag_state_callback("failed", dag.on_failure_callback)
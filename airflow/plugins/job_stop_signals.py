@@ -0,0 +1,71 @@
+"""Receives the stop requests the jobs service publishes when a job is canceled or deleted (see cancel_operator)."""
+import logging
+from typing import Optional
+
+from kombu import Connection, Exchange, Queue
+
+from job_status_events import get_amqp_uri
+
+LOGGER = logging.getLogger(__name__)
+
+EVENT_SOURCE = "jobs"
+"""Name of the (nameko) service dispatching the stop requests."""
+EVENT_TYPE = "job_stop_requested"
+"""Event type of a stop request, its payload contains the 'job_id' and the 'dag_ids' of the job."""
+
+
+class StopSignalListener:
+    """Listens for stop requests of a dag on an exclusive queue bound to the event exchange of the jobs service.
+
+    The queue exists as long as the listener is open, so requests published in between two waits are not lost. A
+    request published before the listener was opened is missed - the stop file is always checked as well.
+    """
+
+    def __init__(self, dag_id: str) -> None:
+        """Initialise StopSignalListener."""
+        self.dag_id = dag_id
+        self._connection: Optional[Connection] = None
+        self._queue = None
+
+    def wait(self, timeout: float) -> bool:
+        """Wait up to timeout seconds for a stop request of the dag and return whether one was received.
+
+        If the RabbitMQ is not configured or not reachable False is returned after waiting at most timeout seconds.
+        """
+        try:
+            if self._queue is None:
+                self._open()
+            if self._queue is None:
+                return False
+            try:
+                message = self._queue.get(block=True, timeout=timeout)
+            except self._queue.Empty:
+                return False
+            message.ack()
+            return self.dag_id in message.payload.get("dag_ids", [])
+        except Exception:
+            LOGGER.exception(f"Could not receive stop requests of dag {self.dag_id}")
+            self.close()
+            return False
+
+    def close(self) -> None:
+        """Delete the queue and close the connection to the RabbitMQ."""
+        try:
+            if self._queue is not None:
+                self._queue.close()
+            if self._connection is not None:
+                self._connection.release()
+        except Exception:
+            LOGGER.exception(f"Could not close the stop request listener of dag {self.dag_id}")
+        finally:
+            self._queue = None
+            self._connection = None
+
+    def _open(self) -> None:
+        amqp_uri = get_amqp_uri()
+        if not amqp_uri:
+            return
+        exchange = Exchange(f"{EVENT_SOURCE}.events", type="topic", durable=True, auto_delete=False)
+        queue = Queue(name="", exchange=exchange, routing_key=EVENT_TYPE, exclusive=True, auto_delete=True)
+        self._connection = Connection(amqp_uri)
+        self._queue = self._connection.SimpleQueue(queue)
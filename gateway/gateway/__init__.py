@@ -19,6 +19,8 @@ established.
 .. _OpenEO API: https://open-eo.github.io/openeo-api
 """
 
+from functools import partial
+
 from dynaconf import settings
 
 from .dependencies.auth import AuthRequirement as AuthReq
@@ -90,12 +92,12 @@ if settings.ENV_FOR_DYNACONF not in ["documentation"]:
         # EO Data Discovery
         gateway.add_endpoint(
             f"/{settings.OPENEO_VERSION}/collections",
-            func=rpc.data.get_all_products,
+            func=partial(rpc.data.get_all_products, serialized=True),
             validate=True,
         )
         gateway.add_endpoint(
             f"/{settings.OPENEO_VERSION}/collections/<collection_id>",
-            func=rpc.data.get_product_detail,
+            func=partial(rpc.data.get_product_detail, serialized=True),
             validate=True,
         )
         gateway.add_endpoint(
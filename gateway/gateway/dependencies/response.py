@@ -1,12 +1,18 @@
 """Provide ResponseParser and APIException."""
+import gzip
 import logging
+from base64 import b64decode
 from typing import Union
+from urllib.parse import urljoin, urlparse
 from uuid import uuid4
 
 from flask import jsonify, make_response, redirect, request, send_file
 from flask.wrappers import Response
 from werkzeug.wrappers import Response as WerkzeugResponse
 
+PAGINATION_RELATIONS = ("next", "prev", "first", "last")
+"""Relation types of the openEO pagination links."""
+
 
 class APIException(Exception):
     """Returned if an Exception is raised in the gateway or one of the services.
@@ -96,8 +102,53 @@ class ResponseParser:
         Returns:
             The Response object.
         """
+        if isinstance(data, dict) and isinstance(data.get("links"), list):
+            data["links"] = [self._resolve_link(link) for link in data["links"]]
         return make_response(jsonify(data), code)
 
+    def _resolve_link(self, link: dict) -> dict:
+        """Resolve the relative href of a pagination link against the url of the current request.
+
+        Services do not know the public url of the API and return e.g. 'jobs?limit=10&cursor=...' for the next page.
+
+        Args:
+            link: The link object.
+
+        Returns:
+            The link with an absolute href.
+        """
+        if isinstance(link, dict) and link.get("rel") in PAGINATION_RELATIONS and "href" in link \
+                and not urlparse(link["href"]).scheme:
+            link = {**link, "href": urljoin(request.base_url, link["href"])}
+        return link
+
+    def _serialized(self, code: int, serialized: dict) -> Response:
+        """Return a JSON response which was already serialized by a service.
+
+        The body is sent as it is if the client accepts its encoding, otherwise it is decoded first. The ETag of the
+        content is set and conditional requests (If-None-Match) are answered with 304 Not Modified.
+
+        Args:
+            code: The HTTP code.
+            serialized: A dictionary with the base64 encoded 'body', its 'encoding' and the 'etag' of the content.
+
+        Returns:
+            The Response object.
+        """
+        body = b64decode(serialized["body"])
+        encoding = serialized.get("encoding")
+        if encoding and encoding not in request.accept_encodings:
+            body = gzip.decompress(body)
+            encoding = None
+
+        response = make_response(body, code)
+        response.mimetype = "application/json"
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.set_etag(serialized["etag"], weak=True)
+        return response.make_conditional(request)
+
     def _html(self, file_name: str) -> Response:
         """Return a HTML page back to the user.
 
@@ -137,6 +188,8 @@ class ResponseParser:
             response = self._string(payload["code"], payload["msg"])
         elif "data" in payload:
             response = self._data(payload["code"], payload["data"])
+        elif "serialized" in payload:
+            response = self._serialized(payload["code"], payload["serialized"])
         elif "file" in payload:
             response = self._file(payload["file"])
         else:
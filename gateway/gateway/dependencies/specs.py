@@ -254,7 +254,7 @@ class OpenAPISpecParser:
                 if not has_params:
                     return f(user=user)
 
-                parameters = get_parameters()
+                parameters = self._cast_query_parameters(get_parameters(), specs)
                 # TODO validation
                 return f(user=user, **parameters)
             except Exception as exc:
@@ -262,6 +262,46 @@ class OpenAPISpecParser:
 
         return decorator
 
+    @staticmethod
+    def _cast_query_parameters(parameters: dict, params_specs: dict) -> dict:
+        """Cast query parameters to the type given in their specification.
+
+        Query parameters are always passed as strings, e.g. the pagination 'limit' has to be an integer.
+
+        Args:
+            parameters: The provided parameters.
+            params_specs: The parameter specifications by parameter name.
+
+        Raises:
+            :class:`~gateway.dependencies.APIException`: if a parameter cannot be cast or is below its minimum.
+        """
+        casts: Dict[str, Callable] = {
+            "integer": int,
+            "number": float,
+            "boolean": lambda value: {"true": True, "false": False}[value.lower()],
+        }
+        for name in request.args.keys():
+            schema = params_specs.get(name, {})
+            cast = casts.get(schema.get("type"))
+            if cast is None:
+                continue
+            try:
+                value = cast(parameters[name])
+            except (KeyError, ValueError) as err:
+                raise APIException(
+                    msg=f"The query parameter '{name}' must be of type {schema['type']}.",
+                    code=400,
+                    service="gateway",
+                    internal=False) from err
+            if "minimum" in schema and value < schema["minimum"]:
+                raise APIException(
+                    msg=f"The query parameter '{name}' must be at least {schema['minimum']}.",
+                    code=400,
+                    service="gateway",
+                    internal=False)
+            parameters[name] = value
+        return parameters
+
     def _parse_specs(self) -> None:
         """Load the OpenAPI specifications from the YAML file and resolve all references in the document.
 
@@ -1,17 +1,135 @@
-"""Provides caching functions."""
+"""Provides caching functions.
 
+Records are cached on disk in a compact binary format: A fixed size header holding a magic number, the schema version
+and the time the file was written followed by the zstd compressed msgpack encoded records. Files are always written
+to a temporary file first and then atomically renamed, so readers never see partially written files.
+"""
+
+import gzip
 import logging
+from base64 import b64encode
+from hashlib import sha256
 from json import dumps, loads
-from os import path
-from typing import List
+from os import fdopen, fsync, path, remove, replace
+from struct import Struct
+from tempfile import mkstemp
+from threading import Lock
+from time import monotonic, time
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
 
+import msgpack
+import zstandard
 from dynaconf import settings
 
 LOGGER = logging.getLogger("standardlog")
 
+CACHE_EXTENSION = ".cache"
+"""File extension of cache files in the binary format."""
+CACHE_SCHEMA_VERSION = 1
+"""Version of the binary cache format. Files with a different version are ignored."""
+_CACHE_MAGIC = b"OEOC"
+_CACHE_HEADER = Struct("!4sHd")
+"""Layout of the header: magic number, schema version, written at (seconds since the epoch)."""
+
+
+class CacheHeader(NamedTuple):
+    """Information stored in the header of a cache file."""
+
+    schema_version: int
+    """Version of the format of the cache file."""
+    written_at: float
+    """Time the cache file was written in seconds since the epoch."""
+
+
+class MemoryCache:
+    """Process-wide in-memory cache holding already parsed objects for a limited time.
+
+    Parsed collections are keyed by the path of the on-disk cache file they were loaded from, serialized responses
+    by a key prefixed with 'response:'. Once an entry is older than the configured time to live it is dropped and the
+    next access has to reload it from disk.
+
+    Attributes:
+        ttl: Time to live of a single entry in seconds. If not set the setting `COLLECTION_CACHE_TTL` is used.
+    """
+
+    def __init__(self, ttl: Optional[float] = None) -> None:
+        """Initialise MemoryCache."""
+        self._ttl = ttl
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._lock = Lock()
+
+    @property
+    def ttl(self) -> float:
+        """Return the time to live of a single entry in seconds."""
+        if self._ttl is not None:
+            return self._ttl
+        return float(settings.get("COLLECTION_CACHE_TTL", 300))
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached object or None if it is not cached or expired.
+
+        Args:
+            key: The key of the cached object.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, value = entry
+            if monotonic() - created_at > self.ttl:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store an object in the cache.
+
+        Args:
+            key: The key of the object.
+            value: The object to cache.
+        """
+        with self._lock:
+            self._entries[key] = (monotonic(), value)
+
+    def invalidate(self, key: str = None) -> None:
+        """Remove a single entry or - if no key is given - all entries from the cache.
+
+        Args:
+            key: The key of the entry to remove.
+        """
+        with self._lock:
+            if key is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(key, None)
+
 
-def cache_json(records: list, path_to_cache: str) -> None:
-    """Store records to a json file for caching.
+memory_cache = MemoryCache()
+"""Shared in-memory cache of parsed collections used by all handlers of a process."""
+
+
+def serialize_response(data: Any) -> Dict[str, str]:
+    """Serialize a response once so it can be sent to clients without dumping it again.
+
+    The JSON body is gzip compressed and base64 encoded to be transferable via RPC. The ETag is a hash of the
+    uncompressed body and therefore only changes if the content changes.
+
+    Args:
+        data: The JSON serializable response data.
+
+    Returns:
+        A dictionary with the encoded 'body', its 'encoding' and the 'etag' of the content.
+    """
+    body = dumps(data, separators=(",", ":")).encode("utf-8")
+    return {
+        "body": b64encode(gzip.compress(body)).decode("ascii"),
+        "encoding": "gzip",
+        "etag": sha256(body).hexdigest(),
+    }
+
+
+def write_cache(records: list, path_to_cache: str) -> None:
+    """Store records atomically to a cache file.
 
     Args:
         records: List of fetched records.
@@ -21,13 +139,108 @@ def cache_json(records: list, path_to_cache: str) -> None:
     if not records:
         return
 
-    json_dump = dumps(records)
-    with open(path_to_cache, "w") as f:
-        f.write(json_dump)
+    header = _CACHE_HEADER.pack(_CACHE_MAGIC, CACHE_SCHEMA_VERSION, time())
+    payload = zstandard.ZstdCompressor().compress(msgpack.packb(records, use_bin_type=True))
+    fd, tmp_path = mkstemp(dir=path.dirname(path_to_cache), prefix=".", suffix=".tmp")
+    try:
+        with fdopen(fd, "wb") as f:
+            f.write(header)
+            f.write(payload)
+            f.flush()
+            fsync(f.fileno())
+        replace(tmp_path, path_to_cache)
+    except BaseException:
+        remove(tmp_path)
+        raise
+
+
+def read_cache_header(path_to_cache: str) -> Optional[CacheHeader]:
+    """Return the header of a cache file or None if the file does not exist or is not in the binary format.
+
+    Args:
+        path_to_cache: The path to the cached file.
+    """
+    try:
+        with open(path_to_cache, "rb") as f:
+            return read_cache_header_bytes(f.read(_CACHE_HEADER.size))
+    except FileNotFoundError:
+        return None
+
+
+def read_cache_header_bytes(data: bytes) -> Optional[CacheHeader]:
+    """Return the header from the beginning of the content of a cache file or None if it is not in the binary format.
+
+    Args:
+        data: The content of a cache file, at least its first bytes.
+    """
+    if len(data) < _CACHE_HEADER.size:
+        return None
+    magic, schema_version, written_at = _CACHE_HEADER.unpack_from(data)
+    if magic != _CACHE_MAGIC:
+        return None
+    return CacheHeader(schema_version=schema_version, written_at=written_at)
+
+
+def get_cache(path_to_cache: str) -> List[dict]:
+    """Fetch the item(s) from a cache file.
+
+    If the cache file does not exist a legacy json cache file with the same name is read instead.
+
+    Args:
+        path_to_cache: The path to the cached file.
+
+    Returns:
+        List of dictionaries containing cached data
+    """
+    LOGGER.debug("Getting cache %s", path_to_cache)
+    try:
+        with open(path_to_cache, "rb") as f:
+            data = f.read()
+    except FileNotFoundError:
+        return get_json_cache(get_legacy_json_path(path_to_cache))
+
+    header = read_cache_header_bytes(data)
+    if header is None or header.schema_version != CACHE_SCHEMA_VERSION:
+        LOGGER.warning("Ignoring cache %s with unsupported format", path_to_cache)
+        return []
+    return msgpack.unpackb(zstandard.ZstdDecompressor().decompress(data[_CACHE_HEADER.size:]), raw=False)
+
+
+def get_cache_written_at(path_to_cache: str) -> Optional[float]:
+    """Return the time a cache file was written in seconds since the epoch or None if it does not exist.
+
+    For legacy json cache files the modification time of the file is used.
+
+    Args:
+        path_to_cache: The path to the cached file.
+    """
+    header = read_cache_header(path_to_cache)
+    if header is not None:
+        return header.written_at
+    legacy_path = get_legacy_json_path(path_to_cache)
+    if path.isfile(legacy_path):
+        return path.getmtime(legacy_path)
+    return None
+
+
+def is_cache_stale(path_to_cache: str, max_age: float) -> bool:
+    """Return whether a cache file does not exist or is older than max_age seconds.
+
+    Args:
+        path_to_cache: The path to the cached file.
+        max_age: The maximum age of the cache file in seconds.
+    """
+    written_at = get_cache_written_at(path_to_cache)
+    return written_at is None or time() - written_at > max_age
+
+
+def get_legacy_json_path(path_to_cache: str) -> str:
+    """Return the path of the json cache file which was used before the binary format for the given cache file."""
+    return path.splitext(path_to_cache)[0] + ".json"
 
 
 def get_json_cache(path_to_cache: str) -> List[dict]:
-    """Fetch the item(s) from the json cache.
+    """Fetch the item(s) from a legacy json cache.
 
     Args:
         path_to_cache: The path to the cached file.
@@ -47,17 +260,17 @@ def get_json_cache(path_to_cache: str) -> List[dict]:
 def get_collection_cache_path(cache_path_dir: str, data_access: str = None) -> str:
     """Get the path to the cached collection summary depending on data_access.
 
-    If data_access is empty of not equal to the required data_access of the second CSW the main collections.json file
-    - describing the data available on the main CSW - is returned.
+    If data_access is empty of not equal to the required data_access of the second CSW the main collections cache
+    file - describing the data available on the main CSW - is returned.
     """
     if data_access == settings.DATA_ACCESS_DC:
-        return path.join(cache_path_dir, "collections_dc.json")
+        return path.join(cache_path_dir, "collections_dc" + CACHE_EXTENSION)
     else:
-        return path.join(cache_path_dir, "collections.json")
+        return path.join(cache_path_dir, "collections" + CACHE_EXTENSION)
 
 
 def get_cache_path(
-    cache_path_dir: str, product: str = None, series: bool = False, data_access: str = None
+    cache_path_dir: str, product: Optional[str] = None, series: bool = False, data_access: Optional[str] = None
 ) -> str:
     """Get the path to a cached single product or to the summary collection.
 
@@ -76,6 +289,6 @@ def get_cache_path(
     if series and not product:
         return get_collection_cache_path(cache_path_dir, data_access)
     elif product:
-        return path.join(cache_path_dir, product + ".json")
+        return path.join(cache_path_dir, product + CACHE_EXTENSION)
     else:
         raise OSError("Cache path can not be retrieved. Either a product name OR the series flag must be set.")
@@ -6,19 +6,27 @@ data service.
 
 import ast
 import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import partial
 from json import dumps
 from os import makedirs, path
-from typing import List, Tuple
+from threading import Lock
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from defusedxml.minidom import parseString
 from dynaconf import settings
 from nameko.extensions import DependencyProvider
-from owslib.csw import CatalogueServiceWeb
+from owslib.csw import CatalogueServiceWeb, CswRecord
 from owslib.fes import BBox, PropertyIsGreaterThan, PropertyIsLessThan, PropertyIsLike
-from requests import post
+from requests import Session
+from requests.adapters import HTTPAdapter
 
-from .cache import cache_json, get_cache_path, get_json_cache
+from .cache import get_cache, get_cache_path, get_cache_written_at, is_cache_stale, memory_cache, write_cache
+from .file_index import BBox as IndexBBox, FileRecord, decode_cursor, encode_cursor, format_time, get_file_index, \
+    parse_record_time, parse_time
 from .links import LinkHandler
+from .refresh import RefreshTask
 from .stac_utils import add_non_csw_info
 from .xml_templates import xml_and, xml_base, xml_bbox, xml_begin, xml_end, xml_product, xml_series
 from ..models import Collection, Collections, Extent, SpatialExtent, TemporalExtent
@@ -46,17 +54,28 @@ class CSWHandler:
         group_property: The query property to use when querying for a product.
         white_list: A list of collections available at the CSW server which should be exposed via OpenEO.
         cache_path: The path to a directory where records should be cached.
+        max_connections: The maximum number of requests sent to the CSW server at the same time.
+        page_size: The number of records requested per page.
+        file_index_ttl: The time in seconds after which file records in the local index are requested again.
     """
 
     def __init__(self, csw_server_uri: str, data_access: str, group_property: str, white_list: List[str],
-                 cache_path: str) -> None:
+                 cache_path: str, max_connections: int = 4, page_size: int = 1000, file_index_ttl: float = 3600
+                 ) -> None:
         """Initialise CSWHandler."""
         self.csw_server_uri = csw_server_uri
         self.data_access = data_access
         self.group_property = group_property
         self.white_list = white_list
         self.cache_path = cache_path
+        self.max_connections = max_connections
+        self.page_size = page_size
+        self.file_index_ttl = file_index_ttl
         self.link_handler = LinkHandler()
+        self.session = Session()
+        self.session.mount(self.csw_server_uri, HTTPAdapter(pool_maxsize=self.max_connections))
+        self._capabilities: Optional[CatalogueServiceWeb] = None
+        self._capabilities_lock = Lock()
 
         self._create_path(self.cache_path)
         LOGGER.debug("Initialized %s", self)
@@ -65,6 +84,11 @@ class CSWHandler:
         """Return a simple human readable representation of the CSWHandler."""
         return f"CSWHandler('{self.csw_server_uri}')"
 
+    def close(self) -> None:
+        """Close all pooled connections to the CSW server."""
+        self.session.close()
+        LOGGER.debug("Closed %s", self)
+
     def _create_path(self, cur_path: str) -> None:
         """Create a directory structure."""
         if not path.isdir(cur_path):
@@ -73,9 +97,17 @@ class CSWHandler:
     def get_all_products(self) -> Collections:
         """Return all products available at the backend.
 
+        Parsed collections are kept in the in-memory cache so that repeated requests neither read nor parse the
+        on-disk cache.
+
         Returns:
             The list containing information about available products.
         """
+        cache_key = get_cache_path(self.cache_path, series=True, data_access=self.data_access)
+        collections = memory_cache.get(cache_key)
+        if collections is not None:
+            return collections
+
         data = self._get_records(series=True)
 
         collection_list = []
@@ -105,6 +137,8 @@ class CSWHandler:
             )
         links = self.link_handler.get_links(collection=True)
         collections = Collections(collections=collection_list, links=links)
+        if collection_list:
+            memory_cache.set(cache_key, collections)
 
         return collections
 
@@ -117,6 +151,11 @@ class CSWHandler:
         Returns:
             The product data as collection.
         """
+        cache_key = get_cache_path(self.cache_path, data_id, series=True, data_access=self.data_access)
+        collection = memory_cache.get(cache_key)
+        if collection is not None:
+            return collection
+
         data = self._get_records(data_id, series=True)[0]
         try:
             # TODO find way to write to JSON with correct format
@@ -139,6 +178,7 @@ class CSWHandler:
             cube_dimensions=data["cube:dimensions"],
             summaries=data["summaries"],
         )
+        memory_cache.set(cache_key, collection)
 
         return collection
 
@@ -150,23 +190,62 @@ class CSWHandler:
                 A bit redundant because submitted through an additional POST.
         """
         LOGGER.debug("Refreshing cache %s", use_cache)
-        data = self._get_records(series=True, use_cache=use_cache)
+        for _, task in self.get_refresh_tasks(use_cache):
+            task()
+        memory_cache.invalidate()
+
+    def get_refresh_tasks(self, use_cache: bool = False, max_age: Optional[float] = None) -> List[RefreshTask]:
+        """Refresh the collection summary and return one task per collection to refresh its details.
+
+        Args:
+            use_cache: Specifies whether to or not to refresh the cache.
+            max_age: If set only caches older than max_age seconds are refreshed.
+
+        Returns:
+            A list of collection identifiers together with the task refreshing the cache of the collection.
+        """
+        summary_path = get_cache_path(self.cache_path, series=True, data_access=self.data_access)
+        refresh_summary = not use_cache and (max_age is None or is_cache_stale(summary_path, max_age))
+        data = self._get_records(series=True, use_cache=not refresh_summary)
+
+        tasks: List[RefreshTask] = []
         for collection in data:
-            _ = self._get_records(
-                collection["id"], series=True, use_cache=use_cache)[0]
+            collection_path = get_cache_path(self.cache_path, collection["id"], series=True,
+                                             data_access=self.data_access)
+            if max_age is not None and not is_cache_stale(collection_path, max_age):
+                continue
+            tasks.append(
+                (collection["id"], partial(self._get_records, collection["id"], series=True, use_cache=use_cache))
+            )
+        return tasks
+
+    def get_cache_timestamps(self) -> Dict[str, Any]:
+        """Return when the cache of the collection summary and of each whitelisted collection was written.
+
+        Returns:
+            The time in seconds since the epoch of the 'summary' and of each collection under 'collections'. None if
+            a cache does not exist.
+        """
+        collections: Dict[str, Optional[float]] = {}
+        for collection_id in self.white_list:
+            collection_path = get_cache_path(self.cache_path, collection_id, series=True,
+                                             data_access=self.data_access)
+            collections[collection_id] = get_cache_written_at(collection_path)
+        summary_path = get_cache_path(self.cache_path, series=True, data_access=self.data_access)
+        return {"summary": get_cache_written_at(summary_path), "collections": collections}
 
     def _get_records(
             self,
-            product: str = None,
-            bbox: list = None,
-            start: str = None,
-            end: str = None,
+            product: Optional[str] = None,
+            bbox: Optional[list] = None,
+            start: Optional[str] = None,
+            end: Optional[str] = None,
             series: bool = False,
             use_cache: bool = True,
     ) -> list:
         """Parse the XML request for the CSW server and collects the response.
 
-        The response is collected by the batch triggered _get_single_records function.
+        The response is collected by the batch triggered _get_all_records function.
 
         Args:
             product: The identifier of the product.
@@ -202,28 +281,22 @@ class CSWHandler:
             cur_filter = self._get_csw_filter(
                 product, bbox, start, end, series)
 
-            # While still data is available send requests to the CSW server (-1 if not more data is available)
-            record_next = 1
-            while int(record_next) > 0:
-                record_next, records = self._get_single_records(
-                    record_next, cur_filter, output_schema
-                )
-                all_records += records
+            all_records = self._get_all_records(cur_filter, output_schema)
             # additionally add the links, cube:dimensions, summaries to each record and collection
             all_records = self.link_handler.get_links(all_records)
             all_records = add_non_csw_info(all_records)
-            cache_json(all_records, path_to_cache)
+            write_cache(all_records, path_to_cache)
         else:
-            all_records = get_json_cache(path_to_cache)
+            all_records = get_cache(path_to_cache)
 
         return all_records
 
     def _get_csw_filter(
             self,
-            product: str = None,
-            bbox: list = None,
-            start: str = None,
-            end: str = None,
+            product: Optional[str] = None,
+            bbox: Optional[list] = None,
+            start: Optional[str] = None,
+            end: Optional[str] = None,
             series: bool = False,
     ) -> str:
         """
@@ -282,6 +355,40 @@ class CSWHandler:
 
         return filter_parsed
 
+    def _get_all_records(self, filter_parsed: str, output_schema: str) -> list:
+        """Collect all pages of records matching a filter from the CSW server.
+
+        The first page tells how many records match in total. All remaining pages are then requested concurrently
+        using at most max_connections connections. Records are returned in the order of the server.
+
+        Args:
+            filter_parsed: The prepared XML template.
+            output_schema: The desired output schema of the response.
+
+        Raises:
+            CWSError: If a problem occurs while communicating with the CSW server.
+
+        Returns:
+            The records of all pages.
+        """
+        search_result = self._get_search_result(1, filter_parsed, output_schema)
+        all_records = self._extract_records(search_result)
+        records_matched = int(search_result["@numberOfRecordsMatched"])
+        # The server may return less records per page than requested
+        page_size = int(search_result["@numberOfRecordsReturned"])
+        if int(search_result["@nextRecord"]) <= 0 or page_size == 0:
+            return all_records
+
+        start_positions = range(1 + page_size, records_matched + 1, page_size)
+        LOGGER.debug("Requesting %s further pages of %s records", len(start_positions), page_size)
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            pages = executor.map(lambda position: self._get_single_records(position, filter_parsed, output_schema),
+                                 start_positions)
+            for _, records in pages:
+                all_records += records
+
+        return all_records
+
     def _get_single_records(
             self, start_position: int, filter_parsed: str, output_schema: str
     ) -> Tuple[int, list]:
@@ -298,14 +405,32 @@ class CSWHandler:
         Returns:
             A Tuple with the integer position of the next result and the returned record or product data.
         """
+        search_result = self._get_search_result(start_position, filter_parsed, output_schema)
+        return search_result["@nextRecord"], self._extract_records(search_result)
+
+    def _get_search_result(self, start_position: int, filter_parsed: str, output_schema: str) -> dict:
+        """Send a single request to the CSW server and return the search results of the response.
+
+        Args:
+            start_position: The request start position.
+            filter_parsed: The prepared XML template.
+            output_schema: The desired output schema of the response.
+
+        Raises:
+            CWSError: If a problem occurs while communicating with the CSW server.
+
+        Returns:
+            The content of csw:SearchResults including the paging attributes of the response.
+        """
         # Parse the XML by injecting iteration depended variables
         xml_request = xml_base.format(
             children=filter_parsed,
             output_schema=output_schema,
             start_position=start_position,
+            max_records=self.page_size,
         )
         LOGGER.debug("POST:\n%s", xml_request)
-        response = post(self.csw_server_uri, data=xml_request)
+        response = self.session.post(self.csw_server_uri, data=xml_request)
 
         # Response error handling
         if not response.ok:
@@ -325,9 +450,10 @@ class CSWHandler:
             raise CSWError("Error while communicating with CSW server.")
 
         # Get the response data
-        search_result = response_json["csw:GetRecordsResponse"]["csw:SearchResults"]
+        return response_json["csw:GetRecordsResponse"]["csw:SearchResults"]
 
-        record_next = search_result["@nextRecord"]
+    def _extract_records(self, search_result: dict) -> list:
+        """Return the record or product data contained in the search results of a single response."""
         if "gmd:MD_Metadata" in search_result:
             records = search_result["gmd:MD_Metadata"]
         elif "csw:Record" in search_result:
@@ -343,7 +469,7 @@ class CSWHandler:
         if not isinstance(records, list):
             records = [records]
 
-        return record_next, records
+        return records
 
     def check_collections_id(self, collections: List) -> List:
         """Return a list of collections from a CSW query, only if whitelisted.
@@ -365,80 +491,201 @@ class CSWHandler:
                       ) -> List[str]:
         """Retrieve a file list from the a CSW server according to the specified parameters.
 
+        Results are answered from the local file index of the collection. Only time ranges which are not yet covered
+        by the index for the given spatial extent are requested from the CSW server.
+
+        Arguments:
+            collecion_id {str} -- identifier of the collection
+            spatial_extent {List[float]} -- bounding box [ymin, xmin, ymax, xmax]
+            temporal_extent {List[str]} -- e.g. ["2018-06-04", "2018-06-23"]
+
+        Returns:
+            list -- list of filepaths ordered by their begin
+        """
+        return self.get_filepaths_page(collection_id, spatial_extent, temporal_extent)[0]
+
+    def get_filepaths_page(self, collection_id: str, spatial_extent: List[float], temporal_extent: List[str],
+                           cursor: Optional[str] = None, limit: Optional[int] = None
+                           ) -> Tuple[List[str], Optional[str], int]:
+        """Retrieve a page of the file list, see get_filepaths.
+
+        Pages are ordered by the begin and the filepath of the records. The cursor points to the last filepath of the
+        previous page, so the next page continues behind it even if the index changed in between or the previous
+        page was answered by another service instance. The total number of filepaths is counted once for the first
+        page and passed on with the cursor.
+
         Arguments:
             collecion_id {str} -- identifier of the collection
             spatial_extent {List[float]} -- bounding box [ymin, xmin, ymax, xmax]
             temporal_extent {List[str]} -- e.g. ["2018-06-04", "2018-06-23"]
+            cursor {Optional[str]} -- cursor returned with the previous page, None for the first page
+            limit {Optional[int]} -- maximum number of filepaths, all if None
 
         Returns:
-            list -- list of filepaths
+            tuple -- list of filepaths, the cursor of the next page (None for the last page) and the total number of
+                     filepaths
         """
-        csw = CatalogueServiceWeb(self.csw_server_uri, timeout=300)
+        file_index = get_file_index(f"{self.csw_server_uri}/{collection_id}", ttl=self.file_index_ttl)
+        bbox: IndexBBox = (float(spatial_extent[0]), float(spatial_extent[1]), float(spatial_extent[2]),
+                           float(spatial_extent[3]))
+        begin, end = parse_time(temporal_extent[0]), parse_time(temporal_extent[1])
+        after, total_count = decode_cursor(cursor) if cursor else (None, 0)
+
+        for missing_begin, missing_end in file_index.get_missing_intervals(bbox, begin, end):
+            # Use the original strings if possible to query the CSW server exactly as requested
+            begin_str = temporal_extent[0] if missing_begin == begin else format_time(missing_begin)
+            end_str = temporal_extent[1] if missing_end == end else format_time(missing_end)
+            LOGGER.debug("Querying file records of %s from %s to %s", collection_id, begin_str, end_str)
+            # Add the records page by page, the time range is only covered once all pages were added
+            for page in self._iter_file_records(collection_id, spatial_extent, [begin_str, end_str]):
+                file_index.add_records(
+                    self._to_file_record(record, bbox, missing_begin, missing_end) for record in page
+                )
+            file_index.add_coverage(bbox, missing_begin, missing_end)
+
+        if after is None:
+            total_count = file_index.count(bbox, begin, end)
+        filepaths, last_key = file_index.query_page(bbox, begin, end, after=after, limit=limit)
+        return filepaths, encode_cursor(last_key, total_count) if last_key else None, total_count
+
+    def _iter_file_records(self, collection_id: str, spatial_extent: List[float], temporal_extent: List[str]
+                           ) -> Iterator[List[CswRecord]]:
+        """Yield all records of a collection overlapping the spatial and temporal extent from the CSW server by page.
+
+        Pages hold up to page_size records and are only requested once the previous page was consumed, so the number
+        of matching records is not limited and they never need to be held in memory at once.
+
+        Arguments:
+            collecion_id {str} -- identifier of the collection
+            spatial_extent {List[float]} -- bounding box [ymin, xmin, ymax, xmax]
+            temporal_extent {List[str]} -- e.g. ["2018-06-04", "2018-06-23"]
+
+        Yields:
+            list -- the matching records of a single page
+        """
+        csw = self._get_catalogue()
 
         constraints = []
         constraints.append(PropertyIsLike(self.group_property, collection_id))
 
         # Spatial filter
         constraints.append(BBox(spatial_extent))
-        # Temporal filter
-        constraints.append(PropertyIsGreaterThan('apiso:TempExtent_begin', temporal_extent[0]))
-        constraints.append(PropertyIsLessThan('apiso:TempExtent_end', temporal_extent[1]))
+        # Temporal filter - all records overlapping the time range, the file index filters them by the actual query
+        constraints.append(PropertyIsLessThan('apiso:TempExtent_begin', temporal_extent[1]))
+        constraints.append(PropertyIsGreaterThan('apiso:TempExtent_end', temporal_extent[0]))
+
+        # Run the query page by page
+        start_position = 0
+        while True:
+            csw.getrecords2(constraints=[constraints], startposition=start_position, maxrecords=self.page_size)
+            yield list(csw.records.values())
+            next_record = int(csw.results["nextrecord"] or 0)
+            if next_record <= start_position or next_record > int(csw.results["matches"]):
+                break
+            start_position = next_record
+
+    def _get_catalogue(self) -> CatalogueServiceWeb:
+        """Return a new CSW client reusing the capabilities document of the CSW server.
+
+        The capabilities are only requested once per handler. A new client is still needed for each query as the
+        client stores the results of its last request.
+        """
+        with self._capabilities_lock:
+            if self._capabilities is None:
+                self._capabilities = CatalogueServiceWeb(self.csw_server_uri, timeout=300)
+        csw = CatalogueServiceWeb(self.csw_server_uri, timeout=300, skip_caps=True)
+        # Operations are used to find the url of the GetRecords request
+        csw.operations = self._capabilities.operations
+        return csw
 
-        # Run the query
-        csw.getrecords2(constraints=[constraints], maxrecords=100)
+    def _to_file_record(self, record: CswRecord, bbox: IndexBBox, begin: datetime, end: datetime
+                        ) -> FileRecord:
+        """Convert a CSW record to a record of the file index.
 
-        # Put found records in a variable (dictionary)
-        records0 = csw.records
+        If the footprint or the temporal extent is not part of the record the query it was found with is used
+        instead and the record is flagged as not exact.
 
-        # Sort records
-        records = []
-        for record in records0:
-            records.append(records0[record].references[0]['url'])
-        records = sorted(records)
+        Args:
+            record: The record returned by the CSW server.
+            bbox: The bounding box of the query.
+            begin: The start of the time range of the query.
+            end: The end of the time range of the query.
+        """
+        filepath = record.references[0]['url']
+        record_time = parse_record_time(record.temporal) or parse_record_time(record.date)
+        if record.bbox is None or record_time is None:
+            return FileRecord(begin=begin, end=end, bbox=bbox, filepath=filepath, exact=False)
 
-        return records
+        record_bbox = (float(record.bbox.minx), float(record.bbox.miny),
+                       float(record.bbox.maxx), float(record.bbox.maxy))
+        return FileRecord(begin=record_time[0], end=record_time[1], bbox=record_bbox, filepath=filepath)
 
 
 class CSWSession(DependencyProvider):
-    """The CSWSession is the DependencyProvider of the CSWHandler."""
+    """The CSWSession is the DependencyProvider of the CSWHandler.
 
-    def get_dependency(self, worker_ctx: object) -> CSWHandler:
-        """Return the instantiated object that is injected to a service worker.
+    A single CSWHandler is created per service container and shared by all workers, so connections to the CSW server
+    and its capabilities are reused across requests.
+    """
 
-        Args:
-            worker_ctx: The service worker.
+    handler: Optional[CSWHandler] = None
 
-        Returns:
-            CSWHandler: The instantiated CSWHandler object.
-        """
+    def setup(self) -> None:
+        """Create the CSWHandler shared by all service workers."""
+        self.handler = self._create_handler()
+
+    def _create_handler(self) -> CSWHandler:
+        """Return a new CSWHandler configured with the settings of the CSW server."""
         return CSWHandler(
             csw_server_uri=settings.CSW_SERVER,
             data_access=settings.DATA_ACCESS,
             group_property=settings.GROUP_PROPERTY,
             white_list=settings.WHITELIST,
             cache_path=settings.CACHE_PATH,
+            max_connections=settings.CSW_MAX_CONNECTIONS,
+            page_size=settings.CSW_PAGE_SIZE,
+            file_index_ttl=settings.FILE_INDEX_TTL,
         )
 
+    def stop(self) -> None:
+        """Close the connections of the CSWHandler."""
+        if self.handler is not None:
+            self.handler.close()
+            self.handler = None
 
-class CSWSessionDC(DependencyProvider):
-    """The CSWSession is also the DependencyProvider of the CSWHandler.
-
-    To provide two CSWHandler instances using a different configuration.
-    """
+    def kill(self) -> None:
+        """Close the connections of the CSWHandler."""
+        self.stop()
 
     def get_dependency(self, worker_ctx: object) -> CSWHandler:
         """Return the instantiated object that is injected to a service worker.
 
         Args:
-            worker_ctx: The service worker
+            worker_ctx: The service worker.
 
         Returns:
-            CSWHandler: The instantiated CSWHandler object
+            CSWHandler: The shared CSWHandler object.
         """
+        if self.handler is None:
+            self.handler = self._create_handler()
+        return self.handler
+
+
+class CSWSessionDC(CSWSession):
+    """The CSWSession is also the DependencyProvider of the CSWHandler.
+
+    To provide two CSWHandler instances using a different configuration.
+    """
+
+    def _create_handler(self) -> CSWHandler:
+        """Return a new CSWHandler configured with the settings of the DC CSW server."""
         return CSWHandler(
             csw_server_uri=settings.CSW_SERVER_DC,
             data_access=settings.DATA_ACCESS_DC,
             group_property=settings.GROUP_PROPERTY_DC,
             white_list=settings.WHITELIST_DC,
             cache_path=settings.CACHE_PATH,
+            max_connections=settings.CSW_MAX_CONNECTIONS,
+            page_size=settings.CSW_PAGE_SIZE,
+            file_index_ttl=settings.FILE_INDEX_TTL,
         )
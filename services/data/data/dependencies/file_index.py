@@ -0,0 +1,385 @@
+"""Provides a local spatial and temporal index of file records per collection.
+
+Each index stores the file records already retrieved from a CSW server together with the areas and time ranges which
+were queried to get them (the coverage). Queries inside the coverage are answered locally, only the missing time ranges
+need to be requested from the CSW server.
+
+Bounding boxes are handled in the same axis order in which they are passed to the CSW server. A coverage holds all
+records overlapping its time range, so records crossing the border of two coverages are not lost. Queries are
+exclusive in the same way as the original CSW query - a record matches if it begins after the start and ends before
+the end.
+
+Records are bucketed by the cells of a coarse grid their bounding box touches and each bucket is sorted by the begin of
+its records. A query only looks at the buckets of the cells its bounding box touches and bisects them to the start of
+its time range (or to the cursor of a page), but the records inside these buckets and the time range are still scanned
+linearly. Records touching more than MAX_CELLS cells are stored in a single bucket for wide records, queries touching
+more cells look at all buckets.
+"""
+
+import logging
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from bisect import bisect_left, bisect_right
+from datetime import datetime, timezone
+from heapq import merge
+from itertools import islice
+from math import floor
+from threading import Lock
+from time import monotonic
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+from dateutil.parser import isoparse
+
+LOGGER = logging.getLogger("standardlog")
+
+BBox = Tuple[float, float, float, float]
+"""A bounding box given as (min first axis, min second axis, max first axis, max second axis)."""
+RecordKey = Tuple[datetime, str]
+"""The begin and the filepath of a record, which uniquely identify its position in an index."""
+Cell = Tuple[int, int]
+"""The position of a grid cell along the first and the second axis."""
+
+CELL_SIZE = 1.0
+"""Edge length of the grid cells records are bucketed by, in the unit of the bounding boxes (usually degrees)."""
+MAX_CELLS = 64
+"""Maximum number of cells a record is bucketed in, wider records are stored in a single bucket."""
+
+
+class FileRecord(NamedTuple):
+    """A single file record stored in the index."""
+
+    begin: datetime
+    """Begin of the temporal extent of the file."""
+    end: datetime
+    """End of the temporal extent of the file."""
+    bbox: BBox
+    """Footprint of the file."""
+    filepath: str
+    """The path (or url) of the file."""
+    exact: bool = True
+    """Whether bbox, begin and end describe the file itself or only the query the file was found with.
+
+    In the latter case the record is only returned for queries completely containing this area and time range.
+    """
+
+
+class Coverage(NamedTuple):
+    """An area and time range for which all file records are stored in the index."""
+
+    bbox: BBox
+    begin: datetime
+    end: datetime
+    created_at: float
+    """Creation time (monotonic clock) used to expire the coverage."""
+
+
+def parse_time(time_str: str) -> datetime:
+    """Parse an ISO 8601 date or datetime, times without timezone are considered to be UTC."""
+    parsed = isoparse(time_str)
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed
+
+
+def parse_record_time(temporal: Optional[str]) -> Optional[Tuple[datetime, datetime]]:
+    """Parse the temporal extent of a CSW record given either as single time or as interval 'begin/end'."""
+    if not temporal:
+        return None
+    try:
+        parts = temporal.split("/")
+        return parse_time(parts[0]), parse_time(parts[-1])
+    except ValueError:
+        return None
+
+
+def encode_cursor(key: RecordKey, total_count: int) -> str:
+    """Return the opaque cursor pointing to the record with the given key.
+
+    The cursor also carries the total number of matching records counted for the first page, so following pages do
+    not need to count them again.
+    """
+    return urlsafe_b64encode(f"{format_time(key[0])}|{total_count}|{key[1]}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[RecordKey, int]:
+    """Return the key of the record a cursor points to and the total number of matching records.
+
+    Raises:
+        ValueError: The cursor is not valid.
+    """
+    try:
+        time_str, total_count, filepath = urlsafe_b64decode(cursor.encode()).decode().split("|", 2)
+        return (parse_time(time_str), filepath), int(total_count)
+    except (TypeError, ValueError, UnicodeError) as err:
+        raise ValueError(f"The cursor '{cursor}' is not valid.") from err
+
+
+def format_time(time: datetime) -> str:
+    """Format a datetime as ISO 8601 string in UTC."""
+    time_format = "%Y-%m-%dT%H:%M:%S.%fZ" if time.microsecond else "%Y-%m-%dT%H:%M:%SZ"
+    return time.astimezone(timezone.utc).strftime(time_format)
+
+
+def _intersects(bbox: BBox, other: BBox) -> bool:
+    """Return whether two bounding boxes intersect."""
+    return not (bbox[2] < other[0] or bbox[0] > other[2] or bbox[3] < other[1] or bbox[1] > other[3])
+
+
+def _contains(bbox: BBox, other: BBox) -> bool:
+    """Return whether the first bounding box completely contains the second one."""
+    return bbox[0] <= other[0] and bbox[1] <= other[1] and bbox[2] >= other[2] and bbox[3] >= other[3]
+
+
+def _cells(bbox: BBox) -> Optional[List[Cell]]:
+    """Return the grid cells a bounding box touches, None if these are more than MAX_CELLS or cannot be computed."""
+    try:
+        first_axis = range(floor(bbox[0] / CELL_SIZE), floor(bbox[2] / CELL_SIZE) + 1)
+        second_axis = range(floor(bbox[1] / CELL_SIZE), floor(bbox[3] / CELL_SIZE) + 1)
+    except (OverflowError, ValueError):
+        return None
+    if not 0 < len(first_axis) * len(second_axis) <= MAX_CELLS:
+        return None
+    return [(first, second) for first in first_axis for second in second_axis]
+
+
+def _bucket_cells(record: FileRecord) -> List[Optional[Cell]]:
+    """Return the cells of the buckets a record is stored in, None is the bucket of wide records."""
+    cells = _cells(record.bbox)
+    return [None] if cells is None else [*cells]
+
+
+class FileIndex:
+    """Index of the file records of a single collection.
+
+    Records are bucketed by grid cell and kept sorted by their begin inside each bucket, so a query only needs to check
+    the records of the touched cells starting inside the queried time range. Records are evicted together with the
+    last coverage they overlap.
+
+    Attributes:
+        ttl: The time in seconds after which a coverage expires and the CSW server is queried again.
+    """
+
+    def __init__(self, ttl: float) -> None:
+        """Initialise FileIndex."""
+        self.ttl = ttl
+        self._filepaths: Dict[str, FileRecord] = {}
+        self._buckets: Dict[Optional[Cell], List[RecordKey]] = {}
+        self._coverage: List[Coverage] = []
+        self._lock = Lock()
+
+    def get_missing_intervals(self, bbox: BBox, begin: datetime, end: datetime) -> List[Tuple[datetime, datetime]]:
+        """Return the time ranges of a query which are not covered by the index yet.
+
+        Args:
+            bbox: The queried bounding box.
+            begin: The start of the queried time range.
+            end: The end of the queried time range.
+
+        Returns:
+            A sorted list of time ranges which need to be requested from the CSW server.
+        """
+        with self._lock:
+            self._expire_coverage()
+            covered = sorted((coverage.begin, coverage.end) for coverage in self._coverage
+                             if _contains(coverage.bbox, bbox) and coverage.end > begin and coverage.begin < end)
+
+        missing = []
+        current = begin
+        for covered_begin, covered_end in covered:
+            if covered_begin > current:
+                missing.append((current, covered_begin))
+            current = max(current, covered_end)
+            if current >= end:
+                break
+        if current < end:
+            missing.append((current, end))
+        return missing
+
+    def add(self, records: List[FileRecord], bbox: BBox, begin: datetime, end: datetime) -> None:
+        """Add the records found for a query and mark the query as covered.
+
+        Args:
+            records: The records returned by the CSW server.
+            bbox: The queried bounding box.
+            begin: The start of the queried time range.
+            end: The end of the queried time range.
+        """
+        self.add_records(records)
+        self.add_coverage(bbox, begin, end)
+
+    def add_records(self, records: Iterable[FileRecord]) -> None:
+        """Add records without marking any query as covered, e.g. a single page of a larger query.
+
+        Records already stored are skipped, unless the stored one is not exact and the new one is.
+
+        Args:
+            records: The records returned by the CSW server.
+        """
+        with self._lock:
+            touched: Set[Optional[Cell]] = set()
+            for record in records:
+                existing = self._filepaths.get(record.filepath)
+                if existing is not None:
+                    if existing.exact or not record.exact:
+                        continue
+                    for cell in _bucket_cells(existing):
+                        self._buckets[cell].remove(_sort_key(existing))
+                self._filepaths[record.filepath] = record
+                for cell in _bucket_cells(record):
+                    self._buckets.setdefault(cell, []).append(_sort_key(record))
+                    touched.add(cell)
+            # The buckets are already sorted, sorting only merges the new keys in
+            for cell in touched:
+                self._buckets[cell].sort()
+
+    def add_coverage(self, bbox: BBox, begin: datetime, end: datetime) -> None:
+        """Mark a query as covered once all records overlapping its time range were added.
+
+        Args:
+            bbox: The queried bounding box.
+            begin: The start of the queried time range.
+            end: The end of the queried time range.
+        """
+        with self._lock:
+            self._coverage.append(Coverage(bbox=bbox, begin=begin, end=end, created_at=monotonic()))
+
+    def query(self, bbox: BBox, begin: datetime, end: datetime) -> List[str]:
+        """Return the filepaths of all records intersecting the bounding box inside the time range.
+
+        Args:
+            bbox: The queried bounding box.
+            begin: The start of the queried time range.
+            end: The end of the queried time range.
+
+        Returns:
+            The filepaths ordered by the begin and the filepath of their records.
+        """
+        return self.query_page(bbox, begin, end)[0]
+
+    def count(self, bbox: BBox, begin: datetime, end: datetime) -> int:
+        """Return the number of records a query matches.
+
+        Args:
+            bbox: The queried bounding box.
+            begin: The start of the queried time range.
+            end: The end of the queried time range.
+        """
+        with self._lock:
+            return sum(1 for _ in self._iter_matches(bbox, begin, end))
+
+    def query_page(self, bbox: BBox, begin: datetime, end: datetime, after: Optional[RecordKey] = None,
+                   limit: Optional[int] = None) -> Tuple[List[str], Optional[RecordKey]]:
+        """Return a page of the filepaths of a query together with the key of the last returned record.
+
+        Pages continue from the position of a record key in the index, so requesting a page does not depend on the
+        number of previous pages.
+
+        Args:
+            bbox: The queried bounding box.
+            begin: The start of the queried time range.
+            end: The end of the queried time range.
+            after: The key of the last record of the previous page, None for the first page.
+            limit: The maximum number of filepaths, all if None.
+
+        Returns:
+            The filepaths ordered by the begin and the filepath of their records and the key of the last returned
+            record - None if there are no further matching records.
+        """
+        with self._lock:
+            filepaths: List[str] = []
+            last_key = None
+            for record in self._iter_matches(bbox, begin, end, after):
+                if limit is not None and len(filepaths) >= limit:
+                    return filepaths, last_key
+                filepaths.append(record.filepath)
+                last_key = _sort_key(record)
+        return filepaths, None
+
+    def _iter_matches(self, bbox: BBox, begin: datetime, end: datetime, after: Optional[RecordKey] = None
+                      ) -> Iterator[FileRecord]:
+        """Yield the records a query matches ordered by their key, the lock needs to be held while iterating.
+
+        Args:
+            bbox: The queried bounding box.
+            begin: The start of the queried time range.
+            end: The end of the queried time range.
+            after: Only records behind this key are yielded, all if None.
+        """
+        cells = _cells(bbox)
+        if cells is None:
+            buckets = list(self._buckets.values())
+        else:
+            buckets = [self._buckets[cell] for cell in [*cells, None] if cell in self._buckets]
+
+        ranges = []
+        for keys in buckets:
+            # A tuple holding only the begin sorts before all records starting at the same time
+            start = bisect_left(keys, (begin,))
+            if after is not None:
+                start = max(start, bisect_right(keys, after))
+            ranges.append(islice(keys, start, None))
+
+        last_key = None
+        for key in merge(*ranges):
+            if key[0] >= end:
+                break
+            # Records touching several cells are stored in several buckets
+            if key == last_key:
+                continue
+            last_key = key
+            record = self._filepaths[key[1]]
+            if _matches(record, bbox, begin, end):
+                yield record
+
+    def _expire_coverage(self) -> None:
+        """Drop expired coverages and the records which do not overlap any remaining coverage."""
+        now = monotonic()
+        coverage = [coverage for coverage in self._coverage if now - coverage.created_at <= self.ttl]
+        if len(coverage) == len(self._coverage):
+            return
+        self._coverage = coverage
+        records = [record for record in self._filepaths.values()
+                   if any(_overlaps(record, covered) for covered in coverage)]
+        if len(records) < len(self._filepaths):
+            LOGGER.debug("Evicting %s of %s records from file index", len(self._filepaths) - len(records),
+                         len(self._filepaths))
+            self._filepaths = {record.filepath: record for record in records}
+            self._buckets = {}
+            for record in records:
+                for cell in _bucket_cells(record):
+                    self._buckets.setdefault(cell, []).append(_sort_key(record))
+            for keys in self._buckets.values():
+                keys.sort()
+
+
+def _sort_key(record: FileRecord) -> RecordKey:
+    """Return the key the records of an index are sorted by."""
+    return record.begin, record.filepath
+
+
+def _matches(record: FileRecord, bbox: BBox, begin: datetime, end: datetime) -> bool:
+    """Return whether a record is part of the result of a query."""
+    if record.exact:
+        return begin < record.begin and record.end < end and _intersects(record.bbox, bbox)
+    return begin <= record.begin and record.end <= end and _contains(bbox, record.bbox)
+
+
+def _overlaps(record: FileRecord, coverage: Coverage) -> bool:
+    """Return whether a record was requested together with the coverage."""
+    return record.begin < coverage.end and record.end > coverage.begin and _intersects(record.bbox, coverage.bbox)
+
+
+_indexes: Dict[str, FileIndex] = {}
+_indexes_lock = Lock()
+
+
+def get_file_index(key: str, ttl: float) -> FileIndex:
+    """Return the process-wide index stored under the given key, a new index is created if none exists.
+
+    Args:
+        key: Unique key of the index, e.g. the CSW server and collection identifier.
+        ttl: The time in seconds after which a coverage of a newly created index expires.
+    """
+    with _indexes_lock:
+        if key not in _indexes:
+            _indexes[key] = FileIndex(ttl=ttl)
+        return _indexes[key]
@@ -0,0 +1,93 @@
+"""Provides the orchestration of cache refreshes across all metadata backends.
+
+Each backend (e.g. a :class:`~data.dependencies.csw.CSWHandler`) provides a `get_refresh_tasks` method which refreshes
+its collection summary and returns one task per collection. The tasks of all backends are executed concurrently.
+If a maximum age is given backends only return tasks for collections whose cache is older.
+"""
+
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from time import monotonic
+from typing import Any, Callable, Dict, List, Tuple
+
+LOGGER = logging.getLogger("standardlog")
+
+RefreshTask = Tuple[str, Callable[[], Any]]
+"""A collection identifier together with a callable refreshing the cache of this collection."""
+
+
+def _timed(func: Callable, *args: Any) -> Tuple[float, Any]:
+    """Call a function and return the time it took in seconds together with its result."""
+    start = monotonic()
+    result = func(*args)
+    return monotonic() - start, result
+
+
+def _get_result(future: Future, deadline: float) -> Dict[str, Any]:
+    """Wait for a future until the deadline and return its status report.
+
+    Args:
+        future: The future of a call wrapped by :func:`_timed`.
+        deadline: The point in time (monotonic clock) after which the call counts as timed out.
+
+    Returns:
+        A dictionary with the 'status' and either the 'duration' or the 'error' of the call. In case of success the
+        result of the call is also included.
+    """
+    try:
+        duration, result = future.result(timeout=max(deadline - monotonic(), 0))
+        return {"status": "success", "duration": round(duration, 3), "result": result}
+    except FutureTimeoutError:
+        future.cancel()
+        return {"status": "error", "error": "Timed out."}
+    except Exception as exp:
+        LOGGER.exception("Error while refreshing cache")
+        return {"status": "error", "error": str(exp)}
+
+
+def refresh_backends(backends: Dict[str, Any], use_cache: bool = False, max_workers: int = 8,
+                     timeout: float = 600, max_age: float = None) -> Dict[str, Dict[str, Any]]:
+    """Refresh the cache of all given backends and all of their collections concurrently.
+
+    A failing or timed out collection does not stop the refresh of any other collection.
+
+    Args:
+        backends: Mapping of a backend name to the handler of the backend.
+        use_cache: Whether the existing cache is used or data is refreshed.
+        max_workers: The maximum number of collections refreshed at the same time.
+        timeout: The time in seconds after which the refresh of a backend is aborted.
+        max_age: If set only caches older than max_age seconds are refreshed.
+
+    Returns:
+        A report per backend including the 'status', 'duration' and 'error' of the backend and the same information
+        for each refreshed collection under 'collections'.
+    """
+    report: Dict[str, Dict[str, Any]] = {}
+    start = monotonic()
+    deadlines = {name: start + timeout for name in backends}
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        summary_futures = {name: executor.submit(_timed, backend.get_refresh_tasks, use_cache, max_age)
+                           for name, backend in backends.items()}
+
+        collection_futures: Dict[str, Dict[str, Future]] = {}
+        for name, future in summary_futures.items():
+            report[name] = _get_result(future, deadlines[name])
+            report[name]["collections"] = {}
+            tasks: List[RefreshTask] = report[name].pop("result", [])
+            collection_futures[name] = {collection_id: executor.submit(_timed, task) for collection_id, task in tasks}
+
+        for name, futures in collection_futures.items():
+            for collection_id, future in futures.items():
+                collection_report = _get_result(future, deadlines[name])
+                collection_report.pop("result", None)
+                report[name]["collections"][collection_id] = collection_report
+                if collection_report["status"] == "error":
+                    report[name]["status"] = "error"
+            report[name]["duration"] = round(monotonic() - start, 3)
+            LOGGER.info("Refreshed cache of %s with status %s", name, report[name]["status"])
+    finally:
+        # Do not wait for timed out tasks, they can not be stopped
+        executor.shutdown(wait=False)
+
+    return report
@@ -21,6 +21,36 @@ class SettingKeys(Enum):
 
     If you are running in docker the path needs to be inside the container.
     """
+    COLLECTION_CACHE_TTL = "COLLECTION_CACHE_TTL"
+    """Time in seconds parsed collections are kept in memory before they are reloaded from CACHE_PATH - default 300.
+
+    Refreshing the cache always invalidates the in-memory cache of the refreshing process. Other processes pick up
+    the new data at the latest after this time.
+    """
+
+    REFRESH_MAX_WORKERS = "REFRESH_MAX_WORKERS"
+    """The maximum number of collections refreshed at the same time when refreshing the cache - default 8."""
+    REFRESH_TIMEOUT = "REFRESH_TIMEOUT"
+    """The time in seconds after which refreshing the cache of a single backend is aborted - default 600."""
+
+    CACHE_MAX_AGE = "CACHE_MAX_AGE"
+    """The age in seconds after which the cache of a collection is refreshed in the background - default 86400."""
+    CACHE_WARMER_INTERVAL = "CACHE_WARMER_INTERVAL"
+    """The interval in seconds in which the age of all caches is checked - default 600.
+
+    The check also runs directly after the service started, so a missing cache is filled automatically.
+    """
+    CACHE_WARMER_JITTER = "CACHE_WARMER_JITTER"
+    """The maximum random delay in seconds added before each check of the cache age - default 60.
+
+    This avoids that multiple replicas of the data service query the metadata backends at the same time.
+    """
+
+    STAC_INFO_RELOAD = "STAC_INFO_RELOAD"
+    """Whether the static STAC metadata files of the collections are checked for modifications - default False.
+
+    The files are loaded once at startup. If enabled they are reloaded as soon as a file changes.
+    """
 
     IS_CSW_SERVER = "IS_CSW_SERVER"
     """The flag for a CSW server.
@@ -51,6 +81,21 @@ class SettingKeys(Enum):
 
     There are scenarios where not all collections available on a CSW server are meaningful in the context of OpenEO.
     """
+    CSW_MAX_CONNECTIONS = "CSW_MAX_CONNECTIONS"
+    """The maximum number of concurrent requests sent to a CSW server when paging through results - default 4.
+
+    Applies to both CSW servers.
+    """
+    CSW_PAGE_SIZE = "CSW_PAGE_SIZE"
+    """The number of records requested from a CSW server per page - default 1000.
+
+    Applies to both CSW servers.
+    """
+    FILE_INDEX_TTL = "FILE_INDEX_TTL"
+    """The time in seconds file records found on a CSW server are served from the local file index - default 3600.
+
+    Afterwards the CSW server is queried again, e.g. to also find newly ingested files.
+    """
 
     IS_CSW_SERVER_DC = "IS_CSW_SERVER_DC"
     """The flag for a second CSW server.
@@ -176,12 +221,23 @@ def initialise_settings() -> None:
 
     settings.validators.register(
         Validator(SettingKeys.CACHE_PATH.value, must_exist=True, condition=utils.check_create_folder, when=not_doc),
+        Validator(SettingKeys.COLLECTION_CACHE_TTL.value, default=300, is_type_of=int),
+        Validator(SettingKeys.REFRESH_MAX_WORKERS.value, default=8, is_type_of=int),
+        Validator(SettingKeys.REFRESH_TIMEOUT.value, default=600, is_type_of=int),
+        Validator(SettingKeys.CACHE_MAX_AGE.value, default=86400, is_type_of=int),
+        Validator(SettingKeys.CACHE_WARMER_INTERVAL.value, default=600, is_type_of=int),
+        Validator(SettingKeys.CACHE_WARMER_JITTER.value, default=60, is_type_of=int),
+        Validator(SettingKeys.STAC_INFO_RELOAD.value, default=False, is_type_of=bool),
 
         Validator(SettingKeys.IS_CSW_SERVER.value, default=False),
         Validator(SettingKeys.CSW_SERVER.value, SettingKeys.DATA_ACCESS.value,
                   SettingKeys.GROUP_PROPERTY.value, SettingKeys.WHITELIST.value,
                   must_exist=True, when=Validator(SettingKeys.IS_CSW_SERVER.value, eq=True) & not_doc),
 
+        Validator(SettingKeys.CSW_MAX_CONNECTIONS.value, default=4, is_type_of=int),
+        Validator(SettingKeys.CSW_PAGE_SIZE.value, default=1000, is_type_of=int),
+        Validator(SettingKeys.FILE_INDEX_TTL.value, default=3600, is_type_of=int),
+
         Validator(SettingKeys.IS_CSW_SERVER_DC.value, default=False),
         Validator(SettingKeys.CSW_SERVER_DC.value, SettingKeys.DATA_ACCESS_DC.value,
                   SettingKeys.GROUP_PROPERTY_DC.value, SettingKeys.WHITELIST_DC.value,
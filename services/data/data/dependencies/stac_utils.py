@@ -1,13 +1,83 @@
-"""List of functions to add STAC fields to metadata."""
+"""List of functions to add STAC fields to metadata.
 
+The cube:dimensions and summaries of a collection are stored as static JSON files in the `jsons` folder. They are
+loaded once at import into an immutable lookup table. If the setting `STAC_INFO_RELOAD` is enabled the files are
+checked for modifications once per batch of records and reloaded if needed.
+"""
 
 import json
+import logging
 import os
-from typing import Any, Dict, List
+from copy import deepcopy
+from threading import Lock
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, Tuple
+
+from dynaconf import settings
+
+LOGGER = logging.getLogger("standardlog")
+
+JSONS_PATH = os.path.join(os.path.dirname(__file__), "jsons")
+"""The folder holding one JSON file per collection, named by the collection identifier."""
+
+
+def _get_signature(jsons_path: str) -> Tuple[Tuple[str, float], ...]:
+    """Return the name and modification time of all JSON files in the given folder."""
+    if not os.path.isdir(jsons_path):
+        return ()
+    return tuple(sorted(
+        (entry.name, entry.stat().st_mtime) for entry in os.scandir(jsons_path) if entry.name.endswith(".json")
+    ))
+
+
+def load_stac_info(jsons_path: str = JSONS_PATH) -> Mapping[str, Mapping[str, Any]]:
+    """Load the STAC metadata of all collections in the given folder.
+
+    Args:
+        jsons_path: The folder holding one JSON file per collection.
+
+    Returns:
+        A read-only mapping of each collection identifier to its STAC metadata.
+    """
+    stac_info = {}
+    for name, _ in _get_signature(jsons_path):
+        try:
+            with open(os.path.join(jsons_path, name)) as file_json:
+                stac_info[name[:-len(".json")]] = MappingProxyType(json.load(file_json))
+        except ValueError:
+            LOGGER.exception("Could not load STAC metadata from %s", name)
+    return MappingProxyType(stac_info)
+
+
+_stac_info = load_stac_info()
+_stac_info_signature = _get_signature(JSONS_PATH)
+_stac_info_lock = Lock()
+
+
+def reload_stac_info(force: bool = False) -> bool:
+    """Reload the STAC metadata if a JSON file was added, removed or modified since it was loaded.
+
+    Args:
+        force: Reload the STAC metadata even if no file changed.
+
+    Returns:
+        Whether the STAC metadata was reloaded.
+    """
+    global _stac_info, _stac_info_signature
+    with _stac_info_lock:
+        signature = _get_signature(JSONS_PATH)
+        if not force and signature == _stac_info_signature:
+            return False
+        _stac_info = load_stac_info(JSONS_PATH)
+        _stac_info_signature = signature
+    LOGGER.info("Reloaded STAC metadata of %s collections", len(_stac_info))
+    return True
 
 
 def add_non_csw_info(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
     """Add STAC metadata to collections."""
+    if settings.get("STAC_INFO_RELOAD", False):
+        reload_stac_info()
     for record in records:
         record.update(get_non_csw_info_single_record(record["id"]))
     return records
@@ -15,16 +85,5 @@ def add_non_csw_info(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
 
 def get_non_csw_info_single_record(collection_id: str) -> Dict[str, Any]:
     """Add STAC metadata to individual collection."""
-    # Add cube:dimensions and summaries
-    json_file = os.path.join(
-        os.path.dirname(__file__),
-        "jsons",
-        collection_id + ".json",
-    )
-    response = {}
-    if os.path.isfile(json_file):
-        with open(json_file) as file_json:
-            json_data = json.load(file_json)
-            for key in json_data.keys():
-                response[key] = json_data[key]
-    return response
+    # Add cube:dimensions and summaries - copied as records are modified afterwards
+    return {key: deepcopy(value) for key, value in _stac_info.get(collection_id, {}).items()}
@@ -2,14 +2,16 @@
 
 
 import logging
+from functools import partial
 from typing import Any, Dict, List, Optional, Tuple
 
 from dynaconf import settings
 from eodc_openeo_bindings.wekeo_utils import get_collection_metadata, get_filepaths
 from nameko.extensions import DependencyProvider
 
-from .cache import cache_json, get_cache_path, get_json_cache
+from .cache import get_cache, get_cache_path, get_cache_written_at, is_cache_stale, memory_cache, write_cache
 from .links import LinkHandler
+from .refresh import RefreshTask
 from .stac_utils import add_non_csw_info
 from ..models import Collection, Collections
 
@@ -62,10 +64,15 @@ class HDAHandler:
         Returns:
             dict -- The product data
         """
-        path_to_cache = get_cache_path(settings.CACHE_PATH, data_id, False, settings.DATA_ACCESS_WEKEO)
+        path_to_cache = self._get_cache_path(data_id)
+        if use_cache:
+            collection = memory_cache.get(path_to_cache)
+            if collection is not None:
+                return collection
+
         data: Dict[str, Any] = {}
         if use_cache:
-            datasets = get_json_cache(path_to_cache)
+            datasets = get_cache(path_to_cache)
             if len(datasets) == 1:
                 data = datasets[0]
         else:
@@ -77,11 +84,11 @@ class HDAHandler:
             dataset_wekeo["id"] = data_id
             datasets_with_static_info: List[Dict[str, Any]] = add_non_csw_info([dataset_wekeo])
             datasets_with_static_info = self.link_handler.get_links(datasets_with_static_info)
-            cache_json(datasets_with_static_info, path_to_cache)
+            write_cache(datasets_with_static_info, path_to_cache)
             data = datasets_with_static_info[0]
 
         if data:
-            return Collection(
+            collection = Collection(
                 stac_version=data["stac_version"],
                 id_=data["id"],
                 description=data["description"],
@@ -93,6 +100,8 @@ class HDAHandler:
                 cube_dimensions=data["cube:dimensions"],
                 summaries=data["summaries"],
             )
+            memory_cache.set(path_to_cache, collection)
+            return collection
         return None
 
     def refresh_cache(self, use_cache: bool = False) -> None:
@@ -105,6 +114,34 @@ class HDAHandler:
         LOGGER.debug("Refreshing cache %s", use_cache)
         _ = self.get_all_products(use_cache=use_cache)
 
+    def get_refresh_tasks(self, use_cache: bool = False, max_age: float = None) -> List[RefreshTask]:
+        """Return one task per whitelisted collection to refresh its cache.
+
+        Args:
+            use_cache: Specifies whether to or not to refresh the cache.
+            max_age: If set only caches older than max_age seconds are refreshed.
+
+        Returns:
+            A list of collection identifiers together with the task refreshing the cache of the collection.
+        """
+        return [(data_id, partial(self.get_product, data_id, use_cache=use_cache))
+                for data_id in settings.WHITELIST_WEKEO
+                if max_age is None or is_cache_stale(self._get_cache_path(data_id), max_age)]
+
+    def get_cache_timestamps(self) -> Dict[str, Any]:
+        """Return when the cache of each whitelisted collection was written.
+
+        Returns:
+            The time in seconds since the epoch of each collection under 'collections'. None if a cache does not
+            exist.
+        """
+        return {"collections": {data_id: get_cache_written_at(self._get_cache_path(data_id))
+                                for data_id in settings.WHITELIST_WEKEO}}
+
+    def _get_cache_path(self, data_id: str) -> str:
+        """Return the path to the cache file of a collection."""
+        return get_cache_path(settings.CACHE_PATH, data_id, False, settings.DATA_ACCESS_WEKEO)
+
     def get_filepaths(self, collection_id: str, spatial_extent: Dict, temporal_extent: List) -> Tuple[List, str]:
         """Retrieve a URL list from the WEkEO HDA according to the specified parameters.
 
@@ -9,7 +9,7 @@ xml_base = (
     "version='2.0.2' "
     "resultType='results' "
     "startPosition='{start_position}' "
-    "maxRecords='1000' "
+    "maxRecords='{max_records}' "
     "outputFormat='application/json' "
     "outputSchema='{output_schema}' "
     "xmlns:xsi='http://www.w3.org/2001/XMLSchema-instance' "
@@ -4,16 +4,23 @@ This is the main entry point to the EO data discovery.
 """
 
 import logging
+from datetime import datetime, timezone
 from pprint import pformat
-from typing import Any, Dict, List, Optional
+from random import uniform
+from time import sleep
+from typing import Any, Dict, List, Optional, Union
 
 from dynaconf import settings
+from nameko.events import EventDispatcher
 from nameko.rpc import rpc
+from nameko.timer import timer
 
+from .dependencies.cache import memory_cache, serialize_response
 from .dependencies.csw import CSWSession, CSWSessionDC
+from .dependencies.refresh import refresh_backends
 from .dependencies.settings import initialise_settings
 from .dependencies.wekeo_hda import HDASession
-from .models import Collections
+from .models import Collection, Collections
 from .schema import CollectionSchema, CollectionsSchema
 
 service_name = "data"
@@ -78,6 +85,8 @@ class DataService:
     if settings.IS_HDA_WEKEO:
         hda_session = HDASession()
         """HDAHandler dependency injected into the service."""
+    dispatch = EventDispatcher()
+    """Dispatcher of events, e.g. to notify other services about refreshed collections."""
 
     def __init__(self) -> None:
         """Initialize Data Service."""
@@ -88,7 +97,7 @@ class DataService:
         return f"DataService('{self.name}')"
 
     @rpc
-    def get_all_products(self, user: Dict[str, Any] = None) -> dict:
+    def get_all_products(self, user: Dict[str, Any] = None, serialized: bool = False) -> dict:
         """Return available datasets with basic information about them.
 
         The returned basic information includes for instance an unique identifier per dataset which can be used to get
@@ -98,6 +107,7 @@ class DataService:
 
         Args:
             user: User - determines which datasets are returned.
+            serialized: Return the compressed, pre-serialized response under 'serialized' instead of 'data'.
 
         Returns:
              A dictionary with a list of products or a serialized exception.
@@ -105,24 +115,12 @@ class DataService:
         LOGGER.info("All products requested")
         LOGGER.debug("user_id requesting %s", self._get_user_id(user))
         try:
-            all_collections = Collections(collections=[], links=[])
-            if settings.IS_CSW_SERVER:
-                csw_collections = self.csw_session.get_all_products()
-                for col in csw_collections[0]:
-                    all_collections[0].append(col)
-            if settings.IS_CSW_SERVER_DC and \
-               user and \
-               self.csw_session_dc.data_access in user["profile"]["data_access"]:
-                acube_collections = self.csw_session_dc.get_all_products()
-                for col in acube_collections[0]:
-                    all_collections[0].append(col)
-            if settings.IS_HDA_WEKEO:
-                wekeo_collections = self.hda_session.get_all_products()
-                for col in wekeo_collections[0]:
-                    all_collections[0].append(col)
-
-            response = CollectionsSchema().dump(all_collections)
+            include_dc = bool(settings.IS_CSW_SERVER_DC and user and
+                              self.csw_session_dc.data_access in user["profile"]["data_access"])
+            if serialized:
+                return {"status": "success", "code": 200, "serialized": self._get_serialized_products(include_dc)}
 
+            response = CollectionsSchema().dump(self._get_all_collections(include_dc))
             LOGGER.debug("response:\n%s", pformat(response))
             return {"status": "success", "code": 200, "data": response}
         except Exception as exp:
@@ -135,7 +133,7 @@ class DataService:
 
     @rpc
     def get_product_detail(
-            self, collection_id: str, user: Dict[str, Any] = None
+            self, collection_id: str, user: Dict[str, Any] = None, serialized: bool = False
     ) -> dict:
         """Return detailed information about a dataset.
 
@@ -144,6 +142,7 @@ class DataService:
         Args:
             user: User (optional), determines which dataset are available.
             collection_id: The identifier of a dataset.
+            serialized: Return the compressed, pre-serialized response under 'serialized' instead of 'data'.
 
         Returns:
             Detailed information about a dataset as dictionary or a serialized exception.
@@ -151,30 +150,17 @@ class DataService:
         try:
             LOGGER.info("%s product requested", collection_id)
 
-            product_record = None
-            if settings.IS_CSW_SERVER and collection_id in settings.WHITELIST:
-                product_record = self.csw_session.get_product(collection_id)
-            elif settings.IS_CSW_SERVER_DC and collection_id in settings.WHITELIST_DC:
-                product_record = self.csw_session_dc.get_product(collection_id)
-            elif settings.IS_HDA_WEKEO and collection_id in settings.WHITELIST_WEKEO:
-                product_record = self.hda_session.get_product(collection_id)
-            if not product_record:
-                return ServiceException(400, self._get_user_id(user),
-                                        f"The requested collection {collection_id} does not exist on the backend.",
-                                        internal=False, links=[]).to_dict()
-
-            # Check user permission
-            # TODO: implement better logic for checking user permissions
-            # Unauthorized
-            if collection_id in ('TUW_SIG0_S1') and not user:
-                return ServiceException(401, self._get_user_id(user), "This collection is not publicly accessible.",
-                                        internal=False, links=[]).to_dict()
-            # Forbidden (does not have permissions)
-            elif collection_id == 'TUW_SIG0_S1' and user \
-                    and self.csw_session_dc.data_access not in user["profile"]["data_access"]:
-                return ServiceException(403, self._get_user_id(user),
-                                        "User is not authorized to access this collection.", internal=False,
-                                        links=[]).to_dict()
+            product_record = self._get_product_record(collection_id, user)
+            if isinstance(product_record, ServiceException):
+                return product_record.to_dict()
+
+            if serialized:
+                cache_key = f"response:collection:{collection_id}"
+                serialized_response = memory_cache.get(cache_key)
+                if serialized_response is None:
+                    serialized_response = serialize_response(CollectionSchema().dump(product_record))
+                    memory_cache.set(cache_key, serialized_response)
+                return {"status": "success", "code": 200, "serialized": serialized_response}
 
             response = CollectionSchema().dump(product_record)
             LOGGER.debug("response:\n%s", pformat(response))
@@ -182,63 +168,253 @@ class DataService:
         except Exception as exp:
             return ServiceException(500, self._get_user_id(user), str(exp)).to_dict()
 
+    @rpc
+    def get_products_detail(self, collection_ids: List[str] = None, user: Dict[str, Any] = None) -> dict:
+        """Return detailed information about multiple datasets in a single response.
+
+        Collections which do not exist or are not accessible for the given user are skipped.
+
+        Args:
+            collection_ids: The identifiers of the datasets, all datasets if None.
+            user: User (optional), determines which dataset are available.
+
+        Returns:
+            A dictionary with the detailed information of all datasets under 'collections' or a serialized exception.
+        """
+        try:
+            if collection_ids is None:
+                collection_ids = self._get_all_collection_ids(user)
+            LOGGER.info("Products %s requested", collection_ids)
+
+            collections = []
+            for collection_id in collection_ids:
+                product_record = self._get_product_record(collection_id, user)
+                if isinstance(product_record, ServiceException):
+                    continue
+                collections.append(CollectionSchema().dump(product_record))
+
+            return {"status": "success", "code": 200, "data": {"collections": collections}}
+        except Exception as exp:
+            return ServiceException(500, self._get_user_id(user), str(exp)).to_dict()
+
     @rpc
     def refresh_cache(self, user: Dict[str, Any] = None, use_cache: bool = False) -> dict:
         """Refresh the cache of dataset information.
 
+        All backends and their collections are refreshed concurrently. A failing collection does not abort the
+        refresh, instead its error is included in the returned report.
+
         Args:
             user: User (not needed, exists for compatibility reasons)
             use_cache: Whether the existing cache is used or data is refreshed.
 
         Returns:
-            Success message or Exception.
+            Success message including a timing and error report per backend and collection or Exception.
         """
         try:
             LOGGER.info("Refresh cache requested")
-            if settings.IS_CSW_SERVER:
-                self.csw_session.refresh_cache(use_cache)
-            if settings.IS_CSW_SERVER_DC:
-                self.csw_session_dc.refresh_cache(use_cache)
-            if settings.IS_HDA_WEKEO:
-                self.hda_session.refresh_cache(use_cache)
-
+            report = refresh_backends(self._get_backends(), use_cache, max_workers=settings.REFRESH_MAX_WORKERS,
+                                      timeout=settings.REFRESH_TIMEOUT)
+            memory_cache.invalidate()
+            self.dispatch("collections_refreshed", {"collections": self._get_refreshed_collections(report)})
+
+            if all(backend_report["status"] == "success" for backend_report in report.values()):
+                message = "Successfully refreshed cache"
+            else:
+                message = "Refreshed cache with errors"
             return {
                 "status": "success",
                 "code": 200,
-                "data": {"message": "Successfully refreshed cache"},
+                "data": {"message": message, "report": report},
             }
         except Exception as exp:
             return ServiceException(500, self._get_user_id(user), str(exp)).to_dict()
 
+    @timer(interval=settings.CACHE_WARMER_INTERVAL, eager=True)
+    def warm_cache(self) -> None:
+        """Refresh the cache of all collections which is older than CACHE_MAX_AGE or missing.
+
+        Before each run a random delay of up to CACHE_WARMER_JITTER seconds is added so that replicas of the service
+        do not query the metadata backends at the same time.
+        """
+        sleep(uniform(0, settings.CACHE_WARMER_JITTER))  # noqa S311
+        try:
+            report = refresh_backends(self._get_backends(), max_workers=settings.REFRESH_MAX_WORKERS,
+                                      timeout=settings.REFRESH_TIMEOUT, max_age=settings.CACHE_MAX_AGE)
+            refreshed = sum(len(backend_report["collections"]) for backend_report in report.values())
+            if refreshed:
+                memory_cache.invalidate()
+                self.dispatch("collections_refreshed", {"collections": self._get_refreshed_collections(report)})
+            LOGGER.info("Cache warmer refreshed %s collections", refreshed)
+            LOGGER.debug("Cache warmer report:\n%s", pformat(report))
+        except Exception:
+            LOGGER.exception("Error while warming the cache")
+
+    @rpc
+    def get_cache_status(self, user: Dict[str, Any] = None) -> dict:
+        """Return when the cache of each backend and collection was refreshed the last time.
+
+        Args:
+            user: User (not needed, exists for compatibility reasons)
+
+        Returns:
+            The last refresh per backend as ISO 8601 timestamps (None if no cache exists) or a serialized exception.
+        """
+        try:
+            status = {}
+            for name, backend in self._get_backends().items():
+                timestamps = backend.get_cache_timestamps()
+                status[name] = {
+                    "collections": {collection_id: self._format_timestamp(written_at)
+                                    for collection_id, written_at in timestamps["collections"].items()}
+                }
+                if "summary" in timestamps:
+                    status[name]["summary"] = self._format_timestamp(timestamps["summary"])
+            return {"status": "success", "code": 200, "data": status}
+        except Exception as exp:
+            return ServiceException(500, self._get_user_id(user), str(exp)).to_dict()
+
+    def _get_product_record(self, collection_id: str, user: Optional[Dict[str, Any]]) \
+            -> Union[Collection, ServiceException]:
+        """Return the collection with the given identifier if it exists and the user is allowed to access it.
+
+        Args:
+            collection_id: The identifier of a dataset.
+            user: User (optional), determines which dataset are available.
+
+        Returns:
+            The collection or a ServiceException if it does not exist or is not accessible.
+        """
+        product_record = None
+        if settings.IS_CSW_SERVER and collection_id in settings.WHITELIST:
+            product_record = self.csw_session.get_product(collection_id)
+        elif settings.IS_CSW_SERVER_DC and collection_id in settings.WHITELIST_DC:
+            product_record = self.csw_session_dc.get_product(collection_id)
+        elif settings.IS_HDA_WEKEO and collection_id in settings.WHITELIST_WEKEO:
+            product_record = self.hda_session.get_product(collection_id)
+        if not product_record:
+            return ServiceException(400, self._get_user_id(user),
+                                    f"The requested collection {collection_id} does not exist on the backend.",
+                                    internal=False, links=[])
+
+        # Check user permission
+        # TODO: implement better logic for checking user permissions
+        # Unauthorized
+        if collection_id in ('TUW_SIG0_S1') and not user:
+            return ServiceException(401, self._get_user_id(user), "This collection is not publicly accessible.",
+                                    internal=False, links=[])
+        # Forbidden (does not have permissions)
+        elif collection_id == 'TUW_SIG0_S1' and user \
+                and self.csw_session_dc.data_access not in user["profile"]["data_access"]:
+            return ServiceException(403, self._get_user_id(user),
+                                    "User is not authorized to access this collection.", internal=False,
+                                    links=[])
+        return product_record
+
+    def _get_all_collections(self, include_dc: bool) -> Collections:
+        """Return the collections of all enabled backends, the data cube collections only if include_dc is set."""
+        all_collections = Collections(collections=[], links=[])
+        if settings.IS_CSW_SERVER:
+            all_collections[0].extend(self.csw_session.get_all_products()[0])
+        if include_dc:
+            all_collections[0].extend(self.csw_session_dc.get_all_products()[0])
+        if settings.IS_HDA_WEKEO:
+            all_collections[0].extend(self.hda_session.get_all_products()[0])
+        return all_collections
+
+    def _get_serialized_products(self, include_dc: bool) -> Dict[str, str]:
+        """Return the serialized response of get_all_products from the memory cache or create and cache it.
+
+        Empty responses are not cached, so a backend which was not reachable is requested again.
+        """
+        cache_key = f"response:collections:{include_dc}"
+        serialized_response = memory_cache.get(cache_key)
+        if serialized_response is None:
+            all_collections = self._get_all_collections(include_dc)
+            response = CollectionsSchema().dump(all_collections)
+            LOGGER.debug("response:\n%s", pformat(response))
+            serialized_response = serialize_response(response)
+            if all_collections.collections:
+                memory_cache.set(cache_key, serialized_response)
+        return serialized_response
+
+    def _get_all_collection_ids(self, user: Optional[Dict[str, Any]]) -> List[str]:
+        """Return the identifiers of all datasets configured on the backend which are visible for the given user."""
+        collection_ids: List[str] = []
+        if settings.IS_CSW_SERVER:
+            collection_ids.extend(settings.WHITELIST)
+        if settings.IS_CSW_SERVER_DC and user and self.csw_session_dc.data_access in user["profile"]["data_access"]:
+            collection_ids.extend(settings.WHITELIST_DC)
+        if settings.IS_HDA_WEKEO:
+            collection_ids.extend(settings.WHITELIST_WEKEO)
+        return collection_ids
+
+    def _get_backends(self) -> Dict[str, Any]:
+        """Return the handler of each configured metadata backend by name."""
+        backends: Dict[str, Any] = {}
+        if settings.IS_CSW_SERVER:
+            backends["csw"] = self.csw_session
+        if settings.IS_CSW_SERVER_DC:
+            backends["csw_dc"] = self.csw_session_dc
+        if settings.IS_HDA_WEKEO:
+            backends["wekeo"] = self.hda_session
+        return backends
+
+    def _get_refreshed_collections(self, report: Dict[str, Dict[str, Any]]) -> List[str]:
+        """Return the identifiers of all collections which were refreshed successfully according to a report."""
+        return [collection_id for backend_report in report.values()
+                for collection_id, collection_report in backend_report["collections"].items()
+                if collection_report["status"] == "success"]
+
+    def _format_timestamp(self, timestamp: Optional[float]) -> Optional[str]:
+        """Return a time in seconds since the epoch as ISO 8601 string."""
+        if timestamp is None:
+            return None
+        return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
     def _get_user_id(self, user: Optional[Dict[str, Any]]) -> Optional[str]:
         """Return the user_id if user object is set."""
         return user["id"] if user and "id" in user else None
 
     @rpc
     def get_filepaths(self, collection_id: str, spatial_extent: List[float], temporal_extent: List[str],
-                      user: Dict[str, Any] = None) -> Dict:
+                      user: Dict[str, Any] = None, cursor: str = None, limit: int = None) -> Dict:
         """Return a list of filepaths.
 
+        Filepaths can be requested in chunks using limit, the response contains the cursor of the next chunk
+        ('next_cursor', None for the last chunk) and the total number of matching filepaths ('total_count'), which is
+        counted once for the first chunk. Chunks are ordered by the begin and the filepath of the files and the cursor
+        points to the last returned file, so chunks neither skip nor repeat files - even if they are answered by
+        different instances of the service. WEkEO filepaths are always returned at once as each request starts a new
+        data request job.
+
         Keyword Arguments:
             user {Dict[str, Any]} -- The user (default: {None})
             collecion_id {str} -- identifier of the collection
             spatial_extent {List[float]} -- bounding box [ymin, xmin, ymax, ymax]
             temporal_extent {List[str]} -- e.g. ["2018-06-04", "2018-06-23"]
+            cursor {str} -- 'next_cursor' returned with the previous chunk (default: {None})
+            limit {int} -- maximum number of returned filepaths, all if None (default: {None})
 
         Returns:
             dict -- Success message or Exception
         """
         try:
-            filepaths = {}
+            filepaths: Dict[str, Any] = {"filepaths": [], "next_cursor": None, "total_count": 0}
             if settings.IS_CSW_SERVER and collection_id in settings.WHITELIST:
-                filepaths['filepaths'] = self.csw_session.get_filepaths(collection_id, spatial_extent, temporal_extent)
+                filepaths["filepaths"], filepaths["next_cursor"], filepaths["total_count"] = \
+                    self.csw_session.get_filepaths_page(collection_id, spatial_extent, temporal_extent, cursor=cursor,
+                                                        limit=limit)
             elif settings.IS_CSW_SERVER_DC and collection_id in settings.WHITELIST_DC:
-                filepaths['filepaths'] = self.csw_session_dc.get_filepaths(collection_id, spatial_extent, temporal_extent)
+                filepaths["filepaths"], filepaths["next_cursor"], filepaths["total_count"] = \
+                    self.csw_session_dc.get_filepaths_page(collection_id, spatial_extent, temporal_extent,
+                                                           cursor=cursor, limit=limit)
             elif settings.IS_HDA_WEKEO and collection_id in settings.WHITELIST_WEKEO:
-                filepaths['filepaths'], filepaths['wekeo_job_id'] = \
+                filepaths["filepaths"], filepaths['wekeo_job_id'] = \
                     self.hda_session.get_filepaths(collection_id, spatial_extent, temporal_extent)
+                filepaths["total_count"] = len(filepaths["filepaths"])
 
-            if not filepaths['filepaths']:
+            if not filepaths["filepaths"] and not cursor:
                 msg = "No filepaths were found."
                 return ServiceException(500, self._get_user_id(user), msg=msg).to_dict()
 
@@ -0,0 +1,58 @@
+"""Benchmark loading cached records in the binary format compared to the legacy json format.
+
+Creates caches with 10k STAC records similar to the ones returned by the CSW server and measures the average time
+needed to load them. This script can be directly executed with
+>>>python ./benchmark_cache.py
+"""
+
+import os
+import sys
+import tempfile
+from json import dumps
+from timeit import timeit
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from data.dependencies.cache import get_cache, get_json_cache, write_cache  # noqa I100
+
+NUMBER_RECORDS = 10000
+REPEAT = 10
+
+
+def create_record(idx: int) -> dict:
+    """Return a single record."""
+    return {
+        "stac_version": "0.9.0",
+        "id": f"S2A_MSIL1C_20180101T231121_N0206_R058_T57FWV_{idx:05d}",
+        "description": "Sentinel-2A Level-1C product",
+        "license": "proprietary",
+        "extent": {
+            "spatial": {"bbox": "[[11.279, 46.464, 11.406, 46.522]]"},
+            "temporal": {"interval": "[['2018-01-01T23:11:21Z', '2018-01-01T23:11:21Z']]"},
+        },
+        "links": [
+            {"href": f"collections/record_{idx}", "rel": "self"},
+            {"href": "collections", "rel": "parent"},
+            {"href": "collections", "rel": "root"},
+        ],
+    }
+
+
+def main() -> None:
+    """Write both cache formats and print their size and average load time."""
+    records = [create_record(idx) for idx in range(NUMBER_RECORDS)]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        binary_path = os.path.join(cache_dir, "records.cache")
+        json_path = os.path.join(cache_dir, "records.json")
+        write_cache(records, binary_path)
+        with open(json_path, "w") as f:
+            f.write(dumps(records))
+
+        for name, cache_path, load in (("json", json_path, get_json_cache), ("binary", binary_path, get_cache)):
+            assert load(cache_path) == records
+            seconds = timeit(lambda: load(cache_path), number=REPEAT) / REPEAT
+            print(f"{name:>6}: {os.path.getsize(cache_path) / 1024:8.0f} KiB {seconds * 1000:8.1f} ms")  # noqa T001
+
+
+if __name__ == "__main__":
+    main()
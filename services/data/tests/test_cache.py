@@ -0,0 +1,87 @@
+"""Holds the unittests for the caching utilities of the data service."""
+
+import gzip
+import json
+import os
+import time
+from base64 import b64decode
+from pathlib import Path
+
+from data.dependencies.cache import CACHE_SCHEMA_VERSION, MemoryCache, get_cache, is_cache_stale, \
+    read_cache_header, serialize_response, write_cache
+
+records = [{"id": "s2a_prd_msil1c", "extent": {"spatial": {"bbox": "[[-180.0, -90.0, 180.0, 90.0]]"}}}]
+
+
+def test_memory_cache_get_set() -> None:
+    """Test cached objects are returned until they are invalidated."""
+    cache = MemoryCache(ttl=60)
+    assert cache.get("collections.json") is None
+
+    cache.set("collections.json", ["collection"])
+    assert cache.get("collections.json") == ["collection"]
+
+    cache.invalidate("collections.json")
+    assert cache.get("collections.json") is None
+
+
+def test_memory_cache_invalidate_all() -> None:
+    """Test all entries are removed if no key is given."""
+    cache = MemoryCache(ttl=60)
+    cache.set("collections.json", ["collection"])
+    cache.set("s2a_prd_msil1c.json", "collection")
+
+    cache.invalidate()
+    assert cache.get("collections.json") is None
+    assert cache.get("s2a_prd_msil1c.json") is None
+
+
+def test_memory_cache_expires() -> None:
+    """Test entries older than the time to live are not returned."""
+    cache = MemoryCache(ttl=-1)
+    cache.set("collections.json", ["collection"])
+    assert cache.get("collections.json") is None
+
+
+def test_serialize_response() -> None:
+    """Test serialized responses can be decoded and the ETag only depends on the content."""
+    data = {"collections": [{"id": "s2a_prd_msil1c"}], "links": []}
+    serialized = serialize_response(data)
+
+    assert serialized["encoding"] == "gzip"
+    assert json.loads(gzip.decompress(b64decode(serialized["body"]))) == data
+    assert serialized["etag"] == serialize_response(dict(data))["etag"]
+    assert serialized["etag"] != serialize_response({"collections": [], "links": []})["etag"]
+
+
+def test_write_and_get_cache(tmp_path: Path) -> None:
+    """Test records are written to the binary format and read again."""
+    path_to_cache = str(tmp_path / "collections.cache")
+    before = time.time()
+    write_cache(records, path_to_cache)
+
+    assert get_cache(path_to_cache) == records
+    header = read_cache_header(path_to_cache)
+    assert header.schema_version == CACHE_SCHEMA_VERSION
+    assert before <= header.written_at <= time.time()
+    # No temporary files are left behind
+    assert os.listdir(str(tmp_path)) == ["collections.cache"]
+
+
+def test_get_cache_legacy_json(tmp_path: Path) -> None:
+    """Test a legacy json cache file is read if no binary cache file exists."""
+    (tmp_path / "collections.json").write_text(json.dumps(records))
+
+    assert get_cache(str(tmp_path / "collections.cache")) == records
+    assert read_cache_header(str(tmp_path / "collections.json")) is None
+    assert get_cache(str(tmp_path / "missing.cache")) == []
+
+
+def test_is_cache_stale(tmp_path: Path) -> None:
+    """Test missing and old caches are stale."""
+    path_to_cache = str(tmp_path / "collections.cache")
+    assert is_cache_stale(path_to_cache, max_age=60)
+
+    write_cache(records, path_to_cache)
+    assert not is_cache_stale(path_to_cache, max_age=60)
+    assert is_cache_stale(path_to_cache, max_age=-1)
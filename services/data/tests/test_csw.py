@@ -0,0 +1,120 @@
+"""Holds the unittests for the communication with a CSW server.
+
+A local stub CSW server is started which answers GetRecords requests with a fixed number of records and an additional
+latency per request.
+"""
+
+import json
+import re
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from threading import Thread
+from typing import Iterator
+
+import pytest
+from _pytest.tmpdir import TempPathFactory
+
+from data.dependencies.csw import CSWHandler
+
+RECORDS_MATCHED = 45
+MAX_RECORDS = 10
+LATENCY = 0.1
+CAPABILITIES = b"""<?xml version="1.0" encoding="UTF-8"?>
+<csw:Capabilities xmlns:csw="http://www.opengis.net/cat/csw/2.0.2" xmlns:ows="http://www.opengis.net/ows"
+    xmlns:xlink="http://www.w3.org/1999/xlink" version="2.0.2">
+  <ows:OperationsMetadata>
+    <ows:Operation name="GetRecords">
+      <ows:DCP><ows:HTTP><ows:Post xlink:href="http://127.0.0.1/csw"/></ows:HTTP></ows:DCP>
+    </ows:Operation>
+  </ows:OperationsMetadata>
+</csw:Capabilities>"""
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    """HTTP server handling each request in a separate thread."""
+
+    daemon_threads = True
+
+
+class StubCSWRequestHandler(BaseHTTPRequestHandler):
+    """Answers GetRecords requests similar to pycsw returning STAC JSON."""
+
+    capabilities_requests = 0
+
+    def do_GET(self) -> None:  # noqa N802
+        """Return a minimal capabilities document."""
+        StubCSWRequestHandler.capabilities_requests += 1
+        self.send_response(200)
+        self.send_header("Content-Type", "application/xml")
+        self.send_header("Content-Length", str(len(CAPABILITIES)))
+        self.end_headers()
+        self.wfile.write(CAPABILITIES)
+
+    def do_POST(self) -> None:  # noqa N802
+        """Return the page of records requested by startPosition and maxRecords."""
+        body = self.rfile.read(int(self.headers["Content-Length"])).decode()
+        start_position = int(re.search(r"startPosition='(\d+)'", body).group(1))
+        max_records = min(int(re.search(r"maxRecords='(\d+)'", body).group(1)), MAX_RECORDS)
+        last_position = min(start_position + max_records - 1, RECORDS_MATCHED)
+        next_record = last_position + 1 if last_position < RECORDS_MATCHED else 0
+        records = [{"id": f"record_{idx:03d}"} for idx in range(start_position, last_position + 1)]
+
+        time.sleep(LATENCY)
+        response = json.dumps({
+            "csw:GetRecordsResponse": {
+                "csw:SearchResults": {
+                    "@numberOfRecordsMatched": str(RECORDS_MATCHED),
+                    "@numberOfRecordsReturned": str(len(records)),
+                    "@nextRecord": str(next_record),
+                    "csw:Record": records,
+                }
+            }
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(response)))
+        self.end_headers()
+        self.wfile.write(response)
+
+    def log_message(self, *args: str) -> None:
+        """Do not log requests."""
+
+
+@pytest.fixture(scope="module")
+def csw_server_uri() -> Iterator[str]:
+    """Start a stub CSW server in a background thread and return its URI."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubCSWRequestHandler)
+    thread = Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def get_csw_handler(csw_server_uri: str, cache_path: str, max_connections: int) -> CSWHandler:
+    """Return a CSWHandler connected to the stub CSW server."""
+    return CSWHandler(csw_server_uri=csw_server_uri, data_access="public", group_property="apiso:ParentIdentifier",
+                      white_list=["s2a_prd_msil1c"], cache_path=cache_path, max_connections=max_connections)
+
+
+@pytest.mark.parametrize("max_connections", [1, 4])
+def test_get_records_all_pages(csw_server_uri: str, tmp_path_factory: TempPathFactory, max_connections: int) -> None:
+    """Test all pages are collected in the order of the server."""
+    cache_path = str(tmp_path_factory.mktemp("cache"))
+    csw_handler = get_csw_handler(csw_server_uri, cache_path, max_connections)
+
+    records = csw_handler._get_records("s2a_prd_msil1c", use_cache=False)
+    assert [record["id"] for record in records] == [f"record_{idx:03d}" for idx in range(1, RECORDS_MATCHED + 1)]
+
+
+def test_capabilities_requested_once(csw_server_uri: str, tmp_path_factory: TempPathFactory) -> None:
+    """Test the capabilities document is only requested once per handler."""
+    cache_path = str(tmp_path_factory.mktemp("cache"))
+    csw_handler = get_csw_handler(csw_server_uri, cache_path, max_connections=1)
+    requests_before = StubCSWRequestHandler.capabilities_requests
+
+    first, second = csw_handler._get_catalogue(), csw_handler._get_catalogue()
+    assert first is not second
+    assert first.get_operation_by_name("GetRecords").methods[0]["url"] == "http://127.0.0.1/csw"
+    assert StubCSWRequestHandler.capabilities_requests - requests_before == 1
+    csw_handler.close()
@@ -226,11 +226,23 @@ def test_get_product_detail() -> None:
     }
 
 
+def test_get_products_detail() -> None:
+    """Test get details about multiple products in a single request."""
+    data_service = worker_factory(DataService)
+    data_service.csw_session.get_product.return_value = collection_model
+    result = data_service.get_products_detail(collection_ids=["s2a_prd_msil1c", "unknown_collection"])
+    assert result == {
+        "status": "success",
+        "code": 200,
+        "data": {"collections": [collection_dict]},
+    }
+
+
 def test_get_filepaths() -> None:
     """Test get filepaths for a given configuration."""
     data_service = worker_factory(DataService)
 
-    data_service.csw_session.get_filepaths.return_value = filepaths_response
+    data_service.csw_session.get_filepaths_page.return_value = filepaths_response, None, len(filepaths_response)
     collection_id = "s2a_prd_msil1c"
     spatial_extent = [46.464349400461145, 11.279182434082033, 46.522729291844286, 11.406898498535158]
     temporal_extent = ["2018-06-04", "2018-06-23"]
@@ -239,11 +251,13 @@ def test_get_filepaths() -> None:
         "status": "success",
         "code": 200,
         "data": {
-            "filepaths": filepaths_response
+            "filepaths": filepaths_response,
+            "next_cursor": None,
+            "total_count": len(filepaths_response),
         }
     }
 
-    data_service.csw_session_dc.get_filepaths.return_value = filepaths_response_dc
+    data_service.csw_session_dc.get_filepaths_page.return_value = filepaths_response_dc, None, len(filepaths_response_dc)
     collection_id = "SIG0"
     spatial_extent = [48.06, 16.06, 48.35, 16.65]
     temporal_extent = ["2017-03-01", "2017-03-03"]
@@ -252,7 +266,9 @@ def test_get_filepaths() -> None:
         "status": "success",
         "code": 200,
         "data": {
-            "filepaths": filepaths_response_dc
+            "filepaths": filepaths_response_dc,
+            "next_cursor": None,
+            "total_count": len(filepaths_response_dc),
         }
     }
 
@@ -266,6 +282,27 @@ def test_get_filepaths() -> None:
         "code": 200,
         "data": {
             "filepaths": filepaths_response_wekeo[0],
-            "wekeo_job_id": filepaths_response_wekeo[1]
+            "wekeo_job_id": filepaths_response_wekeo[1],
+            "next_cursor": None,
+            "total_count": len(filepaths_response_wekeo[0]),
         }
     }
+
+
+def test_get_filepaths_chunks() -> None:
+    """Test filepaths are returned in chunks together with the cursor of the next chunk and the total count."""
+    data_service = worker_factory(DataService)
+    data_service.csw_session.get_filepaths_page.side_effect = [
+        (filepaths_response[:3], "cursor-1", 4),
+        (filepaths_response[3:], None, 4),
+    ]
+    collection_id = "s2a_prd_msil1c"
+    spatial_extent = [46.464349400461145, 11.279182434082033, 46.522729291844286, 11.406898498535158]
+    temporal_extent = ["2018-06-04", "2018-06-23"]
+
+    result = data_service.get_filepaths(collection_id, spatial_extent, temporal_extent, limit=3)
+    assert result["data"] == {"filepaths": filepaths_response[:3], "next_cursor": "cursor-1", "total_count": 4}
+    result = data_service.get_filepaths(collection_id, spatial_extent, temporal_extent, cursor="cursor-1", limit=3)
+    assert result["data"] == {"filepaths": filepaths_response[3:], "next_cursor": None, "total_count": 4}
+    data_service.csw_session.get_filepaths_page.assert_called_with(collection_id, spatial_extent, temporal_extent,
+                                                                   cursor="cursor-1", limit=3)
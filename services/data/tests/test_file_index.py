@@ -0,0 +1,213 @@
+"""Holds the unittests for the local file index used when searching for filepaths."""
+
+from pathlib import Path
+from time import monotonic
+from types import SimpleNamespace
+from typing import Any, Iterator, List
+
+from data.dependencies.csw import CSWHandler
+from data.dependencies.file_index import FileIndex, FileRecord, decode_cursor, encode_cursor, get_file_index, \
+    parse_time
+
+bbox = (46.46, 11.27, 46.52, 11.40)
+
+
+def get_record(filepath: str, time: str, record_bbox: tuple = bbox) -> FileRecord:
+    """Return an exact record with the same begin and end."""
+    return FileRecord(begin=parse_time(time), end=parse_time(time), bbox=record_bbox, filepath=filepath)
+
+
+def test_query() -> None:
+    """Test records are filtered by time and footprint."""
+    file_index = FileIndex(ttl=60)
+    begin, end = parse_time("2018-06-01"), parse_time("2018-07-01")
+    file_index.add([
+        get_record("/s2a/2018/06/21/file_3.zip", "2018-06-21T10:20:21Z"),
+        get_record("/s2a/2018/06/08/file_1.zip", "2018-06-08T10:10:21Z"),
+        get_record("/s2a/2018/06/11/file_2.zip", "2018-06-11T10:20:21Z", (10.0, 10.0, 11.0, 11.0)),
+    ], bbox, begin, end)
+
+    assert file_index.query(bbox, begin, end) == ["/s2a/2018/06/08/file_1.zip", "/s2a/2018/06/21/file_3.zip"]
+    assert file_index.query(bbox, parse_time("2018-06-10"), end) == ["/s2a/2018/06/21/file_3.zip"]
+    assert file_index.query((10.5, 10.5, 12.0, 12.0), begin, end) == ["/s2a/2018/06/11/file_2.zip"]
+
+
+def test_get_missing_intervals() -> None:
+    """Test only time ranges not covered for the queried bounding box are missing."""
+    file_index = FileIndex(ttl=60)
+    file_index.add([], bbox, parse_time("2018-06-10"), parse_time("2018-06-20"))
+
+    assert file_index.get_missing_intervals(bbox, parse_time("2018-06-12"), parse_time("2018-06-18")) == []
+    assert file_index.get_missing_intervals(bbox, parse_time("2018-06-01"), parse_time("2018-06-30")) == [
+        (parse_time("2018-06-01"), parse_time("2018-06-10")),
+        (parse_time("2018-06-20"), parse_time("2018-06-30")),
+    ]
+    larger_bbox = (46.0, 11.0, 47.0, 12.0)
+    assert file_index.get_missing_intervals(larger_bbox, parse_time("2018-06-12"), parse_time("2018-06-18")) == [
+        (parse_time("2018-06-12"), parse_time("2018-06-18")),
+    ]
+
+
+def test_coverage_expires() -> None:
+    """Test expired coverage is requested again."""
+    file_index = FileIndex(ttl=-1)
+    begin, end = parse_time("2018-06-01"), parse_time("2018-07-01")
+    file_index.add([get_record("/s2a/2018/06/08/file_1.zip", "2018-06-08T10:10:21Z")], bbox, begin, end)
+
+    assert file_index.get_missing_intervals(bbox, begin, end) == [(begin, end)]
+    assert file_index.query(bbox, begin, end) == []
+
+
+def test_records_crossing_coverage_border() -> None:
+    """Test a record overlapping two coverages is returned for a query containing it."""
+    file_index = FileIndex(ttl=60)
+    record = FileRecord(begin=parse_time("2018-06-08"), end=parse_time("2018-06-12"), bbox=bbox,
+                        filepath="/s2a/2018/06/08/file_1.zip")
+    # The CSW server returns all records overlapping the queried time range
+    file_index.add([record], bbox, parse_time("2018-06-10"), parse_time("2018-06-20"))
+    assert file_index.query(bbox, parse_time("2018-06-10"), parse_time("2018-06-20")) == []
+
+    begin, end = parse_time("2018-06-01"), parse_time("2018-06-20")
+    assert file_index.get_missing_intervals(bbox, begin, end) == [(begin, parse_time("2018-06-10"))]
+    file_index.add([record], bbox, begin, parse_time("2018-06-10"))
+    assert file_index.query(bbox, begin, end) == ["/s2a/2018/06/08/file_1.zip"]
+
+
+def test_records_expire_with_coverage() -> None:
+    """Test only records not overlapping any remaining coverage are evicted."""
+    file_index = FileIndex(ttl=60)
+    file_index.add([get_record("/s2a/2018/06/08/file_1.zip", "2018-06-08T10:10:21Z")],
+                   bbox, parse_time("2018-06-01"), parse_time("2018-06-10"))
+    file_index.add([get_record("/s2a/2018/06/21/file_3.zip", "2018-06-21T10:20:21Z")],
+                   bbox, parse_time("2018-06-20"), parse_time("2018-06-30"))
+    file_index._coverage[0] = file_index._coverage[0]._replace(created_at=monotonic() - 120)
+
+    begin, end = parse_time("2018-06-01"), parse_time("2018-07-01")
+    assert file_index.get_missing_intervals(bbox, begin, end) == [
+        (begin, parse_time("2018-06-20")),
+        (parse_time("2018-06-30"), end),
+    ]
+    assert file_index.query(bbox, begin, end) == ["/s2a/2018/06/21/file_3.zip"]
+
+
+def test_add_records_replaces_inexact_records() -> None:
+    """Test records are added in order once and an inexact record is replaced by the exact one."""
+    file_index = FileIndex(ttl=60)
+    begin, end = parse_time("2018-06-01"), parse_time("2018-07-01")
+    file_index.add_records([FileRecord(begin=begin, end=end, bbox=bbox, filepath="/s2a/2018/06/11/file_2.zip",
+                                       exact=False)])
+    file_index.add_records([
+        get_record(f"/s2a/2018/06/{day:02}/file_{day}.zip", f"2018-06-{day:02}T10:20:21Z") for day in (21, 8, 11, 8)
+    ] + [get_record("/s2a/2018/06/11/file_2.zip", "2018-06-11T10:20:21Z")])
+
+    assert file_index.query(bbox, parse_time("2018-05-01"), parse_time("2018-08-01")) == [
+        "/s2a/2018/06/08/file_8.zip", "/s2a/2018/06/11/file_11.zip", "/s2a/2018/06/11/file_2.zip",
+        "/s2a/2018/06/21/file_21.zip",
+    ]
+    assert file_index.query(bbox, parse_time("2018-06-10"), parse_time("2018-06-12")) == [
+        "/s2a/2018/06/11/file_11.zip", "/s2a/2018/06/11/file_2.zip",
+    ]
+
+
+def test_query_grid_cells() -> None:
+    """Test records touching several grid cells and wide records are found once by queries of any size."""
+    file_index = FileIndex(ttl=60)
+    begin, end = parse_time("2018-06-01"), parse_time("2018-07-01")
+    file_index.add([
+        get_record("/s2a/2018/06/08/file_1.zip", "2018-06-08T10:10:21Z"),
+        get_record("/s2a/2018/06/09/file_2.zip", "2018-06-09T10:10:21Z", (46.9, 11.9, 47.1, 12.1)),
+        get_record("/s2a/2018/06/10/file_3.zip", "2018-06-10T10:10:21Z", (10.0, 10.0, 11.0, 11.0)),
+        get_record("/s2a/2018/06/11/file_4.zip", "2018-06-11T10:10:21Z", (-90.0, -180.0, 90.0, 180.0)),
+    ], (-90.0, -180.0, 90.0, 180.0), begin, end)
+
+    assert file_index.query(bbox, begin, end) == ["/s2a/2018/06/08/file_1.zip", "/s2a/2018/06/11/file_4.zip"]
+    assert file_index.query((47.0, 12.0, 47.0, 12.0), begin, end) == [
+        "/s2a/2018/06/09/file_2.zip", "/s2a/2018/06/11/file_4.zip",
+    ]
+    assert file_index.query((0.0, 0.0, 50.0, 50.0), begin, end) == [
+        "/s2a/2018/06/08/file_1.zip", "/s2a/2018/06/09/file_2.zip", "/s2a/2018/06/10/file_3.zip",
+        "/s2a/2018/06/11/file_4.zip",
+    ]
+    assert file_index.count((46.0, 11.0, 47.5, 12.5), begin, end) == 3
+
+
+def test_query_pages() -> None:
+    """Test pages continue behind the last returned record even if records were added in between."""
+    file_index = FileIndex(ttl=60)
+    begin, end = parse_time("2018-06-01"), parse_time("2018-07-01")
+    file_index.add([get_record(f"/s2a/2018/06/{day:02}/file_{day}.zip", f"2018-06-{day:02}T10:20:21Z")
+                    for day in (8, 11, 21, 25)], bbox, begin, end)
+
+    filepaths, last_key = file_index.query_page(bbox, begin, end, limit=2)
+    assert filepaths == ["/s2a/2018/06/08/file_8.zip", "/s2a/2018/06/11/file_11.zip"]
+    assert decode_cursor(encode_cursor(last_key, 4)) == (last_key, 4)
+
+    file_index.add_records([get_record("/s2a/2018/06/09/file_9.zip", "2018-06-09T10:20:21Z")])
+    filepaths, last_key = file_index.query_page(bbox, begin, end, after=last_key, limit=2)
+    assert filepaths == ["/s2a/2018/06/21/file_21.zip", "/s2a/2018/06/25/file_25.zip"]
+    assert last_key is None
+
+
+def test_get_filepaths_uses_index(tmp_path: Path, monkeypatch: Any) -> None:
+    """Test the CSW server is only queried for time ranges not covered by the index."""
+    csw_handler = CSWHandler(csw_server_uri="http://csw.test", data_access="public",
+                             group_property="apiso:ParentIdentifier", white_list=["s2a_prd_msil1c"],
+                             cache_path=str(tmp_path))
+    queries: List[List[str]] = []
+
+    def iter_file_records(collection_id: str, spatial_extent: List[float], temporal_extent: List[str]
+                          ) -> Iterator[list]:
+        queries.append(temporal_extent)
+        yield [SimpleNamespace(references=[{"url": "/s2a/2018/06/08/file_1.zip"}], temporal="2018-06-08T10:10:21Z",
+                               date=None, bbox=SimpleNamespace(minx="46.4", miny="11.2", maxx="46.6", maxy="11.5"))]
+        yield [SimpleNamespace(references=[{"url": "/s2a/2018/06/11/file_2.zip"}], temporal=None, date=None,
+                               bbox=None)]
+    monkeypatch.setattr(csw_handler, "_iter_file_records", iter_file_records)
+
+    spatial_extent = list(bbox)
+    filepaths = csw_handler.get_filepaths("s2a_prd_msil1c", spatial_extent, ["2018-06-04", "2018-06-23"])
+    # The record without temporal extent begins with the query
+    assert filepaths == ["/s2a/2018/06/11/file_2.zip", "/s2a/2018/06/08/file_1.zip"]
+    assert queries == [["2018-06-04", "2018-06-23"]]
+
+    filepaths = csw_handler.get_filepaths("s2a_prd_msil1c", spatial_extent, ["2018-06-04", "2018-06-23"])
+    assert filepaths == ["/s2a/2018/06/11/file_2.zip", "/s2a/2018/06/08/file_1.zip"]
+    assert len(queries) == 1
+
+    # Only the exact record can be returned for a smaller time range
+    filepaths = csw_handler.get_filepaths("s2a_prd_msil1c", spatial_extent, ["2018-06-05", "2018-06-20"])
+    assert filepaths == ["/s2a/2018/06/08/file_1.zip"]
+    assert len(queries) == 1
+
+    csw_handler.get_filepaths("s2a_prd_msil1c", spatial_extent, ["2018-06-04", "2018-06-30"])
+    assert queries[1] == ["2018-06-23T00:00:00Z", "2018-06-30"]
+
+
+def test_get_filepaths_pages_total_count(tmp_path: Path, monkeypatch: Any) -> None:
+    """Test every page carries the number of filepaths matching the query in the index."""
+    csw_handler = CSWHandler(csw_server_uri="http://csw.pages", data_access="public",
+                             group_property="apiso:ParentIdentifier", white_list=["s2a_prd_msil1c"],
+                             cache_path=str(tmp_path))
+
+    def iter_file_records(collection_id: str, spatial_extent: List[float], temporal_extent: List[str]
+                          ) -> Iterator[list]:
+        yield [SimpleNamespace(references=[{"url": f"/s2a/2018/06/{day:02}/file_{day}.zip"}],
+                               temporal=f"2018-06-{day:02}T10:20:21Z", date=None,
+                               bbox=SimpleNamespace(minx="46.4", miny="11.2", maxx="46.6", maxy="11.5"))
+               for day in (8, 11, 21, 25, 28)]
+    monkeypatch.setattr(csw_handler, "_iter_file_records", iter_file_records)
+
+    spatial_extent, temporal_extent = list(bbox), ["2018-06-04", "2018-06-26"]
+    file_index = get_file_index("http://csw.pages/s2a_prd_msil1c", ttl=csw_handler.file_index_ttl)
+    filepaths, cursor, total_count = csw_handler.get_filepaths_page("s2a_prd_msil1c", spatial_extent,
+                                                                    temporal_extent, limit=3)
+    assert total_count == len(file_index.query(bbox, parse_time("2018-06-04"), parse_time("2018-06-26"))) == 4
+    assert len(filepaths) == 3
+
+    # Records added after the first page do not change the count of the query
+    file_index.add_records([get_record("/s2a/2018/06/09/file_9.zip", "2018-06-09T10:20:21Z")])
+    filepaths, cursor, total_count = csw_handler.get_filepaths_page("s2a_prd_msil1c", spatial_extent,
+                                                                    temporal_extent, cursor=cursor, limit=3)
+    assert filepaths == ["/s2a/2018/06/25/file_25.zip"]
+    assert cursor is None
+    assert total_count == 4
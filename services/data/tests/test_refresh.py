@@ -0,0 +1,66 @@
+"""Holds the unittests for refreshing the cache of multiple backends."""
+
+import time
+from typing import Any, Callable, Dict, List, Tuple
+
+from data.dependencies.refresh import refresh_backends
+
+
+class MockBackend:
+    """Backend returning a task per given collection."""
+
+    def __init__(self, collections: Dict[str, Callable[[], Any]]) -> None:
+        """Initialise MockBackend with a task per collection identifier."""
+        self.collections = collections
+
+    def get_refresh_tasks(self, use_cache: bool = False, max_age: float = None) \
+            -> List[Tuple[str, Callable[[], Any]]]:
+        """Return the task of each collection."""
+        return list(self.collections.items())
+
+
+class FailingBackend:
+    """Backend failing while refreshing its collection summary."""
+
+    def get_refresh_tasks(self, use_cache: bool = False, max_age: float = None) \
+            -> List[Tuple[str, Callable[[], Any]]]:
+        """Raise an error."""
+        raise ValueError("CSW server not reachable")
+
+
+def fail() -> None:
+    """Raise an error."""
+    raise ValueError("Collection not found")
+
+
+def test_refresh_backends_report() -> None:
+    """Test errors of single collections and backends do not abort the refresh of other collections."""
+    backends = {
+        "csw": MockBackend({"s2a_prd_msil1c": lambda: None, "s2b_prd_msil1c": fail}),
+        "csw_dc": FailingBackend(),
+        "wekeo": MockBackend({"EO:ESA:DAT:SENTINEL-5P:TROPOMI:L2__NO2___": lambda: None}),
+    }
+    report = refresh_backends(backends)
+
+    assert report["csw"]["status"] == "error"
+    assert report["csw"]["collections"]["s2a_prd_msil1c"]["status"] == "success"
+    assert "duration" in report["csw"]["collections"]["s2a_prd_msil1c"]
+    assert report["csw"]["collections"]["s2b_prd_msil1c"] == {"status": "error", "error": "Collection not found"}
+    assert report["csw_dc"]["status"] == "error"
+    assert report["csw_dc"]["error"] == "CSW server not reachable"
+    assert report["csw_dc"]["collections"] == {}
+    assert report["wekeo"]["status"] == "success"
+
+
+def test_refresh_backends_concurrent_with_timeout() -> None:
+    """Test collections are refreshed concurrently and slow collections time out."""
+    backends = {
+        "csw": MockBackend({f"collection_{idx}": lambda: time.sleep(0.2) for idx in range(4)}),
+        "wekeo": MockBackend({"slow_collection": lambda: time.sleep(2)}),
+    }
+    start = time.monotonic()
+    report = refresh_backends(backends, max_workers=8, timeout=1)
+
+    assert time.monotonic() - start < 1.5
+    assert report["csw"]["status"] == "success"
+    assert report["wekeo"]["collections"]["slow_collection"] == {"status": "error", "error": "Timed out."}
@@ -0,0 +1,32 @@
+"""Holds the unittests for adding static STAC metadata to collections."""
+
+import json
+from pathlib import Path
+from typing import Any
+
+from data.dependencies import stac_utils
+
+
+def test_add_non_csw_info() -> None:
+    """Test STAC metadata is added from the lookup table without modifying it."""
+    records = stac_utils.add_non_csw_info([{"id": "s2a_prd_msil1c"}, {"id": "unknown_collection"}])
+
+    assert "cube:dimensions" in records[0]
+    assert records[1] == {"id": "unknown_collection"}
+
+    records[0]["cube:dimensions"].clear()
+    assert stac_utils.get_non_csw_info_single_record("s2a_prd_msil1c")["cube:dimensions"]
+
+
+def test_reload_stac_info(tmp_path: Path, monkeypatch: Any) -> None:
+    """Test STAC metadata is only reloaded if a file changed."""
+    monkeypatch.setattr(stac_utils, "JSONS_PATH", str(tmp_path))
+    monkeypatch.setattr(stac_utils, "_stac_info", stac_utils._stac_info)
+    monkeypatch.setattr(stac_utils, "_stac_info_signature", stac_utils._stac_info_signature)
+
+    (tmp_path / "test_collection.json").write_text(json.dumps({"summaries": {"platform": ["sentinel-2a"]}}))
+    assert stac_utils.reload_stac_info()
+    assert not stac_utils.reload_stac_info()
+    assert stac_utils.get_non_csw_info_single_record("test_collection") == {
+        "summaries": {"platform": ["sentinel-2a"]}
+    }
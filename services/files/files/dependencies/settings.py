@@ -29,6 +29,9 @@ class SettingKeys(Enum):
     setup may not work.
     """
 
+    DELETE_MAX_WORKERS = "DELETE_MAX_WORKERS"
+    """The maximum number of job folders deleted at the same time when deleting many jobs at once - default 4."""
+
     # Connection to RabbitMQ
     RABBIT_HOST = "RABBIT_HOST"
     """The host name of the RabbitMQ - e.g. `rabbitmq`.
@@ -82,6 +85,7 @@ def initialise_settings() -> None:
         Validator(SettingKeys.OPENEO_FILES_DIR.value, must_exist=True, condition=utils.check_create_folder,
                   when=not_doc),
         Validator(SettingKeys.UPLOAD_TMP_DIR.value, must_exist=True, condition=utils.check_create_folder, when=not_doc),
+        Validator(SettingKeys.DELETE_MAX_WORKERS.value, default=4, is_type_of=int, gte=1, when=not_doc),
 
         Validator(SettingKeys.RABBIT_HOST.value, must_exist=True, when=not_doc_unittest),
         Validator(SettingKeys.RABBIT_PORT.value, must_exist=True, is_type_of=int, when=not_doc_unittest),
@@ -0,0 +1,56 @@
+"""Provides keyset pagination for listings of files.
+
+Files are ordered by their path. A page is requested with a `limit` and a `cursor` holding the path of the last file
+of the previous page. The limit check and the openEO links match the pagination of the jobs and processes services.
+"""
+
+from typing import List, Optional, Tuple
+from urllib.parse import urlencode
+
+
+def check_limit(limit: Optional[int]) -> None:
+    """Check the requested number of entries per page.
+
+    Raises:
+        ValueError: The limit is not a positive integer.
+    """
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+        raise ValueError(f"The limit '{limit}' is not a positive integer.")
+
+
+def paginate(filepaths: List[str], limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> Tuple[List[str], Optional[str]]:
+    """Return a page of the sorted filepaths together with the cursor of the next page.
+
+    Args:
+        filepaths: All filepaths sorted ascending.
+        limit: The maximum number of returned filepaths, all remaining filepaths if None.
+        cursor: The cursor returned with the previous page, starts at the first filepath if None.
+
+    Returns:
+        The filepaths of the page and the cursor of the next page, None if this is the last page.
+
+    Raises:
+        ValueError: The limit is not valid.
+    """
+    check_limit(limit)
+    if cursor:
+        filepaths = [filepath for filepath in filepaths if filepath > cursor]
+    if limit is None or len(filepaths) <= limit:
+        return filepaths, None
+    return filepaths[:limit], filepaths[limit - 1]
+
+
+def get_next_links(endpoint: str, limit: Optional[int], next_cursor: Optional[str]) -> List[dict]:
+    """Return the openEO pagination links of a listing.
+
+    The link is relative to the API version root (e.g. 'files?limit=10&cursor=...') and resolved by the gateway.
+
+    Args:
+        endpoint: The endpoint of the listing, e.g. 'files'.
+        limit: The number of entries per page.
+        next_cursor: The cursor of the next page, no link is returned if None.
+    """
+    if next_cursor is None:
+        return []
+    return [{"rel": "next", "href": f"{endpoint}?{urlencode({'limit': limit, 'cursor': next_cursor})}"}]
@@ -5,6 +5,7 @@ import logging
 import os
 import re
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from os.path import dirname
 from typing import Any, Dict, List, Optional, Union
@@ -14,6 +15,7 @@ from nameko.rpc import rpc
 from werkzeug.security import safe_join
 
 from .dependencies.settings import initialise_settings
+from .pagination import check_limit, get_next_links, paginate
 
 service_name = "files"
 LOGGER = logging.getLogger('standardlog')
@@ -150,39 +152,54 @@ class FilesService:
             return ServiceException(500, user["id"], str(exp), links=[]).to_dict()
 
     @rpc
-    def get_all(self, user: Dict[str, Any]) -> dict:
+    def get_all(self, user: Dict[str, Any], limit: int = None, cursor: str = None) -> dict:
         """Get all available files for the given user.
 
+        If a limit is given only one page of files is returned together with a link to the next page. Files are
+        ordered by path, the cursor of the next page is the path of the last file of the previous page.
+
         Args:
             user: The user object to get list of files for.
+            limit: The maximum number of files to return (optional).
+            cursor: The cursor to the next page as returned in the 'next' link of the previous page (optional).
 
         Returns:
             A sorted list of files available in the user's files folder or a serilized service exception. (No computed
             but uploaded data only!)
         """
         try:
-            prefix, _ = self.setup_user_folder(user["id"])
-            file_list = []
+            try:
+                check_limit(limit)
+            except ValueError as exp:
+                return ServiceException(400, user["id"], str(exp), internal=False,
+                                        links=["#tag/File-Management/paths/~1files/get"]).to_dict()
 
+            prefix, _ = self.setup_user_folder(user["id"])
+            filepaths = []
             for root, _, files in os.walk(prefix):
                 user_root = root[len(prefix) + 1:]
                 for f in files:
-                    public_filepath = os.path.join(user_root, f)
-                    internal_filepath = os.path.join(root, f)
-                    file_list.append(
-                        {
-                            "path": public_filepath,
-                            "size": int(os.path.getsize(internal_filepath)),
-                            "modified": self.get_file_modification_time(internal_filepath)
-                        }
-                    )
+                    filepaths.append(os.path.join(user_root, f))
+            filepaths, next_cursor = paginate(sorted(filepaths), limit, cursor)
+
+            # Only the files of the requested page are accessed
+            file_list = []
+            for public_filepath in filepaths:
+                internal_filepath = os.path.join(prefix, public_filepath)
+                file_list.append(
+                    {
+                        "path": public_filepath,
+                        "size": int(os.path.getsize(internal_filepath)),
+                        "modified": self.get_file_modification_time(internal_filepath)
+                    }
+                )
             LOGGER.info(f"Found {len(file_list)} files in workspace of User {user['id']}.")
             return {
                 "status": "success",
                 "code": 200,
                 "data": {
-                    "files": sorted(file_list, key=lambda file: file['path']),
-                    "links": [],
+                    "files": file_list,
+                    "links": get_next_links("files", limit, next_cursor),
                 }
             }
 
@@ -463,6 +480,38 @@ class FilesService:
         shutil.rmtree(job_folder)
         LOGGER.info(f"Complete job folder for job {job_id} deleted.")
 
+    @rpc
+    def delete_complete_jobs(self, jobs: List[Dict[str, str]]) -> List[str]:
+        """Delete the complete job folders of many jobs.
+
+        At most DELETE_MAX_WORKERS folders are deleted at the same time. A job folder which does not exist (anymore)
+        counts as deleted.
+
+        Args:
+            jobs: A list of dictionaries containing the user_id and job_id of each job.
+
+        Returns:
+            The ids of the jobs whose folders were deleted.
+        """
+        if not jobs:
+            return []
+
+        def delete_job(job: Dict[str, str]) -> bool:
+            try:
+                job_folder = self.get_job_id_folder(job["user_id"], job["job_id"])
+                if os.path.isdir(job_folder):
+                    shutil.rmtree(job_folder)
+                return True
+            except Exception as exp:
+                LOGGER.error(f"Job folder for job {job['job_id']} could not be deleted: {exp}")
+                return False
+
+        max_workers = min(settings.DELETE_MAX_WORKERS, len(jobs))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            deleted = [job["job_id"] for job, ok in zip(jobs, executor.map(delete_job, jobs)) if ok]
+        LOGGER.info(f"Complete job folders of {len(deleted)} of {len(jobs)} jobs deleted.")
+        return deleted
+
     @rpc
     def delete_job_without_results(self, user_id: str, job_id: str) -> bool:
         """Delete everything in the job folder but the results folder of the given job.
@@ -497,10 +546,14 @@ class FilesService:
 
         return os.listdir(job_result_folder) != 0
 
+    @rpc
     def delete_job_run(self, user_id: str, job_id: str, job_run: str) -> None:
         """Delete a given job run."""
         job_id_folder = self.get_job_id_folder(user_id, job_id)
         job_run_folder = os.path.join(job_id_folder, job_run)
+        if not os.path.isdir(job_run_folder):
+            LOGGER.info(f"Job run {job_run} of Job ID {job_id} does not exist.")
+            return
         shutil.rmtree(job_run_folder)
         LOGGER.info(f"Job run {job_run} of Job ID {job_id} successfully deleted.")
 
@@ -572,6 +625,12 @@ class FilesService:
         """
         return f"jr-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}"
 
+    @rpc
+    def get_job_run_folder_names(self, user_id: str, job_id: str) -> List[str]:
+        """Return the sorted folder names of all job runs of a job, the latest one is last."""
+        job_id_folder = self.get_job_id_folder(user_id, job_id)
+        return [folder_path.split(os.sep)[-1] for folder_path in sorted(glob.glob(job_id_folder + '/*'))]
+
     @rpc
     def get_latest_job_run_folder_name(self, user_id: str, job_id: str) -> str:
         """Get the folder name of the latest job run."""
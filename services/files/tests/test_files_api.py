@@ -89,6 +89,28 @@ def test_get_all(user_id_folder: Tuple[str, str], upload_file: str) -> None:
             'links': []}}
 
 
+def test_get_all_pages(user_id_folder: Tuple[str, str], upload_file: str) -> None:
+    """Retrieve the files page by page following the next links."""
+    user_folder, user_id = user_id_folder
+    user = create_user(user_id)
+
+    folders = os.path.join(user_folder, 'files', 'folder1')
+    os.makedirs(folders)
+    for filepath in ['1.txt', 'folder1/2.txt', 'folder1/3.txt']:
+        shutil.copyfile(upload_file, os.path.join(user_folder, 'files', filepath))
+
+    result = file_service.get_all(user=user, limit=2)
+    assert [file['path'] for file in result['data']['files']] == ['1.txt', 'folder1/2.txt']
+    assert result['data']['links'] == [{'rel': 'next', 'href': 'files?limit=2&cursor=folder1%2F2.txt'}]
+
+    result = file_service.get_all(user=user, limit=2, cursor='folder1/2.txt')
+    assert [file['path'] for file in result['data']['files']] == ['folder1/3.txt']
+    assert result['data']['links'] == []
+
+    result = file_service.get_all(user=user, limit=0)
+    assert result['code'] == 400
+
+
 def test_download(user_id_folder: Tuple[str, str], upload_file: str) -> None:
     """Test upload and download of file."""
     user_folder, user_id = user_id_folder
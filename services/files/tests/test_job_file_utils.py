@@ -100,6 +100,17 @@ def test_delete_complete_job(user_id_folder: Tuple[str, str], upload_file: str)
     assert not isfile(file_results)
 
 
+def test_delete_complete_jobs(user_id_folder: Tuple[str, str], upload_file: str) -> None:
+    """Test the folders of all given jobs are deleted and missing folders count as deleted."""
+    user_folder, user_id = user_id_folder
+    file_results, file1, file2 = create_job(user_folder, user_id, upload_file)
+    deleted = file_service.delete_complete_jobs(jobs=[{"user_id": user_id, "job_id": "test-job"},
+                                                      {"user_id": user_id, "job_id": "missing-job"}])
+    assert deleted == ["test-job", "missing-job"]
+    assert not isdir(join(user_folder, 'jobs', 'test-job'))
+    assert file_service.delete_complete_jobs(jobs=[]) == []
+
+
 def test_delete_job_without_results(user_id_folder: Tuple[str, str], upload_file: str) -> None:
     """Test everything besides the results folder is deleted."""
     user_folder, user_id = user_id_folder
@@ -129,3 +140,15 @@ def test_delete_old_job_runs(user_id_folder: Tuple[str, str]) -> None:
     existing_dirs = [d for d in listdir(job_id_folder) if isdir(join(job_id_folder, d))]
     assert len(existing_dirs) == 1
     assert existing_dirs[0] == latest
+
+
+def test_delete_missing_job_run(user_id_folder: Tuple[str, str]) -> None:
+    """Check deleting a job run which was already removed does not fail."""
+    user_folder, user_id = user_id_folder
+    file_service.setup_jobs_result_folder(user_id=user_id, job_id='test-job')
+    job_runs = file_service.get_job_run_folder_names(user_id, 'test-job')
+    assert job_runs == [file_service.get_latest_job_run_folder_name(user_id, 'test-job')]
+
+    shutil.rmtree(join(user_folder, 'jobs', 'test-job', job_runs[0]))
+    assert file_service.get_job_run_folder_names(user_id, 'test-job') == []
+    file_service.delete_job_run(user_id, 'test-job', job_runs[0])
@@ -0,0 +1,24 @@
+"""add jobs listing index
+
+Revision ID: 6a1d0c7e4b52
+Revises: f8ee87997081
+Create Date: 2026-10-17 14:05:12.310857
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '6a1d0c7e4b52'
+down_revision = 'f8ee87997081'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Used by the keyset pagination of a user's jobs
+    op.create_index('ix_jobs_user_id_created_at_id', 'jobs', ['user_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_jobs_user_id_created_at_id', table_name='jobs')
@@ -0,0 +1,24 @@
+"""add dag run execution date
+
+Revision ID: b4e7a9d2c815
+Revises: 6a1d0c7e4b52
+Create Date: 2026-10-17 15:21:40.118392
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e7a9d2c815'
+down_revision = '6a1d0c7e4b52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('jobs', sa.Column('dag_run_execution_date', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('jobs', 'dag_run_execution_date')
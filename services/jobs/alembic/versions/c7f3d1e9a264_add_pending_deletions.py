@@ -0,0 +1,34 @@
+"""add pending deletions
+
+Revision ID: c7f3d1e9a264
+Revises: b4e7a9d2c815
+Create Date: 2026-10-17 16:05:12.583017
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7f3d1e9a264'
+down_revision = 'b4e7a9d2c815'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'pending_deletions',
+        sa.Column('job_id', sa.String(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('delete_at', sa.DateTime(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('job_id')
+    )
+    op.create_index(op.f('ix_pending_deletions_delete_at'), 'pending_deletions', ['delete_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_pending_deletions_delete_at'), table_name='pending_deletions')
+    op.drop_table('pending_deletions')
@@ -0,0 +1,33 @@
+"""add filepath lookups
+
+Revision ID: e2a8b6c4f913
+Revises: c7f3d1e9a264
+Create Date: 2026-10-17 17:42:08.204716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a8b6c4f913'
+down_revision = 'c7f3d1e9a264'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'filepath_lookups',
+        sa.Column('id', sa.String(), nullable=False),
+        sa.Column('collection_id', sa.String(), nullable=False),
+        sa.Column('data', sa.JSON(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_filepath_lookups_collection_id'), 'filepath_lookups', ['collection_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_filepath_lookups_collection_id'), table_name='filepath_lookups')
+    op.drop_table('filepath_lookups')
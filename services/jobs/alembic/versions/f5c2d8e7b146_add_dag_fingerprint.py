@@ -0,0 +1,24 @@
+"""add dag fingerprint
+
+Revision ID: f5c2d8e7b146
+Revises: e2a8b6c4f913
+Create Date: 2026-10-17 18:20:37.915240
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c2d8e7b146'
+down_revision = 'e2a8b6c4f913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('jobs', sa.Column('dag_fingerprint', sa.String(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('jobs', 'dag_fingerprint')
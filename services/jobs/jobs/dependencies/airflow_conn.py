@@ -1,14 +1,28 @@
-"""Handles REST connection to Airflow service."""
+"""Handles REST connection to Airflow service.
 
+All requests share one pooled HTTP session. Failed requests - connection errors and server errors - are retried with
+exponential backoff and jitter until an overall deadline is reached. Once Airflow failed several times in a row the
+circuit breaker opens and requests fail immediately for some time, so workers do not pile up waiting for an
+unavailable webserver. The latency of all requests is recorded per endpoint.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
-from typing import Optional, Tuple
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import requests
 from dynaconf import settings
 from nameko.extensions import DependencyProvider
+from requests.adapters import HTTPAdapter
 
 from ..models import JobStatus
 
+LOGGER = logging.getLogger('standardlog')
+
 airflow_job_status_mapper = {
     "running": JobStatus.running,
     "success": JobStatus.finished,
@@ -17,31 +31,129 @@ airflow_job_status_mapper = {
 """Simple dictionary to map from a str to the corresponding JobStatus enum."""
 
 
+class CircuitBreaker:
+    """Stops requests to Airflow for some time after it failed several times in a row.
+
+    Attributes:
+        threshold: The number of consecutive failures after which the circuit opens.
+        reset_timeout: The time in seconds the circuit stays open. Afterwards a single request is let through, if it
+            succeeds the circuit is closed again.
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float) -> None:
+        """Initialise CircuitBreaker."""
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = Lock()
+
+    def allow(self) -> bool:
+        """Return whether a request may be sent.
+
+        Once the reset timeout passed the circuit is half open - only the first caller may send a trial request, all
+        others are rejected until the trial request succeeded or failed.
+        """
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_running or monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self) -> None:
+        """Close the circuit after a successful request."""
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        """Count a failed request and open the circuit if the threshold is reached or the trial request failed."""
+        with self._lock:
+            self._failures += 1
+            if self._trial_running:
+                # Open again for another reset timeout
+                self._trial_running = False
+                self._opened_at = monotonic()
+            elif self._failures >= self.threshold and self._opened_at is None:
+                self._opened_at = monotonic()
+                LOGGER.warning(f"Airflow failed {self._failures} times in a row, requests are stopped for "
+                               f"{self.reset_timeout} seconds.")
+
+
+class EndpointMetrics:
+    """Records the number of requests, failures and the latency of requests per Airflow endpoint."""
+
+    def __init__(self) -> None:
+        """Initialise EndpointMetrics."""
+        self._lock = Lock()
+        self._metrics: Dict[str, Dict[str, float]] = {}
+
+    def record(self, endpoint: str, latency: float, ok: bool) -> None:
+        """Record a single request to an endpoint.
+
+        Args:
+            endpoint: The name of the endpoint, e.g. trigger_dag.
+            latency: The time in seconds until the response was received or the request failed.
+            ok: Whether the request was successful.
+        """
+        with self._lock:
+            metrics = self._metrics.setdefault(endpoint, {"count": 0, "errors": 0, "total": 0.0, "max": 0.0})
+            metrics["count"] += 1
+            metrics["errors"] += 0 if ok else 1
+            metrics["total"] += latency
+            metrics["max"] = max(metrics["max"], latency)
+
+    def collect(self) -> Dict[str, Dict[str, float]]:
+        """Return the count, errors, mean and max latency per endpoint since the last call and reset them."""
+        with self._lock:
+            metrics, self._metrics = self._metrics, {}
+        return {endpoint: {"count": values["count"], "errors": values["errors"],
+                           "mean": values["total"] / values["count"], "max": values["max"]}
+                for endpoint, values in metrics.items()}
+
+
 class AirflowRestConnection:
     """Handles REST requests to the Airflow webserver."""
 
-    def __init__(self, airflow_base_url: str) -> None:
+    backoff_base = 0.5
+    """Base delay in seconds of the exponential backoff between two attempts."""
+    backoff_max = 10
+    """Maximum delay in seconds between two attempts."""
+
+    def __init__(self, airflow_base_url: str, session: requests.Session = None, breaker: CircuitBreaker = None,
+                 metrics: EndpointMetrics = None) -> None:
         """Initialize Airflow REST connection service."""
         self.header = {'Cache-Control': 'no-cache ', 'content-type': 'application/json'}
         self.data = '{}'
         self.api_url = f"{airflow_base_url}/api/experimental"
         self.dag_url = f"{self.api_url}/dags"
+        self.session = session or requests.Session()
+        self.breaker = breaker or CircuitBreaker(threshold=settings.AIRFLOW_CIRCUIT_THRESHOLD,
+                                                 reset_timeout=settings.AIRFLOW_CIRCUIT_RESET)
+        self.metrics = metrics or EndpointMetrics()
 
     def unpause_dag(self, dag_id: str, unpause: bool = True) -> bool:
-        """Pause/unpause dag and return whether this was successful."""
+        """Pause/unpause dag and return whether this was successful.
+
+        It may take some seconds until Airflow parsed a new dag file and the dag can be unpaused. Therefore the
+        request is retried until it succeeds or AIRFLOW_UNPAUSE_DEADLINE is reached.
+        """
         request_url = f"{self.dag_url}/{dag_id}/paused/{str(not unpause)}"
-        response = requests.get(request_url, headers=self.header, data=self.data)
-        # NB It may take 1-2 seconds before the DAG has the attribute "is_paused" set
-        while not response.ok:
-            response = requests.get(request_url, headers=self.header, data=self.data)
-        return response.ok
+        response = self._request("unpause_dag", "GET", request_url, deadline=settings.AIRFLOW_UNPAUSE_DEADLINE,
+                                 retry=lambda response: not response.ok)
+        return response is not None and response.ok
 
     def trigger_dag(self, dag_id: str) -> bool:
         """Trigger given airflow dag and return whether this was successful."""
-        _ = self.unpause_dag(dag_id)
+        if not self.unpause_dag(dag_id):
+            return False
         job_url = f"{self.dag_url}/{dag_id}/dag_runs"
-        response = requests.post(job_url, headers=self.header, data=self.data)
-        return response.ok
+        response = self._request("trigger_dag", "POST", job_url)
+        return response is not None and response.ok
 
     def check_dag_status(self, dag_id: str) -> Tuple[Optional[JobStatus], Optional[datetime]]:
         """Check status of airflow dag and return it together with the last execution date.
@@ -50,12 +162,34 @@ class AirflowRestConnection:
             A Tuple containing the current dag status and the last execution date. If the REST request to the Airflow
             service fails None, None is returned. If the dag has not been executed created, None is returned.
         """
+        return self._get_dag_status(dag_id)
+
+    def check_dag_statuses(self, dag_ids: List[str]) -> Dict[str, Tuple[Optional[JobStatus], Optional[datetime]]]:
+        """Check the status of many airflow dags at once.
+
+        The dag runs are requested concurrently (setting AIRFLOW_STATUS_WORKERS) over the pooled HTTP session.
+
+        Args:
+            dag_ids: The ids of the dags to check.
+
+        Returns:
+            The current dag status and the last execution date of each dag, see check_dag_status.
+        """
+        if not dag_ids:
+            return {}
+        max_workers = min(settings.get("AIRFLOW_STATUS_WORKERS", 10), len(dag_ids))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            statuses = executor.map(self._get_dag_status, dag_ids)
+            return dict(zip(dag_ids, statuses))
+
+    def _get_dag_status(self, dag_id: str) -> Tuple[Optional[JobStatus], Optional[datetime]]:
+        """Request the dag runs of a dag and return its status."""
         dag_status = None
         execution_date = datetime.min
 
         job_url = f"{self.dag_url}/{dag_id}/dag_runs"
-        response = requests.get(job_url, headers=self.header, data=self.data)
-        if response.status_code == 200:
+        response = self._request("check_dag_status", "GET", job_url)
+        if response is not None and response.status_code == 200:
             if not response.json():
                 # empty list is returned > no dag run, only created
                 dag_status = JobStatus.created
@@ -72,12 +206,77 @@ class AirflowRestConnection:
     def delete_dag(self, dag_id: str) -> bool:
         """Delete the dag from Airflow with the given id an return whether this was successful."""
         job_url = f"{self.dag_url}/{dag_id}"
-        response = requests.delete(job_url)
-        return response.status_code == 200
+        response = self._request("delete_dag", "DELETE", job_url)
+        return response is not None and response.status_code == 200
+
+    def _request(self, endpoint: str, method: str, url: str, deadline: float = None,
+                 retry: Callable[[requests.Response], bool] = None) -> Optional[requests.Response]:
+        """Send a request to Airflow and retry it with exponential backoff until the deadline is reached.
+
+        Args:
+            endpoint: The name of the endpoint the latency is recorded for.
+            method: The HTTP method.
+            url: The complete url.
+            deadline: The maximum time in seconds for all attempts - default setting AIRFLOW_REQUEST_DEADLINE.
+            retry: Returns whether a response should be retried. By default only server errors are retried.
+
+        Returns:
+            The last response or None if no response was received or the circuit breaker is open.
+        """
+        deadline_at = monotonic() + (settings.AIRFLOW_REQUEST_DEADLINE if deadline is None else deadline)
+        retry = retry or (lambda response: response.status_code >= 500)
+        response: Optional[requests.Response] = None
+        attempt = 0
+        while True:
+            if not self.breaker.allow():
+                LOGGER.warning(f"Airflow request {method} {url} skipped, the circuit breaker is open.")
+                return response
+            started_at = monotonic()
+            timeout = max(min(settings.AIRFLOW_REQUEST_TIMEOUT, deadline_at - started_at), 0.1)
+            try:
+                response = self.session.request(method, url, headers=self.header, data=self.data, timeout=timeout)
+                failed = response.status_code >= 500
+            except requests.RequestException as exp:
+                LOGGER.warning(f"Airflow request {method} {url} failed: {exp}")
+                failed = True
+            latency = monotonic() - started_at
+            self.metrics.record(endpoint, latency, ok=not failed)
+            LOGGER.debug(f"Airflow request {method} {url} took {latency:.3f}s")
+            if failed:
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_success()
+                if not retry(response):
+                    return response
+
+            # Full jitter: wait a random time up to the exponentially growing backoff
+            delay = uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))  # noqa S311
+            if monotonic() + delay >= deadline_at:
+                LOGGER.warning(f"Airflow request {method} {url} did not succeed within the deadline.")
+                return None if failed else response
+            sleep(delay)
+            attempt += 1
 
 
 class AirflowRestConnectionProvider(DependencyProvider):
-    """This is the DependencyProvider of the AirflowRestConnection."""
+    """This is the DependencyProvider of the AirflowRestConnection.
+
+    The HTTP session, the circuit breaker and the metrics are shared by all workers of a service container.
+    """
+
+    def setup(self) -> None:
+        """Create the pooled HTTP session, the circuit breaker and the metrics when the container starts."""
+        self.session = requests.Session()
+        pool_size = settings.get("AIRFLOW_STATUS_WORKERS", 10)
+        self.session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.breaker = CircuitBreaker(threshold=settings.AIRFLOW_CIRCUIT_THRESHOLD,
+                                      reset_timeout=settings.AIRFLOW_CIRCUIT_RESET)
+        self.metrics = EndpointMetrics()
+
+    def stop(self) -> None:
+        """Close the HTTP session when the container stops."""
+        self.session.close()
 
     def get_dependency(self, worker_ctx: object) -> AirflowRestConnection:
         """Return the instantiated object that is injected to a service worker.
@@ -89,5 +288,15 @@ class AirflowRestConnectionProvider(DependencyProvider):
             AirflowRestConnection: The instantiated AirflowRestConnection object.
         """
         return AirflowRestConnection(
-            airflow_base_url=settings.AIRFLOW_HOST
+            airflow_base_url=settings.AIRFLOW_HOST,
+            session=self.session,
+            breaker=self.breaker,
+            metrics=self.metrics,
         )
+
+
+def format_metrics(metrics: Dict[str, Dict[str, Any]]) -> str:
+    """Return the metrics of all Airflow endpoints as one log line."""
+    return ", ".join(f"{endpoint}: {values['count']} requests, {values['errors']} errors, "
+                     f"mean {values['mean']:.3f}s, max {values['max']:.3f}s"
+                     for endpoint, values in sorted(metrics.items()))
@@ -1,7 +1,7 @@
 """Provides a set of classes to manage dags."""
 
 import os
-from typing import Dict, List
+from typing import Dict, List, Optional
 
 from dynaconf import settings
 from nameko.extensions import DependencyProvider
@@ -51,6 +51,13 @@ class DagHandler:
         """Return dag_id of parallel dag."""
         return f"{job_id}_{self.job_id_extensions.parallel}"
 
+    def get_job_id(self, dag_id: str) -> Optional[str]:
+        """Return the job_id of a dag_id or None if the dag does not belong to a job."""
+        for extension in [self.job_id_extensions.preparation, self.job_id_extensions.parallel]:
+            if dag_id.endswith(f"_{extension}"):
+                return dag_id[:-len(extension) - 1]
+        return None
+
     def get_dag_filename(self, dag_id: str) -> str:
         """Return the dag filename with extension."""
         return f"{self.job_id_extensions.filename_prefix}_{dag_id}.{self.job_id_extensions.file_extension}"
@@ -0,0 +1,156 @@
+"""Provides an rpc entrypoint which sends its reply after the worker finished.
+
+Synchronous processing has to wait until a job finished before the reply can be sent. Instead of blocking a worker
+of the service for the whole time, the service method returns a :class:`DeferredReply`. The worker finishes
+immediately, the request message is acknowledged and a lightweight thread waits until the reply is ready - the event
+of the reply is sent or the timeout is reached. The reply is then created by a new worker calling the given service
+method.
+"""
+
+import logging
+from functools import partial
+from threading import Lock
+from time import monotonic
+from typing import Any, Dict, Optional, Tuple
+
+from eventlet.event import Event
+from nameko.constants import AMQP_SSL_CONFIG_KEY, AMQP_URI_CONFIG_KEY, DEFAULT_SERIALIZER, LOGIN_METHOD_CONFIG_KEY, \
+    SERIALIZER_CONFIG_KEY
+from nameko.extensions import DependencyProvider, Entrypoint
+from nameko.rpc import Responder, Rpc, get_rpc_exchange
+
+LOGGER = logging.getLogger('standardlog')
+
+
+class DeferredReply:
+    """Returned by a deferred rpc method to create the reply once an event was sent.
+
+    Attributes:
+        event: The event which is sent when the reply can be created.
+        finish: The name of the service method creating the reply. It is called with the given args and kwargs and
+            the keyword argument `timed_out`.
+        timeout: The maximum time to wait for the event in seconds.
+        poll: The name of a service method called in the poll_interval while waiting (optional). It returns whether
+            the reply can be created, e.g. to check a status if no event is sent.
+        poll_interval: The interval to call the poll method in seconds.
+        args: The positional arguments of the finish and poll methods.
+        kwargs: The keyword arguments of the finish and poll methods.
+    """
+
+    def __init__(self, event: Event, finish: str, timeout: float, poll: str = None, poll_interval: float = 10,
+                 args: Tuple = (), kwargs: Dict[str, Any] = None) -> None:
+        """Initialise DeferredReply."""
+        self.event = event
+        self.finish = finish
+        self.timeout = timeout
+        self.poll = poll
+        self.poll_interval = poll_interval
+        self.args = args
+        self.kwargs = kwargs or {}
+
+
+class DeferredRpc(Rpc):
+    """Rpc entrypoint which allows the service method to return a :class:`DeferredReply`.
+
+    The request message is acknowledged as soon as the worker returned the deferred reply. Waiting requests therefore
+    neither hold a worker nor one of the prefetched messages of the consumer, so other rpc calls are still received.
+    If the service stops while waiting the request is not delivered again - the caller runs into its rpc timeout.
+    """
+
+    def handle_result(self, message: Any, worker_ctx: Any, result: Any, exc_info: Any) -> Tuple[Any, Any]:
+        """Send the reply or wait for a deferred reply in a separate thread without blocking the worker."""
+        if exc_info is None and isinstance(result, DeferredReply):
+            self.rpc_consumer.queue_consumer.ack_message(message)
+            self.container.spawn_managed_thread(partial(self._reply_deferred, message, worker_ctx, result),
+                                                identifier=f"{self.method_name}_deferred_reply")
+            return result, exc_info
+        return super().handle_result(message, worker_ctx, result, exc_info)
+
+    def _reply_deferred(self, message: Any, worker_ctx: Any, deferred: DeferredReply) -> None:
+        """Wait for the deferred reply and spawn the worker creating and sending it."""
+        timed_out = not self._wait(deferred)
+        finisher = Entrypoint().bind(self.container, deferred.finish)
+        self.container.spawn_worker(finisher, deferred.args, dict(deferred.kwargs, timed_out=timed_out),
+                                    context_data=worker_ctx.data,
+                                    handle_result=partial(self._send_reply, message))
+
+    def _send_reply(self, message: Any, worker_ctx: Any, result: Any, exc_info: Any) -> Tuple[Any, Any]:
+        """Send the reply to an already acknowledged request message."""
+        config = self.container.config
+        responder = Responder(config[AMQP_URI_CONFIG_KEY], get_rpc_exchange(config), config.get(
+            SERIALIZER_CONFIG_KEY, DEFAULT_SERIALIZER), message, ssl=config.get(AMQP_SSL_CONFIG_KEY),
+            login_method=config.get(LOGIN_METHOD_CONFIG_KEY))
+        return responder.send_response(result, exc_info)
+
+    def _wait(self, deferred: DeferredReply) -> bool:
+        """Wait until the event of the deferred reply is sent and return False if the timeout was reached."""
+        deadline = monotonic() + deferred.timeout
+        while not deferred.event.ready():
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                return False
+            if not deferred.poll:
+                deferred.event.wait(remaining)
+                continue
+            deferred.event.wait(min(remaining, deferred.poll_interval))
+            if not deferred.event.ready():
+                self._poll(deferred)
+        return True
+
+    def _poll(self, deferred: DeferredReply) -> None:
+        """Call the poll method in a new worker and send the event of the deferred reply if it returns True."""
+        done = Event()
+
+        def handle_poll_result(worker_ctx: Any, result: Any, exc_info: Any) -> Tuple[Any, Any]:
+            if exc_info is None and result and not deferred.event.ready():
+                deferred.event.send(True)
+            done.send(True)
+            return result, exc_info
+
+        self.container.spawn_worker(Entrypoint().bind(self.container, deferred.poll), deferred.args,
+                                    deferred.kwargs, handle_result=handle_poll_result)
+        done.wait()
+
+
+deferred_rpc = DeferredRpc.decorator
+
+
+class SyncJobWaiter:
+    """Holds one event per job a synchronous request is waiting for."""
+
+    def __init__(self) -> None:
+        """Initialise SyncJobWaiter."""
+        self._lock = Lock()
+        self._events: Dict[str, Event] = {}
+
+    def register(self, job_id: str) -> Event:
+        """Return the event which is sent once the job finished."""
+        with self._lock:
+            return self._events.setdefault(job_id, Event())
+
+    def notify(self, job_id: str) -> bool:
+        """Send the event of a job and return whether a request was waiting for it."""
+        with self._lock:
+            event: Optional[Event] = self._events.pop(job_id, None)
+        if event is None:
+            return False
+        if not event.ready():
+            event.send(True)
+        return True
+
+    def unregister(self, job_id: str) -> None:
+        """Drop the event of a job, e.g. if the request timed out."""
+        with self._lock:
+            self._events.pop(job_id, None)
+
+
+class SyncJobWaiterProvider(DependencyProvider):
+    """Provides the SyncJobWaiter shared by all workers of a service container."""
+
+    def setup(self) -> None:
+        """Create the waiter when the container starts."""
+        self.waiter = SyncJobWaiter()
+
+    def get_dependency(self, worker_ctx: object) -> SyncJobWaiter:
+        """Return the shared SyncJobWaiter."""
+        return self.waiter
@@ -44,6 +44,13 @@ class SettingKeys(Enum):
 
     It must be minimum above the timeout of gunicorn and nginx. E.g. 300
     """
+    SYNC_TIMEOUT = "SYNC_TIMEOUT"
+    """Maximum time in seconds to wait for a synchronously processed job - default 600.
+
+    The job is canceled if it did not finish in time. It should be below the timeout of the RPC calls of the gateway.
+    """
+    STOP_TIMEOUT = "STOP_TIMEOUT"
+    """Maximum time in seconds to wait until a canceled or deleted job is stopped in Airflow - default 120."""
     SYNC_RESULTS_FOLDER = "SYNC_RESULTS_FOLDER"
     """The path to the sync-results folder.
 
@@ -57,6 +64,46 @@ class SettingKeys(Enum):
 
     e.g. /usr/local/airflow/wekeo_storage
     """
+    AIRFLOW_REQUEST_TIMEOUT = "AIRFLOW_REQUEST_TIMEOUT"
+    """The timeout in seconds of a single request to Airflow - default 10."""
+    AIRFLOW_REQUEST_DEADLINE = "AIRFLOW_REQUEST_DEADLINE"
+    """Maximum time in seconds to retry a failed request to Airflow - default 30."""
+    AIRFLOW_UNPAUSE_DEADLINE = "AIRFLOW_UNPAUSE_DEADLINE"
+    """Maximum time in seconds to wait until Airflow parsed a new dag and it can be unpaused - default 120."""
+    AIRFLOW_CIRCUIT_THRESHOLD = "AIRFLOW_CIRCUIT_THRESHOLD"
+    """The number of failed requests in a row after which requests to Airflow are stopped for some time - default 5."""
+    AIRFLOW_CIRCUIT_RESET = "AIRFLOW_CIRCUIT_RESET"
+    """The time in seconds requests to Airflow are stopped after it failed repeatedly - default 30."""
+    AIRFLOW_METRICS_INTERVAL = "AIRFLOW_METRICS_INTERVAL"
+    """Time interval in seconds to log the number of requests and the latency per Airflow endpoint - default 300."""
+    AIRFLOW_STATUS_WORKERS = "AIRFLOW_STATUS_WORKERS"
+    """The number of concurrent requests to Airflow when the status of many jobs is updated at once - default 10."""
+    JOB_STATUS_EVENTS = "JOB_STATUS_EVENTS"
+    """Whether Airflow publishes the state changes of dag runs as events - default False.
+
+    This requires the job status callbacks in `airflow/plugins`. If enabled the job status is kept up to date by these
+    events and reading jobs does not request the status from Airflow.
+    """
+    FILEPATHS_CHUNK_SIZE = "FILEPATHS_CHUNK_SIZE"
+    """The number of filepaths requested from the data service at once when creating the dag of a job - default 5000.
+
+    Large file lists are transferred in multiple chunks to keep single RPC messages small.
+    """
+    FILEPATHS_TIMEOUT = "FILEPATHS_TIMEOUT"
+    """Maximum time in seconds to wait for the filepaths of all collections of a job - default 900.
+
+    The filepaths of all collections are requested at the same time. WEkEO requests can take several minutes.
+    """
+    FILEPATHS_CACHE_TTL = "FILEPATHS_CACHE_TTL"
+    """Time in seconds the resolved filepaths of a collection, spatial and temporal extent are reused - default 86400.
+
+    The filepaths of a collection are resolved again earlier once the data service refreshed the collection from the
+    catalogue. Set it to 0 to disable the cache.
+    """
+    CLEANUP_INTERVAL = "CLEANUP_INTERVAL"
+    """Time interval in seconds to delete the folders of expired jobs (e.g. of synchronous jobs) - default 60."""
+    CLEANUP_BATCH_SIZE = "CLEANUP_BATCH_SIZE"
+    """The maximum number of expired job folders deleted in one run of the cleanup - default 100."""
 
     # Connection to RabbitMQ
     RABBIT_HOST = "RABBIT_HOST"
@@ -154,9 +201,36 @@ def initialise_settings() -> None:
         Validator(SettingKeys.AIRFLOW_DAGS.value, must_exist=True, condition=utils.check_create_folder, when=not_doc),
         Validator(SettingKeys.SYNC_DEL_DELAY.value, must_exist=True, is_type_of=int, condition=utils.check_positive_int,
                   when=not_doc),
+        Validator(SettingKeys.SYNC_TIMEOUT.value, default=600, is_type_of=int, condition=utils.check_positive_int,
+                  when=not_doc),
+        Validator(SettingKeys.STOP_TIMEOUT.value, default=120, is_type_of=int, condition=utils.check_positive_int,
+                  when=not_doc),
         Validator(SettingKeys.SYNC_RESULTS_FOLDER.value, must_exist=True, condition=utils.check_create_folder,
                   when=not_doc),
         Validator(SettingKeys.WEKEO_STORAGE.value, default="", when=not_doc_unittest),
+        Validator(SettingKeys.AIRFLOW_REQUEST_TIMEOUT.value, default=10, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
+        Validator(SettingKeys.AIRFLOW_REQUEST_DEADLINE.value, default=30, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
+        Validator(SettingKeys.AIRFLOW_UNPAUSE_DEADLINE.value, default=120, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
+        Validator(SettingKeys.AIRFLOW_CIRCUIT_THRESHOLD.value, default=5, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
+        Validator(SettingKeys.AIRFLOW_CIRCUIT_RESET.value, default=30, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
+        Validator(SettingKeys.AIRFLOW_METRICS_INTERVAL.value, default=300, is_type_of=int,
+                  condition=utils.check_positive_int),
+        Validator(SettingKeys.AIRFLOW_STATUS_WORKERS.value, default=10, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
+        Validator(SettingKeys.JOB_STATUS_EVENTS.value, default=False, is_type_of=bool, when=not_doc),
+        Validator(SettingKeys.FILEPATHS_CHUNK_SIZE.value, default=5000, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
+        Validator(SettingKeys.FILEPATHS_TIMEOUT.value, default=900, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
+        Validator(SettingKeys.FILEPATHS_CACHE_TTL.value, default=86400, is_type_of=int, gte=0, when=not_doc),
+        Validator(SettingKeys.CLEANUP_INTERVAL.value, default=60, is_type_of=int, condition=utils.check_positive_int),
+        Validator(SettingKeys.CLEANUP_BATCH_SIZE.value, default=100, is_type_of=int,
+                  condition=utils.check_positive_int, when=not_doc),
 
         Validator(SettingKeys.RABBIT_HOST.value, must_exist=True, when=not_doc_unittest),
         Validator(SettingKeys.RABBIT_PORT.value, must_exist=True, is_type_of=int, when=not_doc_unittest),
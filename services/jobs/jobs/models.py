@@ -3,7 +3,7 @@ import enum
 from datetime import datetime
 from typing import Any
 
-from sqlalchemy import Boolean, Column, DateTime, Enum, Integer, JSON, String
+from sqlalchemy import Boolean, Column, DateTime, Enum, Index, Integer, JSON, String
 from sqlalchemy.ext.declarative import declarative_base
 
 Base: Any = declarative_base()
@@ -34,6 +34,9 @@ class Job(Base):
     """Job table definition."""
 
     __tablename__ = 'jobs'
+    __table_args__ = (
+        Index('ix_jobs_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
 
     id = Column(String, primary_key=True)  # noqa A003
     """Unique string identifier of a job."""
@@ -49,6 +52,10 @@ class Job(Base):
     """The current status of the job as enum."""
     status_updated_at = Column(DateTime, default=datetime.utcnow, nullable=False)
     """The UTC datetime of the last job 'status' update."""
+    dag_run_execution_date = Column(DateTime, nullable=True)
+    """The UTC execution date of the Airflow dag run the last pushed status update belongs to (optional)."""
+    dag_fingerprint = Column(String, nullable=True)
+    """Hash of all inputs the current dag files of the job were written from (optional)."""
     progress = Column(Integer, nullable=True)  # Should be filled persistently
     """Indicates the process of a running batch job in percent."""
     error = Column(JSON, nullable=True)  # store last error of job > needed for results response
@@ -69,3 +76,35 @@ class Job(Base):
     """UTC datetime the job was created."""
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     """UTC datetime any column of this job was last updated."""
+
+
+class PendingDeletion(Base):
+    """Table of the job folders which are deleted once they expired (e.g. results of synchronous jobs)."""
+
+    __tablename__ = 'pending_deletions'
+
+    job_id = Column(String, primary_key=True)
+    """Unique string identifier of the deleted job."""
+    user_id = Column(String, nullable=False)
+    """The id of the user who owned the job as a string."""
+    delete_at = Column(DateTime, nullable=False, index=True)
+    """The UTC datetime after which the job folder is deleted."""
+    attempts = Column(Integer, nullable=False, default=0)
+    """The number of failed attempts to delete the job folder."""
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    """UTC datetime the deletion was scheduled."""
+
+
+class FilepathLookup(Base):
+    """Table caching the filepaths of a collection resolved for a spatial and temporal extent."""
+
+    __tablename__ = 'filepath_lookups'
+
+    id = Column(String, primary_key=True)  # noqa A003
+    """Hash of the collection id, the spatial extent and the temporal extent of the lookup."""
+    collection_id = Column(String, nullable=False, index=True)
+    """Identifier of the collection the filepaths belong to."""
+    data = Column(JSON, nullable=False)
+    """The data response of the data service holding the 'filepaths' (and the 'wekeo_job_id' if available)."""
+    created_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    """UTC datetime the filepaths were resolved."""
@@ -4,28 +4,42 @@ import logging
 import os
 import random
 import string
-import threading
 from collections import namedtuple
-from datetime import datetime
-from time import sleep
-from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from hashlib import sha256
+from time import monotonic
+from typing import Any, Dict, List, Optional, Tuple
 
+import eventlet
 from dynaconf import settings
 from eodc_openeo_bindings.job_writer.dag_writer import AirflowDagWriter
+from nameko.events import BROADCAST, EventDispatcher, event_handler
 from nameko.rpc import RpcProxy, rpc
+from nameko.timer import timer
 from nameko_sqlalchemy import DatabaseSession
+from pkg_resources import DistributionNotFound, get_distribution
+from sqlalchemy import or_
+from sqlalchemy.exc import SQLAlchemyError
 
-from .dependencies.airflow_conn import AirflowRestConnectionProvider
+from .dependencies.airflow_conn import AirflowRestConnectionProvider, airflow_job_status_mapper, format_metrics
 from .dependencies.dag_handler import DagHandlerProvider, DagIdExtensions
+from .dependencies.deferred_rpc import DeferredReply, SyncJobWaiterProvider, deferred_rpc
 from .dependencies.settings import initialise_settings
 from .exceptions import JobLocked, JobNotFinished, ServiceException
-from .models import Base, Job, JobStatus
+from .models import Base, FilepathLookup, Job, JobStatus, PendingDeletion
+from .pagination import get_next_links, paginate
 from .schema import JobCreateSchema, JobFullSchema, JobResultsBaseSchema, JobShortSchema
 
 service_name = "jobs"
 LOGGER = logging.getLogger('standardlog')
 initialise_settings()
 
+try:
+    DAG_WRITER_VERSION = get_distribution("eodc-openeo-bindings").version
+except DistributionNotFound:
+    DAG_WRITER_VERSION = None
+"""Version of the bindings writing the dag files, dag files of an older version are not reused."""
+
 
 class JobService:
     """Management of batch processing tasks (jobs) and their results."""
@@ -43,10 +57,19 @@ class JobService:
     dag_handler = DagHandlerProvider()
     dag_writer = AirflowDagWriter(DagIdExtensions().to_dict())
     """Object to write Airflow dags."""
+    sync_waiter = SyncJobWaiterProvider()
+    """Events of the jobs a request is waiting for - synchronously processed or stopped jobs."""
+    dispatch = EventDispatcher()
+    """Dispatcher of events to other services and to all instances of this service."""
     check_stop_interval = 5
     """Time interval in seconds to check whether a job was stopped.
 
-    Should be similar or smaller than Airflow sensor's poke interval
+    Only a fallback if the job status event of the stopped job is not received (setting JOB_STATUS_EVENTS).
+    """
+    sync_poll_interval = 10
+    """Time interval in seconds to check whether a synchronously processed job finished.
+
+    Only used if the job status is not published by Airflow (setting JOB_STATUS_EVENTS).
     """
 
     @rpc
@@ -67,7 +90,7 @@ class JobService:
             if isinstance(response, ServiceException):
                 return response.to_dict()
 
-            self._update_job_status(job_id=job_id)
+            self._refresh_job_status(job_id=job_id)
             process_response = self.processes_service.get_user_defined(user, job.process_graph_id)
             if process_response["status"] == "error":
                 return process_response
@@ -142,8 +165,9 @@ class JobService:
         Args:
             user: The user object, to determine access rights.
             job_id: The id of the job.
-            delayed: Whether this should happen directly or it should be delayed for some seconds. This can be used for
-                synchronous where results need to be returned and then deleted.
+            delayed: Whether the job folder should be deleted directly or after SYNC_DEL_DELAY seconds. This can be
+                used for synchronous jobs where results need to be returned and then deleted. The deletion is stored in
+                the database and executed by :meth:`delete_expired_jobs`.
 
         Returns:
             A dictionary with the status of the request.
@@ -163,8 +187,9 @@ class JobService:
                 LOGGER.info(f"Stopped running job {job_id}.")
 
             if delayed:
-                # Schedule async deletion of tmp folder
-                threading.Thread(target=self._delayed_delete, args=(user["id"], job_id)).start()
+                # Schedule deletion of the job folder - committed together with the deletion of the job
+                self.db.add(PendingDeletion(job_id=job_id, user_id=user["id"],
+                                            delete_at=datetime.utcnow() + timedelta(seconds=settings.SYNC_DEL_DELAY)))
             else:
                 self.files_service.delete_complete_job(user_id=user["id"], job_id=job_id)  # delete data on file system
             self.dag_handler.remove_all_dags(job_id)  # delete dag file
@@ -183,27 +208,39 @@ class JobService:
             return ServiceException(500, user["id"], str(exp), links=[]).to_dict()
 
     @rpc
-    def get_all(self, user: Dict[str, Any]) -> dict:
+    def get_all(self, user: Dict[str, Any], limit: int = None, cursor: str = None) -> dict:
         """Get general information about all available jobs of a given user.
 
+        Jobs are listed by creation time. If a limit is given only one page of jobs is returned together with a link
+        to the next page.
+
         Args:
             user: The user object.
+            limit: The maximum number of jobs to return (optional).
+            cursor: The cursor to the next page as returned in the 'next' link of the previous page (optional).
 
         Returns:
             A dictionary including all available jobs and the status of the request or a serialized exception.
         """
         try:
-            jobs = self.db.query(Job.id).filter_by(user_id=user["id"]).order_by(Job.created_at).all()
-            for job in jobs:
-                self._update_job_status(job.id)
-
-            jobs = self.db.query(Job).filter_by(user_id=user["id"]).order_by(Job.created_at).all()
+            try:
+                jobs, next_cursor = paginate(self.db.query(Job).filter_by(user_id=user["id"]),
+                                             Job.created_at, Job.id, limit=limit, cursor=cursor)
+            except ValueError as exp:
+                return ServiceException(400, user["id"], str(exp), internal=False,
+                                        links=["#tag/Job-Management/paths/~1jobs/get"]).to_dict()
+            if not settings.JOB_STATUS_EVENTS:
+                job_ids = [job.id for job in jobs]
+                self._update_job_statuses(jobs)
+
+                # Reload all jobs at once as they are expired after committing the status updates
+                jobs = self.db.query(Job).filter(Job.id.in_(job_ids)).order_by(Job.created_at, Job.id).all()
             return {
                 "status": "success",
                 "code": 200,
                 "data": {
                     "jobs": JobShortSchema(many=True).dump(jobs),
-                    "links": []
+                    "links": get_next_links("jobs", limit, next_cursor),
                 }
             }
         except Exception as exp:
@@ -281,8 +318,6 @@ class JobService:
                                         f"Job {job_id} is already {job.status}. Processing must be canceled before"
                                         f" restart.", links=[], internal=False).to_dict()
 
-            self.files_service.setup_jobs_result_folder(user_id=user["id"], job_id=job_id)
-
             # Get all processes
             process_response = self.processes_service.get_all_predefined()
             if process_response["status"] == "error":
@@ -296,28 +331,39 @@ class JobService:
             process_graph = process_graph_response["data"]["process_graph"]
 
             # Get input filepaths
-            in_filepaths = self._get_in_filepaths(process_graph)
+            in_filepaths = self._get_in_filepaths(process_graph, user["id"])
             if 'status' in in_filepaths and in_filepaths['status'] == 'error':
                 # return data exception now stored in in_filepaths
                 return in_filepaths
 
-            self.dag_writer.write_and_move_job(
-                job_id=job_id,
-                user_name=user["id"],
-                dags_folder=settings.AIRFLOW_DAGS,
-                wekeo_storage=settings.WEKEO_STORAGE,
-                process_graph_json={"process_graph": process_graph},
-                job_data=self.get_latest_job_folder(user['id'], job_id),
-                vrt_only=job.vrt_flag,
-                add_delete_sensor=True,
-                add_parallel_sensor=job.add_parallel_sensor,
-                process_defs=backend_processes,
-                in_filepaths=in_filepaths,
-            )
-            LOGGER.info(f"Dag file created for job {job_id}")
+            dag_inputs = {
+                "wekeo_storage": settings.WEKEO_STORAGE,
+                "process_graph_json": {"process_graph": process_graph},
+                "vrt_only": job.vrt_flag,
+                "add_delete_sensor": True,
+                "add_parallel_sensor": job.add_parallel_sensor,
+                "process_defs": backend_processes,
+                "in_filepaths": in_filepaths,
+            }
+            if not self._reuse_dag(user["id"], job, dag_inputs):
+                self.files_service.setup_jobs_result_folder(user_id=user["id"], job_id=job_id)
+                job_data = self.get_latest_job_folder(user['id'], job_id)
+                self.dag_writer.write_and_move_job(
+                    job_id=job_id,
+                    user_name=user["id"],
+                    dags_folder=settings.AIRFLOW_DAGS,
+                    job_data=job_data,
+                    **dag_inputs,
+                )
+                job.dag_fingerprint = self._get_dag_fingerprint(job_data, dag_inputs)
+                self.db.commit()
+                LOGGER.info(f"Dag file created for job {job_id}")
 
             trigger_worked = self.airflow.trigger_dag(dag_id=self.dag_handler.get_preparation_dag_id(job_id))
             if not trigger_worked:
+                # Write the dag again on the next try
+                job.dag_fingerprint = None
+                self.db.commit()
                 return ServiceException(500, user["id"], f"Job {job_id} could not be started.", links=[]).to_dict()
 
             self._update_job_status(job_id=job_id)
@@ -332,13 +378,14 @@ class JobService:
         except Exception as exp:
             return ServiceException(500, user["id"], str(exp), links=[]).to_dict()
 
-    @rpc
-    def process_sync(self, user: Dict[str, Any], **job_args: Any) -> dict:
+    @deferred_rpc
+    def process_sync(self, user: Dict[str, Any], **job_args: Any) -> Any:
         """Execute a provided job synchronously.
 
         This method MUST ONLY be used for SMALL jobs!
-        It creates a job from the provided job_args, starts it, waits until it is finished and returns the location of
-        the resulting file.
+        It creates a job from the provided job_args and starts it. The reply is deferred until the job finished, so no
+        worker is blocked while waiting. It is sent as soon as the job status changed (setting JOB_STATUS_EVENTS) or
+        else checked in the sync_poll_interval, at the latest after the timeout (setting SYNC_TIMEOUT).
 
         Currently the 'size' of the job is not check - needs to be improved in the future!
 
@@ -347,16 +394,9 @@ class JobService:
             job_args: Details about the job including e.g. the process graph.
 
         Returns:
-            A dictionary containing the status of the request and the filepath to the output of the job. If an error
-            occurs a serialized service exception is returned.
+            A deferred reply creating the response once the job finished (see :meth:`_finish_process_sync`). If an
+            error occurs a serialized service exception is returned.
         """
-        TypeMap = namedtuple('TypeMap', 'file_extension content_type')
-        type_map = {
-            'Gtiff': TypeMap('tif', 'image/tiff'),
-            'png': TypeMap('png', 'image/png'),
-            'jpeg': TypeMap('jpeg', 'image/jpeg'),
-        }
-
         try:
             # TODO: implement a check that the job qualifies for sync-processing
             # it has to be a "small" job, e.g. constriants for timespan and bboux, but also on spatial resolution
@@ -369,18 +409,61 @@ class JobService:
             if response_create['status'] == 'error':
                 return response_create
 
-            # Start processing
+            # Start processing - wait for the job before it is started to not miss its end
             job_id = response_create["headers"]["Location"].split('/')[-1]
-            job = self.db.query(Job).filter_by(id=job_id).first()
+            event = self.sync_waiter.register(job_id)
             response_process = self.process(user=user, job_id=job_id)
             if response_process['status'] == 'error':
+                self.sync_waiter.unregister(job_id)
                 return response_process
 
             LOGGER.info(f"Job {job_id} is running.")
-            self._update_job_status(job_id=job_id)
-            while job.status in [JobStatus.queued, JobStatus.running]:
-                sleep(10)
-                self._update_job_status(job_id=job_id)
+            return DeferredReply(
+                event=event,
+                finish="_finish_process_sync",
+                timeout=settings.SYNC_TIMEOUT,
+                poll=None if settings.JOB_STATUS_EVENTS else "_is_sync_job_done",
+                poll_interval=self.sync_poll_interval,
+                args=(user, job_id),
+            )
+
+        except Exception as exp:
+            return ServiceException(500, user["id"], str(exp), links=[]).to_dict()
+
+    def _is_sync_job_done(self, user: Dict[str, Any], job_id: str) -> bool:
+        """Update the status of a synchronously processed job from airflow and return whether it is not running."""
+        self._update_job_status(job_id=job_id)
+        job = self.db.query(Job).filter_by(id=job_id).first()
+        return job.status not in [JobStatus.queued, JobStatus.running]
+
+    def _finish_process_sync(self, user: Dict[str, Any], job_id: str, timed_out: bool = False) -> dict:
+        """Return the location of the resulting file of a synchronously processed job.
+
+        Args:
+            user: The user who processes the job.
+            job_id: The id of the job.
+            timed_out: Whether the job did not finish within the timeout, it is canceled and removed in this case.
+
+        Returns:
+            A dictionary containing the status of the request and the filepath to the output of the job. If an error
+            occurs a serialized service exception is returned.
+        """
+        TypeMap = namedtuple('TypeMap', 'file_extension content_type')
+        type_map = {
+            'Gtiff': TypeMap('tif', 'image/tiff'),
+            'png': TypeMap('png', 'image/png'),
+            'jpeg': TypeMap('jpeg', 'image/jpeg'),
+        }
+
+        try:
+            self.sync_waiter.unregister(job_id)
+            if timed_out:
+                self.cancel_processing(user, job_id)
+                self.delete(user, job_id, delayed=True)
+                msg = f"Job {job_id} did not finish within {settings.SYNC_TIMEOUT} seconds and was canceled."
+                return ServiceException(408, user["id"], msg, internal=False, links=[]).to_dict()
+
+            job = self.db.query(Job).filter_by(id=job_id).first()
             if job.status in [JobStatus.error, JobStatus.canceled]:
                 msg = f"Job {job_id} has status: {job.status}."
                 return ServiceException(400, user["id"], msg, links=[]).to_dict()
@@ -499,7 +582,7 @@ class JobService:
             response = self.authorize(user["id"], job_id, job)
             if isinstance(response, ServiceException):
                 return response.to_dict()
-            self._update_job_status(job_id=job_id)
+            self._refresh_job_status(job_id=job_id)
             job = self.db.query(Job).filter_by(id=job_id).first()
 
             if job.status == JobStatus.error:
@@ -590,6 +673,112 @@ class JobService:
         self.db.commit()
         LOGGER.debug(f"Job Status of job {job_id} is {job.status}")
 
+    @event_handler("airflow", "dag_state_changed")
+    def on_dag_state_changed(self, payload: Dict[str, str]) -> None:
+        """Update the job status from a state change of a dag run published by Airflow.
+
+        Events of older dag runs than the last applied one are skipped, e.g. if the preparation dag finishes after the
+        parallel dag started. For the same dag run only a queued or running job is updated, so a job which was
+        canceled or already finished keeps its status. A successful preparation dag does not finish the job, as the
+        parallel dag still processes it.
+
+        Args:
+            payload: A dictionary with the 'dag_id', the 'state' and the UTC 'execution_date' of the dag run.
+        """
+        job_id = self.dag_handler.get_job_id(payload["dag_id"])
+        job = self.db.query(Job).filter_by(id=job_id).first() if job_id else None
+        new_status = airflow_job_status_mapper.get(payload["state"])
+        if not job or not new_status:
+            LOGGER.debug(f"Skipped state {payload['state']} of dag {payload['dag_id']}")
+            return
+        if new_status == JobStatus.finished and payload["dag_id"] == self.dag_handler.get_preparation_dag_id(job_id):
+            LOGGER.debug(f"Skipped state {payload['state']} of preparation dag {payload['dag_id']}")
+            return
+
+        execution_date = datetime.strptime(payload["execution_date"], "%Y-%m-%dT%H:%M:%S.%f")
+        if job.dag_run_execution_date:
+            if execution_date < job.dag_run_execution_date:
+                return
+            if execution_date == job.dag_run_execution_date \
+                    and job.status not in [JobStatus.queued, JobStatus.running]:
+                return
+        job.dag_run_execution_date = execution_date
+        changed = job.status != new_status
+        if changed:
+            job.status = new_status
+            job.status_updated_at = datetime.utcnow()
+        self.db.commit()
+        LOGGER.debug(f"Job Status of job {job_id} is {job.status}")
+        if changed:
+            self.dispatch("job_status_changed", {"job_id": job_id, "status": str(new_status)})
+
+    @event_handler(service_name, "job_status_changed", handler_type=BROADCAST, reliable_delivery=False)
+    def on_job_status_changed(self, payload: Dict[str, str]) -> None:
+        """Answer a synchronous request waiting for the job if it is not running anymore."""
+        if payload["status"] not in [str(JobStatus.queued), str(JobStatus.running)]:
+            self.sync_waiter.notify(payload["job_id"])
+
+    @event_handler("data", "collections_refreshed")
+    def on_collections_refreshed(self, payload: Dict[str, Any]) -> None:
+        """Drop the cached filepaths of collections the data service refreshed from the catalogue and expired ones.
+
+        New files may have been ingested into a refreshed collection, so its filepaths need to be resolved again.
+        """
+        min_created_at = datetime.utcnow() - timedelta(seconds=settings.FILEPATHS_CACHE_TTL)
+        deleted = self.db.query(FilepathLookup) \
+            .filter(or_(FilepathLookup.collection_id.in_(payload["collections"]),
+                        FilepathLookup.created_at < min_created_at)) \
+            .delete(synchronize_session=False)
+        self.db.commit()
+        LOGGER.info(f"Dropped {deleted} cached filepath lookups")
+
+    @timer(interval=settings.CLEANUP_INTERVAL)
+    def delete_expired_jobs(self) -> None:
+        """Delete the folders of jobs whose scheduled deletion is due (see :meth:`delete` with delayed=True).
+
+        Pending deletions are stored in the database, so they survive restarts of the service. At most
+        CLEANUP_BATCH_SIZE folders are deleted per run. The selected rows are locked, so multiple instances of the
+        service never delete the same folders. A failed deletion is retried later with an increasing delay.
+        """
+        try:
+            now = datetime.utcnow()
+            deletions = self.db.query(PendingDeletion) \
+                .filter(PendingDeletion.delete_at <= now) \
+                .order_by(PendingDeletion.delete_at) \
+                .limit(settings.CLEANUP_BATCH_SIZE) \
+                .with_for_update(skip_locked=True) \
+                .all()
+            if not deletions:
+                self.db.commit()
+                return
+
+            deleted = set(self.files_service.delete_complete_jobs(
+                jobs=[{"user_id": deletion.user_id, "job_id": deletion.job_id} for deletion in deletions]))
+            for deletion in deletions:
+                if deletion.job_id in deleted:
+                    self.db.delete(deletion)
+                else:
+                    deletion.attempts += 1
+                    retry_delay = settings.CLEANUP_INTERVAL * 2 ** min(deletion.attempts, 6)
+                    deletion.delete_at = now + timedelta(seconds=retry_delay)
+            self.db.commit()
+            LOGGER.info(f"Deleted data on filesystem for {len(deleted)} of {len(deletions)} expired jobs.")
+        except Exception:
+            self.db.rollback()
+            LOGGER.exception("Error while deleting expired jobs")
+
+    @timer(interval=settings.AIRFLOW_METRICS_INTERVAL)
+    def log_airflow_metrics(self) -> None:
+        """Log the number of requests, errors and the latency per Airflow endpoint since the last run."""
+        metrics = self.airflow.metrics.collect()
+        if metrics:
+            LOGGER.info(f"Airflow metrics: {format_metrics(metrics)}")
+
+    def _refresh_job_status(self, job_id: str) -> None:
+        """Update the job status from airflow unless status updates are published by Airflow (JOB_STATUS_EVENTS)."""
+        if not settings.JOB_STATUS_EVENTS:
+            self._update_job_status(job_id=job_id)
+
     def _update_job_status(self, job_id: str) -> None:
         """Update the job status.
 
@@ -603,11 +792,53 @@ class JobService:
             job_id: The id of the job.
         """
         job = self.db.query(Job).filter_by(id=job_id).first()
-        dag_ids = self.dag_handler.get_all_dag_ids(job_id)
+        dag_statuses = {dag_id: self.airflow.check_dag_status(dag_id=dag_id)
+                        for dag_id in self.dag_handler.get_all_dag_ids(job_id)}
+        new_status = self._get_new_job_status(job, dag_statuses)
+        if new_status:
+            job.status = new_status
+            job.status_updated_at = datetime.utcnow()
+            self.db.commit()
+        LOGGER.debug(f"Job Status of job {job_id} is {job.status}")
+
+    def _update_job_statuses(self, jobs: List[Job]) -> None:
+        """Update the status of many jobs at once.
+
+        The status of all dags is requested from airflow in one batch and all changed jobs are committed in a single
+        transaction. Jobs which are finished, canceled or in error are skipped, restarting them updates their status
+        in :meth:`process`.
+
+        Args:
+            jobs: The jobs to update.
+        """
+        jobs = [job for job in jobs if job.status not in [JobStatus.finished, JobStatus.canceled, JobStatus.error]]
+        job_dag_ids = {job.id: self.dag_handler.get_all_dag_ids(job.id) for job in jobs}
+        dag_statuses = self.airflow.check_dag_statuses([dag_id for dag_ids in job_dag_ids.values()
+                                                        for dag_id in dag_ids])
+        updated = 0
+        for job in jobs:
+            new_status = self._get_new_job_status(
+                job, {dag_id: dag_statuses[dag_id] for dag_id in job_dag_ids[job.id]})
+            if new_status:
+                job.status = new_status
+                job.status_updated_at = datetime.utcnow()
+                updated += 1
+        if updated:
+            self.db.commit()
+        LOGGER.debug(f"Updated Job Status of {updated} of {len(jobs)} jobs")
+
+    def _get_new_job_status(self, job: Job,
+                            dag_statuses: Dict[str, Tuple[Optional[JobStatus], Optional[datetime]]]) \
+            -> Optional[JobStatus]:
+        """Return the new status of a job from the status of its dags or None if it should not be updated.
+
+        Args:
+            job: The job.
+            dag_statuses: The status and last execution date of each dag of the job as returned from airflow.
+        """
         all_status = []
         all_execution_time = []
-        for dag_id in dag_ids:
-            new_status, execution_time = self.airflow.check_dag_status(dag_id=dag_id)
+        for new_status, execution_time in dag_statuses.values():
             if new_status and (not job.status
                                or job.status in [JobStatus.created,
                                                  JobStatus.queued,
@@ -621,18 +852,14 @@ class JobService:
                 all_status.append(new_status)
                 all_execution_time.append(execution_time)
 
-        if all_status:
-            # both equal or one was not rerun after cancel > only one value in list
-            if all(status == all_status[0] for status in all_status):
-                job.status = all_status[0]
-            else:
-                # execution time should always be set except when created is returned > both created > above case
-                idx = all_execution_time.index(max(all_execution_time))
-                job.status = all_status[idx]
-
-            job.status_updated_at = datetime.utcnow()
-            self.db.commit()
-        LOGGER.debug(f"Job Status of job {job_id} is {job.status}")
+        if not all_status:
+            return None
+        # both equal or one was not rerun after cancel > only one value in list
+        if all(status == all_status[0] for status in all_status):
+            return all_status[0]
+        # execution time should always be set except when created is returned > both created > above case
+        idx = all_execution_time.index(max(all_execution_time))
+        return all_status[idx]
 
     def get_latest_job_folder(self, user_id: str, job_id: str) -> str:
         """Get absolute path to latest job_run folder of a user.
@@ -647,6 +874,45 @@ class JobService:
         latest_job_run = self.files_service.get_latest_job_run_folder_name(user_id, job_id)
         return os.path.join(settings.AIRFLOW_OUTPUT, user_id, "jobs", job_id, latest_job_run)
 
+    def _reuse_dag(self, user_id: str, job: Job, dag_inputs: Dict[str, Any]) -> bool:
+        """Reuse the dag files of the last run of a job if they were written from the same inputs.
+
+        A reused dag is already known to Airflow, so it can be triggered directly without waiting until Airflow
+        parsed a new dag file. The dag writes into the latest job run folder, which is emptied for the new run. If
+        this folder does not exist anymore the dag files are written again.
+
+        Args:
+            user_id: The identifier of the user.
+            job: The job to process.
+            dag_inputs: All inputs the dag files would be written from but the job run folder.
+
+        Returns:
+            Whether the existing dag files are used.
+        """
+        dag_id = self.dag_handler.get_preparation_dag_id(job.id)
+        if not job.dag_fingerprint or not os.path.isfile(self.dag_handler.get_dag_path_from_id(dag_id)):
+            return False
+        # The job run folder the dag writes into may have been removed in the meantime
+        job_runs = self.files_service.get_job_run_folder_names(user_id, job.id)
+        if not job_runs:
+            return False
+        job_run = job_runs[-1]
+        job_data = os.path.join(settings.AIRFLOW_OUTPUT, user_id, "jobs", job.id, job_run)
+        if self._get_dag_fingerprint(job_data, dag_inputs) != job.dag_fingerprint:
+            return False
+
+        self.files_service.delete_job_run(user_id, job.id, job_run)
+        self.files_service.setup_jobs_result_folder(user_id=user_id, job_id=job.id, job_run=job_run)
+        LOGGER.info(f"Reusing dag files of job {job.id}")
+        return True
+
+    @staticmethod
+    def _get_dag_fingerprint(job_data: str, dag_inputs: Dict[str, Any]) -> str:
+        """Return a hash of the job run folder, the dag writer version and all other inputs of the dag files."""
+        fingerprint = json.dumps(dict(dag_inputs, job_data=job_data, dag_writer_version=DAG_WRITER_VERSION),
+                                 sort_keys=True, separators=(",", ":"), default=str)
+        return sha256(fingerprint.encode("utf-8")).hexdigest()
+
     def _get_old_job_folders(self, user_id: str, job_id: str) -> List[str]:
         """Get absolute path to all job_runs but the latest one."""
         old_job_runs = self.files_service.get_old_job_run_folder_names()
@@ -657,18 +923,38 @@ class JobService:
 
         This will stop any successor tasks to start but it will not stop the currently running task.
 
+        The STOP file is written and a stop request is published, which the CancelOp sensor of a running job receives
+        immediately. Afterwards this waits until the job is not running anymore - woken up by the job status events
+        (setting JOB_STATUS_EVENTS) and otherwise checking the dag status every check_stop_interval seconds, but at
+        most STOP_TIMEOUT seconds.
+
         Args:
             user_id: The identifier of the user.
             job_id: The id of the job.
         """
+        event = self.sync_waiter.register(job_id)
+        dag_ids = self.dag_handler.get_all_dag_ids(job_id)
         self.files_service.upload_stop_job_file(user_id, job_id)
+        self.dispatch("job_stop_requested", {"job_id": job_id, "dag_ids": dag_ids})
 
         # Wait till job is stopped
-        job_stopped = False
-        while not job_stopped:
+        deadline = monotonic() + settings.STOP_TIMEOUT
+        while not event.ready():
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                self.sync_waiter.unregister(job_id)
+                LOGGER.warning(f"Job {job_id} was not stopped within {settings.STOP_TIMEOUT} seconds.")
+                return
             LOGGER.info("Waiting for airflow sensor to detect STOP file...")
-            sleep(self.check_stop_interval)
-            job_stopped = self.airflow.check_dag_status(job_id) != JobStatus.running
+            event.wait(min(remaining, self.check_stop_interval))
+            if not event.ready() and self._is_airflow_job_stopped(dag_ids):
+                self.sync_waiter.unregister(job_id)
+                return
+
+    def _is_airflow_job_stopped(self, dag_ids: List[str]) -> bool:
+        """Return whether no dag of a job is running anymore."""
+        dag_statuses = self.airflow.check_dag_statuses(dag_ids)
+        return all(dag_status != JobStatus.running for dag_status, _ in dag_statuses.values())
 
     @staticmethod
     def map_output_format(output_format: str) -> str:
@@ -682,41 +968,30 @@ class JobService:
                 return out_name
         raise ValueError('{} is not a supported output format'.format(output_format))
 
-    def _delayed_delete(self, user: Dict[str, Any], job_id: str) -> None:
-        """Wait for some time and then delete a complete folder structure corresponding to a job.
-
-        This is used for the sync processing to ensure result data is downloaded before it is deleted.
-
-        Args:
-            folder_path {str} -- The full path to the folder to be deleted
-        """
-        # Wait n minutes (allow for enough time to stream file(s) to user)
-        sleep(settings.SYNC_DEL_DELAY)
-        # Delete data on file system
-        self.files_service.delete_complete_job(user_id=user["id"], job_id=job_id)
-        LOGGER.info(f"Deleted data on filesystem for job_id:{job_id}.")
-
     def generate_alphanumeric_id(self, k: int = 16) -> str:
         """Generate a random alpha numeric value."""
         return ''.join(random.choices(string.ascii_letters + string.digits, k=k))
 
-    def _get_in_filepaths(self, process_graph: dict) -> dict:
+    def _get_in_filepaths(self, process_graph: dict, user_id: str) -> dict:
         """Return filepaths for current process_graph.
 
         Generate a dictionary storing in_filepaths, one for any load_collection
-        call in the current process graph.
+        call in the current process graph. load_collection nodes with the same collection, spatial and temporal
+        extent share one lookup. Lookups resolved before (also for other jobs and users) are taken from the cache
+        (setting FILEPATHS_CACHE_TTL), all others are requested concurrently from the data service.
 
         Arguments:
             process_graph {dict} -- an openEO process graph
+            user_id {str} -- the id of the user who processes the graph
 
         Returns:
             in_filepaths -- dict storing lists of in_filepaths, one for each load_collection node
                          -- OR dict with data_response if the request returns an error
         """
-        in_filepaths: dict = {}
+        lookups: Dict[str, Tuple[str, List[float], List[str]]] = {}
+        lookup_nodes: Dict[str, List[str]] = {}
         for node in process_graph:
             if process_graph[node]['process_id'] == 'load_collection':
-                in_filepaths[node] = {}
                 collection_id = process_graph[node]['arguments']['id']
 
                 spatial_extent = [
@@ -728,9 +1003,140 @@ class JobService:
 
                 temporal_extent = process_graph[node]['arguments']['temporal_extent']
 
-                data_response = self.data_service.get_filepaths(collection_id, spatial_extent, temporal_extent)
-                if data_response["status"] == "error":
-                    return data_response
-                in_filepaths[node] = data_response["data"]
+                lookup_key = self.get_lookup_key(collection_id, spatial_extent, temporal_extent)
+                lookups[lookup_key] = (collection_id, spatial_extent, temporal_extent)
+                lookup_nodes.setdefault(lookup_key, []).append(node)
+
+        data_responses = self._get_cached_filepaths(lookups)
+        missing = {lookup_key: lookup for lookup_key, lookup in lookups.items() if lookup_key not in data_responses}
+        if missing:
+            resolved = self._get_collection_filepaths(missing, user_id)
+            self._cache_filepaths(missing, resolved)
+            data_responses.update(resolved)
+
+        in_filepaths: dict = {}
+        for lookup_key, nodes in lookup_nodes.items():
+            data_response = data_responses[lookup_key]
+            if data_response["status"] == "error":
+                return data_response
+            for node in nodes:
+                in_filepaths[node] = dict(data_response["data"])
 
         return in_filepaths
+
+    def _get_collection_filepaths(self, lookups: Dict[str, Tuple[str, List[float], List[str]]],
+                                  user_id: str) -> Dict[str, dict]:
+        """Return all filepaths of many collections requesting them chunk by chunk from the data service.
+
+        The chunks of all lookups are requested concurrently, so the time to get all filepaths is the time of the
+        slowest lookup. Each lookup fails if it did not finish within FILEPATHS_TIMEOUT seconds. The first chunk
+        carries the total number of filepaths, no further chunks are requested once all of them were received.
+
+        Arguments:
+            lookups {Dict[str, Tuple[str, List[float], List[str]]]} -- the collection_id, the spatial_extent
+                [south, east, north, west] and the temporal_extent (e.g. ["2018-06-04", "2018-06-23"]) by lookup key
+            user_id {str} -- the id of the user who processes the graph
+
+        Returns:
+            Dict[str, dict] -- the data response holding all 'filepaths' (and the 'wekeo_job_id' if available)
+                            -- OR the data response of the first failing request, by lookup key
+        """
+        deadline = monotonic() + settings.FILEPATHS_TIMEOUT
+        filepaths: Dict[str, List[str]] = {lookup_key: [] for lookup_key in lookups}
+        data_responses: Dict[str, dict] = {}
+        cursors: Dict[str, Optional[str]] = {lookup_key: None for lookup_key in lookups}
+        total_counts: Dict[str, Optional[int]] = {}
+        while cursors:
+            replies = {
+                lookup_key: self.data_service.get_filepaths.call_async(*lookups[lookup_key], cursor=cursor,
+                                                                       limit=settings.FILEPATHS_CHUNK_SIZE)
+                for lookup_key, cursor in cursors.items()
+            }
+            cursors = {}
+            for lookup_key, reply in replies.items():
+                collection_id = lookups[lookup_key][0]
+                data_response = self._get_filepaths_reply(reply, collection_id, user_id, deadline)
+                if data_response["status"] == "error":
+                    data_responses[lookup_key] = data_response
+                    continue
+                data = data_response["data"]
+                total_count = data.pop("total_count", None)
+                if lookup_key not in total_counts:
+                    total_counts[lookup_key] = total_count
+                    LOGGER.info(f"Requesting {total_count} filepaths of collection {collection_id} in chunks of "
+                                f"{settings.FILEPATHS_CHUNK_SIZE}")
+                filepaths[lookup_key].extend(data.pop("filepaths"))
+                next_cursor = data.pop("next_cursor", None)
+                if next_cursor is not None and not self._has_all_filepaths(filepaths[lookup_key],
+                                                                           total_counts[lookup_key]):
+                    cursors[lookup_key] = next_cursor
+                    continue
+                if total_counts[lookup_key] is not None and len(filepaths[lookup_key]) != total_counts[lookup_key]:
+                    LOGGER.warning(f"Retrieved {len(filepaths[lookup_key])} filepaths of collection {collection_id}"
+                                   f" but {total_counts[lookup_key]} were counted")
+                LOGGER.info(f"Retrieved {len(filepaths[lookup_key])} filepaths of collection {collection_id}")
+                data["filepaths"] = filepaths[lookup_key]
+                data_responses[lookup_key] = {
+                    "status": "success",
+                    "code": 200,
+                    "data": data,
+                }
+        return data_responses
+
+    @staticmethod
+    def _has_all_filepaths(filepaths: List[str], total_count: Optional[int]) -> bool:
+        """Return whether all filepaths counted by the data service were received."""
+        return total_count is not None and len(filepaths) >= total_count
+
+    @staticmethod
+    def get_lookup_key(collection_id: str, spatial_extent: List[float], temporal_extent: List[str]) -> str:
+        """Return a hash identifying the filepaths of a collection in a spatial and temporal extent.
+
+        The coordinates are converted to floats, so e.g. 10 and 10.0 result in the same key.
+        """
+        lookup = [collection_id, [float(coordinate) for coordinate in spatial_extent], temporal_extent]
+        return sha256(json.dumps(lookup, separators=(",", ":")).encode("utf-8")).hexdigest()
+
+    def _get_cached_filepaths(self, lookups: Dict[str, Tuple[str, List[float], List[str]]]) -> Dict[str, dict]:
+        """Return the data responses of all lookups which are cached and not expired by lookup key."""
+        if not settings.FILEPATHS_CACHE_TTL or not lookups:
+            return {}
+        min_created_at = datetime.utcnow() - timedelta(seconds=settings.FILEPATHS_CACHE_TTL)
+        cached = self.db.query(FilepathLookup) \
+            .filter(FilepathLookup.id.in_(list(lookups))) \
+            .filter(FilepathLookup.created_at >= min_created_at) \
+            .all()
+        for entry in cached:
+            LOGGER.info(f"Reused cached filepaths of collection {entry.collection_id} from {entry.created_at}")
+        return {entry.id: {"status": "success", "code": 200, "data": dict(entry.data)} for entry in cached}
+
+    def _cache_filepaths(self, lookups: Dict[str, Tuple[str, List[float], List[str]]],
+                         data_responses: Dict[str, dict]) -> None:
+        """Store the data responses of all successful lookups in the cache."""
+        if not settings.FILEPATHS_CACHE_TTL:
+            return
+        for lookup_key, data_response in data_responses.items():
+            if data_response["status"] == "success":
+                self.db.merge(FilepathLookup(id=lookup_key, collection_id=lookups[lookup_key][0],
+                                             data=data_response["data"], created_at=datetime.utcnow()))
+        try:
+            self.db.commit()
+        except SQLAlchemyError as exp:
+            # Another instance cached the same lookup at the same time
+            self.db.rollback()
+            LOGGER.warning(f"Resolved filepaths could not be cached: {exp}")
+
+    def _get_filepaths_reply(self, reply: Any, collection_id: str, user_id: str, deadline: float) -> dict:
+        """Wait for the reply of an asynchronous get_filepaths call until the deadline is reached.
+
+        Returns:
+            dict -- the data response OR a serialized service exception if the deadline was reached
+        """
+        try:
+            with eventlet.Timeout(max(deadline - monotonic(), 0)):
+                return reply.result()
+        except eventlet.Timeout:
+            msg = f"Filepaths of collection {collection_id} could not be retrieved within " \
+                  f"{settings.FILEPATHS_TIMEOUT} seconds."
+            LOGGER.error(msg)
+            return ServiceException(504, user_id, msg, links=[]).to_dict()
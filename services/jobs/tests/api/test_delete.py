@@ -1,10 +1,11 @@
 """Test delete job."""
+from datetime import datetime, timedelta
 from os.path import isfile
 
 import pytest
 from nameko_sqlalchemy.database_session import Session
 
-from jobs.models import Job
+from jobs.models import Job, PendingDeletion
 from tests.utils import add_job, get_configured_job_service, get_random_user
 from .base import BaseCase
 
@@ -35,6 +36,41 @@ class TestDeleteJob(BaseCase):
             assert not isfile(self.dag_handler.get_dag_path_from_id(dag_id=dag_id))
         assert db_session.query(Job).filter_by(user_id=user["id"]).filter_by(id=job_id).count() == 0
 
+    def test_delete_delayed(self, db_session: Session) -> None:
+        """Check a delayed delete stores the deletion of the job folder which is executed once it expired."""
+        job_service = get_configured_job_service(db_session)
+        user = get_random_user()
+        job_id = add_job(job_service, user=user)
+
+        result = job_service.delete(user=user, job_id=job_id, delayed=True)
+        assert result == {"status": "success", "code": 204}
+        job_service.files_service.delete_complete_job.assert_not_called()
+        assert db_session.query(Job).filter_by(id=job_id).count() == 0
+        deletion = db_session.query(PendingDeletion).filter_by(job_id=job_id).one()
+        assert deletion.user_id == user["id"]
+        assert deletion.delete_at > datetime.utcnow()
+
+        # Not expired yet
+        job_service.delete_expired_jobs()
+        job_service.files_service.delete_complete_jobs.assert_not_called()
+
+        # Failed deletions are retried later
+        deletion.delete_at = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+        job_service.files_service.delete_complete_jobs.return_value = []
+        job_service.delete_expired_jobs()
+        job_service.files_service.delete_complete_jobs.assert_called_once_with(
+            jobs=[{"user_id": user["id"], "job_id": job_id}])
+        deletion = db_session.query(PendingDeletion).filter_by(job_id=job_id).one()
+        assert deletion.attempts == 1
+        assert deletion.delete_at > datetime.utcnow()
+
+        deletion.delete_at = datetime.utcnow() - timedelta(seconds=1)
+        db_session.commit()
+        job_service.files_service.delete_complete_jobs.return_value = [job_id]
+        job_service.delete_expired_jobs()
+        assert db_session.query(PendingDeletion).filter_by(job_id=job_id).count() == 0
+
     def test_stop_running_job(self, db_session: Session) -> None:
         """Check deleting a running job also stops it.
 
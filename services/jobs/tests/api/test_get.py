@@ -1,5 +1,6 @@
 """Test get job."""
 from datetime import datetime
+from urllib.parse import parse_qs, urlparse
 
 import pytest
 from nameko_sqlalchemy.database_session import Session
@@ -84,3 +85,23 @@ class TestGetJob(BaseCase):
                 "links": [],
             }
         }
+
+    def test_get_all_pages(self, db_session: Session) -> None:
+        """Check jobs are listed page by page following the next links."""
+        job_service = get_configured_job_service(db_session)
+        user = get_random_user()
+        job_ids = [add_job(job_service, user=user) for _ in range(3)]
+
+        result = job_service.get_all(user=user, limit=2)
+        assert [job['id'] for job in result['data']['jobs']] == job_ids[:2]
+        next_link = result['data']['links'][0]
+        assert next_link['rel'] == 'next'
+        assert next_link['href'].startswith('jobs?limit=2&cursor=')
+        cursor = parse_qs(urlparse(next_link['href']).query)['cursor'][0]
+
+        result = job_service.get_all(user=user, limit=2, cursor=cursor)
+        assert [job['id'] for job in result['data']['jobs']] == job_ids[2:]
+        assert result['data']['links'] == []
+
+        result = job_service.get_all(user=user, limit=2, cursor='invalid')
+        assert result['code'] == 400
@@ -2,13 +2,17 @@
 from datetime import datetime
 from os import listdir
 from os.path import isdir, isfile, join
+from shutil import rmtree
+from typing import Any
+from unittest.mock import MagicMock
 
 import pytest
 from dynaconf import settings
 from nameko_sqlalchemy.database_session import Session
 
+from jobs import service
 from jobs.dependencies.dag_handler import DagHandler
-from jobs.models import JobStatus
+from jobs.models import Job, JobStatus
 from tests.utils import add_job, get_configured_job_service, get_random_user
 from .base import BaseCase
 from .exceptions import get_cannot_start_processing
@@ -75,3 +79,35 @@ class TestProcessJob(BaseCase):
         assert isfile(dag_handler.get_dag_path_from_id(dag_handler.get_preparation_dag_id(job_id=job_id)))
         # one job run should be present
         assert len([d for d in listdir(settings.JOB_FOLDER) if isdir(join(settings.JOB_FOLDER, d))]) == 1
+
+    def test_reuse_dag(self, db_session: Session, monkeypatch: Any) -> None:
+        """Test the dag files are only written again if the inputs of the dag changed."""
+        job_service = get_configured_job_service(db_session)
+        job_service.dag_writer = MagicMock(wraps=job_service.dag_writer)
+        user = get_random_user()
+        job_id = add_job(job_service, user=user)
+
+        results = [job_service.process(user=user, job_id=job_id) for _ in range(3)]
+
+        assert all([res == {'code': 202, 'status': 'success'} for res in results])
+        job_service.dag_writer.write_and_move_job.assert_called_once()
+        job_run = job_service.files_service.get_latest_job_run_folder_name(user["id"], job_id)
+        job_service.files_service.delete_job_run.assert_called_with(user["id"], job_id, job_run)
+        assert len([d for d in listdir(settings.JOB_FOLDER) if isdir(join(settings.JOB_FOLDER, d))]) == 1
+
+        job = db_session.query(Job).filter_by(id=job_id).first()
+        job.vrt_flag = not job.vrt_flag
+        db_session.commit()
+        assert job_service.process(user=user, job_id=job_id) == {'code': 202, 'status': 'success'}
+        assert job_service.dag_writer.write_and_move_job.call_count == 2
+
+        # Dag files written by another version of the bindings
+        monkeypatch.setattr(service, "DAG_WRITER_VERSION", "0.0.0")
+        assert job_service.process(user=user, job_id=job_id) == {'code': 202, 'status': 'success'}
+        assert job_service.dag_writer.write_and_move_job.call_count == 3
+
+        # The job run folder was removed outside of the service
+        for job_run in listdir(settings.JOB_FOLDER):
+            rmtree(join(settings.JOB_FOLDER, job_run))
+        assert job_service.process(user=user, job_id=job_id) == {'code': 202, 'status': 'success'}
+        assert job_service.dag_writer.write_and_move_job.call_count == 4
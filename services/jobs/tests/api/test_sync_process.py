@@ -2,6 +2,7 @@
 import pytest
 from nameko_sqlalchemy.database_session import Session
 
+from jobs.dependencies.deferred_rpc import DeferredReply
 from tests.utils import get_configured_job_service, get_random_user, load_json
 
 
@@ -18,8 +19,11 @@ class TestSyncJob:
         _ = job_data.pop("title")
         _ = job_data.pop("description")
 
-        result = job_service.process_sync(user=user, **job_data)
+        deferred = job_service.process_sync(user=user, **job_data)
+        assert isinstance(deferred, DeferredReply)
+        job_service.sync_waiter.register.assert_called_once()
 
+        result = job_service._finish_process_sync(*deferred.args, timed_out=False)
         assert result['status'] == 'success'
         assert 'result/sample-output.tif' in result['file']
         _ = result.pop('file')
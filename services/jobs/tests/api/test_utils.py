@@ -2,10 +2,14 @@
 from datetime import datetime, timedelta
 from typing import Optional, Tuple
 
+import eventlet
 import pytest
+from dynaconf import settings
 from nameko_sqlalchemy.database_session import Session
 
+from jobs.dependencies.deferred_rpc import SyncJobWaiter
 from jobs.models import Job, JobStatus
+from tests.mocks import MockedGetFilepaths
 from tests.utils import add_job, get_configured_job_service, get_random_user
 
 
@@ -50,3 +54,192 @@ class TestUtils:
         job_service._update_job_status(job_id=job_id)
 
         assert db_session.query(Job).filter_by(id=job_id).first().status == ref_job_status
+
+    def test_update_statuses(self, db_session: Session) -> None:
+        """Test the status of many jobs is updated at once and finished or failed jobs are skipped."""
+        job_service = get_configured_job_service(db_session, airflow=False)
+        job_service.airflow.check_dag_statuses.side_effect = \
+            lambda dag_ids: {dag_id: (JobStatus.running, datetime.now()) for dag_id in dag_ids}
+        user = get_random_user()
+        job_ids = [add_job(job_service, user=user) for _ in range(4)]
+        job_service._set_job_status(job_ids[2], JobStatus.finished)
+        job_service._set_job_status(job_ids[3], JobStatus.error)
+
+        jobs = db_session.query(Job).filter(Job.id.in_(job_ids)).all()
+        job_service._update_job_statuses(jobs)
+
+        requested_dag_ids = job_service.airflow.check_dag_statuses.call_args[0][0]
+        assert not any(job_ids[2] in dag_id or job_ids[3] in dag_id for dag_id in requested_dag_ids)
+        assert len(requested_dag_ids) == 4
+        assert [db_session.query(Job).filter_by(id=job_id).first().status for job_id in job_ids] == \
+            [JobStatus.running, JobStatus.running, JobStatus.finished, JobStatus.error]
+
+    def test_dag_state_events(self, db_session: Session) -> None:
+        """Test the job status is updated from published dag states in the order of the dag runs."""
+        job_service = get_configured_job_service(db_session)
+        user = get_random_user()
+        job_id = add_job(job_service, user=user)
+        prep_dag_id = job_service.dag_handler.get_preparation_dag_id(job_id)
+        parallel_dag_id = job_service.dag_handler.get_all_dag_ids(job_id)[1]
+
+        def publish(dag_id: str, state: str, execution_date: datetime) -> JobStatus:
+            job_service.on_dag_state_changed({"dag_id": dag_id, "state": state,
+                                              "execution_date": execution_date.strftime("%Y-%m-%dT%H:%M:%S.%f")})
+            return db_session.query(Job).filter_by(id=job_id).first().status
+
+        run_prep = datetime.utcnow()
+        run_parallel = run_prep + timedelta(minutes=1)
+        assert publish(prep_dag_id, "running", run_prep) == JobStatus.running
+        assert publish(parallel_dag_id, "running", run_parallel) == JobStatus.running
+        # The preparation dag run is older than the parallel one
+        assert publish(prep_dag_id, "success", run_prep) == JobStatus.running
+        assert publish(parallel_dag_id, "success", run_parallel) == JobStatus.finished
+        # A late task callback of the same dag run does not change the final status
+        assert publish(parallel_dag_id, "running", run_parallel) == JobStatus.finished
+
+        # Canceled jobs keep their status when airflow marks the dag run as failed
+        job_service._set_job_status(job_id, JobStatus.canceled)
+        assert publish(parallel_dag_id, "failed", run_parallel) == JobStatus.canceled
+        # A restart creates a new dag run
+        assert publish(prep_dag_id, "running", run_parallel + timedelta(minutes=1)) == JobStatus.running
+
+    def test_dag_state_event_preparation_success(self, db_session: Session) -> None:
+        """Test a successful preparation dag does not finish the job while the parallel dag is running."""
+        job_service = get_configured_job_service(db_session)
+        user = get_random_user()
+        job_id = add_job(job_service, user=user)
+        prep_dag_id = job_service.dag_handler.get_preparation_dag_id(job_id)
+        parallel_dag_id = job_service.dag_handler.get_parallel_dag_id(job_id)
+
+        def publish(dag_id: str, state: str, execution_date: datetime) -> JobStatus:
+            job_service.on_dag_state_changed({"dag_id": dag_id, "state": state,
+                                              "execution_date": execution_date.strftime("%Y-%m-%dT%H:%M:%S.%f")})
+            return db_session.query(Job).filter_by(id=job_id).first().status
+
+        run = datetime.utcnow()
+        assert publish(parallel_dag_id, "running", run) == JobStatus.running
+        # The success callback of the preparation dag may report a newer dag run
+        assert publish(prep_dag_id, "success", run) == JobStatus.running
+        assert publish(prep_dag_id, "success", run + timedelta(minutes=1)) == JobStatus.running
+        assert publish(parallel_dag_id, "success", run) == JobStatus.finished
+
+    def test_dag_state_event_after_cancel(self, db_session: Session) -> None:
+        """Test a late failed event of the canceled dag run does not change the status of a canceled queued job."""
+        job_service = get_configured_job_service(db_session)
+        job_service.sync_waiter = SyncJobWaiter()
+        job_service.check_stop_interval = 0.01
+        user = get_random_user()
+        job_id = add_job(job_service, user=user)
+        prep_dag_id = job_service.dag_handler.get_preparation_dag_id(job_id)
+
+        run_prep = datetime.utcnow()
+        job = db_session.query(Job).filter_by(id=job_id).first()
+        job.status = JobStatus.queued
+        job.dag_run_execution_date = run_prep
+        db_session.commit()
+        job_service.airflow.check_dag_status = lambda dag_id: (JobStatus.queued, run_prep)
+
+        assert job_service.cancel_processing(user, job_id)["status"] == "success"
+        assert db_session.query(Job).filter_by(id=job_id).first().status == JobStatus.created
+        job_service.on_dag_state_changed({"dag_id": prep_dag_id, "state": "failed",
+                                          "execution_date": run_prep.strftime("%Y-%m-%dT%H:%M:%S.%f")})
+        assert db_session.query(Job).filter_by(id=job_id).first().status == JobStatus.created
+
+    def test_stop_airflow_job(self, db_session: Session) -> None:
+        """Test stopping a job publishes a stop request and waits until the job is not running anymore."""
+        job_service = get_configured_job_service(db_session)
+        job_service.sync_waiter = SyncJobWaiter()
+        job_service.check_stop_interval = 0.01
+        user = get_random_user()
+        job_id = add_job(job_service, user=user)
+        dag_ids = job_service.dag_handler.get_all_dag_ids(job_id)
+
+        # Airflow reports the dags are not running anymore
+        job_service._stop_airflow_job(user["id"], job_id)
+        job_service.files_service.upload_stop_job_file.assert_called_once_with(user["id"], job_id)
+        job_service.dispatch.assert_called_once_with("job_stop_requested", {"job_id": job_id, "dag_ids": dag_ids})
+        assert not job_service.sync_waiter.notify(job_id)
+
+        # The status event of the stopped job is received before the dags are checked
+        job_service.airflow.check_dag_statuses = lambda dag_ids: {dag_id: (JobStatus.running, None)
+                                                                  for dag_id in dag_ids}
+        payload = {"job_id": job_id, "status": str(JobStatus.error)}
+        eventlet.spawn_after(0.05, job_service.on_job_status_changed, payload)
+        job_service._stop_airflow_job(user["id"], job_id)
+        assert not job_service.sync_waiter.notify(job_id)
+
+    def test_get_in_filepaths(self, db_session: Session) -> None:
+        """Test the filepaths of all load_collection nodes are requested concurrently and once per lookup."""
+        job_service = get_configured_job_service(db_session)
+        job_service.data_service.get_filepaths = MockedGetFilepaths()
+        spatial_extent = {"south": 46.5, "east": 10.5, "north": 47.5, "west": 9.5}
+        process_graph = {
+            node_id: {
+                "process_id": "load_collection",
+                "arguments": {"id": collection_id, "spatial_extent": spatial_extent,
+                              "temporal_extent": ["2018-06-04", "2018-06-23"]},
+            } for node_id, collection_id in [("s1_1", "s1"), ("s2", "s2"), ("s1_2", "s1")]
+        }
+        process_graph["save"] = {"process_id": "save_result", "arguments": {"data": {"from_node": "s2"}}}
+
+        chunk_size = settings.FILEPATHS_CHUNK_SIZE
+        settings.set("FILEPATHS_CHUNK_SIZE", 2)
+        try:
+            in_filepaths = job_service._get_in_filepaths(process_graph, "test-user")
+        finally:
+            settings.set("FILEPATHS_CHUNK_SIZE", chunk_size)
+
+        assert in_filepaths == {
+            "s1_1": {"filepaths": ["s1_0.tif", "s1_1.tif", "s1_2.tif"]},
+            "s1_2": {"filepaths": ["s1_0.tif", "s1_1.tif", "s1_2.tif"]},
+            "s2": {"filepaths": ["s2_0.tif", "s2_1.tif", "s2_2.tif"]},
+        }
+        # Chunks of both collections are requested in the same round
+        assert job_service.data_service.get_filepaths.calls == [("s1", None), ("s2", None), ("s1", "2"), ("s2", "2")]
+
+    def test_get_in_filepaths_total_count(self, db_session: Session) -> None:
+        """Test no further chunks are requested once the total count of filepaths was received."""
+        job_service = get_configured_job_service(db_session)
+        job_service.data_service.get_filepaths = MockedGetFilepaths(last_cursor=True)
+        process_graph = {"s1": {"process_id": "load_collection", "result": True, "arguments": {
+            "id": "s1", "spatial_extent": {"south": 46.5, "east": 10.5, "north": 47.5, "west": 9.5},
+            "temporal_extent": ["2018-07-01", "2018-07-10"]}}}
+
+        chunk_size = settings.FILEPATHS_CHUNK_SIZE
+        settings.set("FILEPATHS_CHUNK_SIZE", 3)
+        try:
+            in_filepaths = job_service._get_in_filepaths(process_graph, "test-user")
+        finally:
+            settings.set("FILEPATHS_CHUNK_SIZE", chunk_size)
+
+        assert in_filepaths == {"s1": {"filepaths": ["s1_0.tif", "s1_1.tif", "s1_2.tif"]}}
+        assert job_service.data_service.get_filepaths.calls == [("s1", None)]
+
+    def test_cached_filepaths(self, db_session: Session) -> None:
+        """Test resolved filepaths are reused until the data service refreshed the collection."""
+        job_service = get_configured_job_service(db_session)
+        job_service.data_service.get_filepaths = MockedGetFilepaths()
+        process_graph = {
+            collection_id: {
+                "process_id": "load_collection",
+                "arguments": {"id": collection_id,
+                              "spatial_extent": {"south": 46.5, "east": 10, "north": 47.5, "west": 9.5},
+                              "temporal_extent": ["2018-06-04", "2018-06-23"]},
+            } for collection_id in ["s1", "s2"]
+        }
+        ref_in_filepaths = {
+            "s1": {"filepaths": ["s1_0.tif", "s1_1.tif", "s1_2.tif"]},
+            "s2": {"filepaths": ["s2_0.tif", "s2_1.tif", "s2_2.tif"]},
+        }
+
+        assert job_service._get_in_filepaths(process_graph, "user-1") == ref_in_filepaths
+        assert job_service.data_service.get_filepaths.calls == [("s1", None), ("s2", None)]
+
+        # Same lookups of another user, coordinates as float
+        process_graph["s1"]["arguments"]["spatial_extent"]["east"] = 10.0
+        assert job_service._get_in_filepaths(process_graph, "user-2") == ref_in_filepaths
+        assert job_service.data_service.get_filepaths.calls == [("s1", None), ("s2", None)]
+
+        job_service.on_collections_refreshed({"collections": ["s1"]})
+        assert job_service._get_in_filepaths(process_graph, "user-1") == ref_in_filepaths
+        assert job_service.data_service.get_filepaths.calls == [("s1", None), ("s2", None), ("s1", None)]
@@ -193,6 +193,10 @@ class MockedAirflowConnection(MagicMock):
         """Return JobStatus.create, None."""
         return JobStatus.created, None
 
+    def check_dag_statuses(self, dag_ids: List[str]) -> Dict[str, Tuple[Optional[JobStatus], Optional[datetime]]]:
+        """Return the result of check_dag_status for each dag."""
+        return {dag_id: self.check_dag_status(dag_id=dag_id) for dag_id in dag_ids}
+
 
 class MockedDagDomain(NamedTuple):
     """Mocked DagDomain."""
@@ -244,7 +248,7 @@ class MockedFilesService(MagicMock):
 
     def setup_jobs_result_folder(self, user_id: str, job_id: str, job_run: Optional[str] = None) -> str:
         """Set up a new job run with results folder and return the path."""
-        folder_name = self.get_new_job_run_folder_name()
+        folder_name = job_run or self.get_new_job_run_folder_name()
         to_create = join(settings.JOB_FOLDER, folder_name)
         if not os.path.exists(to_create):
             os.makedirs(to_create)
@@ -258,6 +262,10 @@ class MockedFilesService(MagicMock):
         """Return folder name of new job run folder."""
         return f"jr-{datetime.utcnow().strftime('%Y%m%dT%H%M%S%f')}"
 
+    def get_job_run_folder_names(self, user_id: str, job_id: str) -> List[str]:
+        """Return the sorted job_run folder names."""
+        return [job_run.split(os.sep)[-1] for job_run in sorted(glob.glob(settings.JOB_FOLDER + '/*'))]
+
     def get_latest_job_run_folder_name(self, user_id: str, job_id: str) -> str:
         """Return newest job_run folder name."""
         latest_job_run = sorted(glob.glob(settings.JOB_FOLDER + '/*'))[-1]
@@ -270,6 +278,46 @@ class MockedFilesService(MagicMock):
             shutil.rmtree(job_run)
 
 
+class MockedRpcReply(NamedTuple):
+    """Mocked reply of an asynchronous rpc call."""
+
+    response: Dict[str, Any]
+
+    def result(self) -> Dict[str, Any]:
+        """Return the response."""
+        return self.response
+
+
+class MockedGetFilepaths:
+    """Mocked get_filepaths method of the DataService returning three filepaths per collection in chunks.
+
+    If last_cursor is set a cursor is returned with the last chunk as well - like a data service which cannot tell
+    whether further files exist.
+    """
+
+    def __init__(self, last_cursor: bool = False) -> None:
+        """Initialise MockedGetFilepaths."""
+        self.calls: List[Tuple[str, Optional[str]]] = []
+        self.last_cursor = last_cursor
+
+    def call_async(self, collection_id: str, spatial_extent: List[float], temporal_extent: List[str],
+                   cursor: Optional[str] = None, limit: Optional[int] = None) -> MockedRpcReply:
+        """Return a reply with the requested chunk of the filepaths of the collection."""
+        self.calls.append((collection_id, cursor))
+        all_filepaths = [f"{collection_id}_{idx}.tif" for idx in range(3)]
+        start = int(cursor) if cursor else 0
+        end = len(all_filepaths) if limit is None else start + limit
+        return MockedRpcReply({
+            "status": "success",
+            "code": 200,
+            "data": {
+                "filepaths": all_filepaths[start:end],
+                "next_cursor": str(end) if end < len(all_filepaths) or self.last_cursor else None,
+                "total_count": len(all_filepaths),
+            },
+        })
+
+
 class MockedDagHandler(MagicMock):
     """Mocked DagHandler."""
 
@@ -284,6 +332,14 @@ class MockedDagHandler(MagicMock):
         """Return original get_all_dag_ids."""
         return self.original_dag_handler.get_all_dag_ids(job_id=job_id)
 
+    def get_job_id(self, dag_id: str) -> Optional[str]:
+        """Return original get_job_id."""
+        return self.original_dag_handler.get_job_id(dag_id=dag_id)
+
+    def get_dag_path_from_id(self, dag_id: str) -> str:
+        """Return original get_dag_path_from_id."""
+        return self.original_dag_handler.get_dag_path_from_id(dag_id=dag_id)
+
     def remove_all_dags(self, job_id: str) -> None:
         """Execute original remove_all_dags."""
         return self.original_dag_handler.remove_all_dags(job_id=job_id)
@@ -0,0 +1,111 @@
+"""Test the retries, the circuit breaker and the metrics of the Airflow REST connection."""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from threading import Barrier
+from typing import Any, List
+
+import pytest
+import requests
+
+from jobs.dependencies.airflow_conn import AirflowRestConnection, CircuitBreaker, EndpointMetrics
+from jobs.dependencies.settings import initialise_settings
+
+initialise_settings()
+
+
+class MockedResponse:
+    """Response with the given status code."""
+
+    def __init__(self, status_code: int) -> None:
+        """Initialise MockedResponse."""
+        self.status_code = status_code
+        self.ok = status_code < 400
+
+
+class MockedSession:
+    """Session returning the given status codes in order, None raises a connection error."""
+
+    def __init__(self, status_codes: List[Any]) -> None:
+        """Initialise MockedSession."""
+        self.status_codes = status_codes
+        self.requests: List[str] = []
+
+    def request(self, method: str, url: str, **kwargs: Any) -> MockedResponse:
+        """Return the next response."""
+        self.requests.append(f"{method} {url.split('/api/experimental/dags/')[-1]}")
+        status_code = self.status_codes.pop(0)
+        if status_code is None:
+            raise requests.ConnectionError("Connection refused")
+        return MockedResponse(status_code)
+
+
+def get_connection(status_codes: List[Any], threshold: int = 5) -> AirflowRestConnection:
+    """Return a connection using a MockedSession without delays between retries."""
+    connection = AirflowRestConnection("http://airflow", session=MockedSession(status_codes),
+                                       breaker=CircuitBreaker(threshold=threshold, reset_timeout=60),
+                                       metrics=EndpointMetrics())
+    connection.backoff_base = 0
+    return connection
+
+
+def test_trigger_dag_retries() -> None:
+    """Test unpausing is retried until the dag is parsed and server errors are retried."""
+    connection = get_connection([404, 404, 200, None, 503, 200])
+    assert connection.trigger_dag("jb-1_prep")
+    assert connection.session.requests == ["GET jb-1_prep/paused/False"] * 3 + ["POST jb-1_prep/dag_runs"] * 3
+
+    metrics = connection.metrics.collect()
+    assert metrics["unpause_dag"]["count"] == 3
+    assert metrics["unpause_dag"]["errors"] == 0
+    assert metrics["trigger_dag"]["count"] == 3
+    assert metrics["trigger_dag"]["errors"] == 2
+    assert connection.metrics.collect() == {}
+
+
+@pytest.mark.parametrize(("status_codes", "deleted"), (
+    ([200], True),
+    ([404], False),
+))
+def test_delete_dag_client_errors(status_codes: List[Any], deleted: bool) -> None:
+    """Test client errors are not retried."""
+    connection = get_connection(status_codes)
+    assert connection.delete_dag("jb-1_prep") == deleted
+    assert len(connection.session.requests) == 1
+
+
+def test_circuit_breaker() -> None:
+    """Test requests are stopped after repeated failures until the reset timeout passed."""
+    connection = get_connection([None, None, 200], threshold=2)
+    assert connection.check_dag_status("jb-1_prep") == (None, datetime.min)
+    assert len(connection.session.requests) == 2
+    assert not connection.delete_dag("jb-1_prep")
+    assert len(connection.session.requests) == 2
+
+    connection.breaker.reset_timeout = 0
+    assert connection.delete_dag("jb-1_prep")
+    assert len(connection.session.requests) == 3
+
+
+def test_circuit_breaker_half_open() -> None:
+    """Test only a single trial request is let through concurrently once the reset timeout passed."""
+    breaker = CircuitBreaker(threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    barrier = Barrier(10)
+
+    def allow(_: int) -> bool:
+        barrier.wait()
+        return breaker.allow()
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        assert sum(executor.map(allow, range(10))) == 1
+
+    # The failed trial opens the circuit again
+    breaker.reset_timeout = 60
+    breaker.record_failure()
+    assert not breaker.allow()
+
+    breaker.reset_timeout = 0
+    assert breaker.allow()
+    assert not breaker.allow()
+    breaker.record_success()
+    assert breaker.allow() and breaker.allow()
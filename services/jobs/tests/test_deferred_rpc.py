@@ -0,0 +1,156 @@
+"""Test the deferred rpc entrypoint and the waiter of synchronously processed jobs."""
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import eventlet
+from eventlet.event import Event
+
+from jobs.dependencies import deferred_rpc
+from jobs.dependencies.deferred_rpc import DeferredReply, DeferredRpc, SyncJobWaiter
+
+
+class MockedService:
+    """Service with a poll method returning the given results in order."""
+
+    poll_results: List[bool] = []
+
+    def check(self, job_id: str) -> bool:
+        """Return the next poll result."""
+        return self.poll_results.pop(0)
+
+    def finish(self, job_id: str, timed_out: bool = False) -> str:
+        """Return the reply of a synchronously processed job."""
+        return f"{job_id} timed out" if timed_out else f"{job_id} finished"
+
+
+class MockedContainer:
+    """Container running workers directly in the calling thread."""
+
+    config = {"AMQP_URI": "memory://"}
+
+    def __init__(self) -> None:
+        """Initialise MockedContainer."""
+        self.workers: List[str] = []
+        self.threads: List[Any] = []
+
+    def spawn_worker(self, entrypoint: Any, args: tuple, kwargs: dict, context_data: Any = None,
+                     handle_result: Optional[Callable] = None) -> None:
+        """Run the method of the entrypoint and pass its result to handle_result."""
+        self.workers.append(entrypoint.method_name)
+        result = getattr(MockedService(), entrypoint.method_name)(*args, **kwargs)
+        handle_result(None, result, None)
+
+    def spawn_managed_thread(self, run_method: Callable, identifier: str = None) -> None:
+        """Run the method in a new green thread."""
+        self.threads.append(eventlet.spawn(run_method))
+
+
+class MockedQueueConsumer:
+    """Queue consumer which delivers no further messages once prefetch_count messages are not acknowledged."""
+
+    def __init__(self, prefetch_count: int) -> None:
+        """Initialise MockedQueueConsumer."""
+        self.prefetch_count = prefetch_count
+        self.unacked: List[Dict[str, Any]] = []
+
+    def deliver(self, message: Dict[str, Any]) -> bool:
+        """Return whether the message is delivered to the consumer."""
+        if len(self.unacked) >= self.prefetch_count:
+            return False
+        self.unacked.append(message)
+        return True
+
+    def ack_message(self, message: Dict[str, Any]) -> None:
+        """Acknowledge the message."""
+        self.unacked.remove(message)
+
+
+class MockedRpcConsumer:
+    """Rpc consumer sending the reply and acknowledging the message."""
+
+    def __init__(self, queue_consumer: MockedQueueConsumer, replies: List[Tuple[str, Any]]) -> None:
+        """Initialise MockedRpcConsumer."""
+        self.queue_consumer = queue_consumer
+        self.replies = replies
+
+    def handle_result(self, message: Dict[str, Any], result: Any, exc_info: Any) -> Tuple[Any, Any]:
+        """Reply and acknowledge the message."""
+        self.replies.append((message["correlation_id"], result))
+        self.queue_consumer.ack_message(message)
+        return result, exc_info
+
+
+def get_entrypoint(container: MockedContainer) -> DeferredRpc:
+    """Return a DeferredRpc bound to the given container."""
+    entrypoint = DeferredRpc()
+    entrypoint.container = container
+    return entrypoint
+
+
+def test_wait_for_event() -> None:
+    """Test waiting returns as soon as the event was sent and False once the timeout is reached."""
+    entrypoint = get_entrypoint(MockedContainer())
+    waiter = SyncJobWaiter()
+
+    event = waiter.register("jb-1")
+    assert waiter.notify("jb-1")
+    assert entrypoint._wait(DeferredReply(event=event, finish="finish", timeout=10))
+    assert not waiter.notify("jb-1")
+
+    event = waiter.register("jb-2")
+    assert not entrypoint._wait(DeferredReply(event=event, finish="finish", timeout=0.01))
+
+
+def test_wait_with_poll() -> None:
+    """Test the poll method is called in new workers until it returns True."""
+    container = MockedContainer()
+    entrypoint = get_entrypoint(container)
+    MockedService.poll_results = [False, False, True]
+
+    deferred = DeferredReply(event=Event(), finish="finish", timeout=10, poll="check", poll_interval=0.01,
+                             args=("jb-1",))
+    assert entrypoint._wait(deferred)
+    assert container.workers == ["check", "check", "check"]
+    assert MockedService.poll_results == []
+
+
+def test_pending_deferred_replies_do_not_block_requests(monkeypatch: Any) -> None:
+    """Test requests waiting for their deferred reply do not hold prefetched messages of the consumer."""
+    replies: List[Tuple[str, Any]] = []
+
+    class MockedResponder:
+        def __init__(self, amqp_uri: str, exchange: Any, serializer: str, message: Dict[str, Any],
+                     **kwargs: Any) -> None:
+            self.message = message
+
+        def send_response(self, result: Any, exc_info: Any) -> Tuple[Any, Any]:
+            replies.append((self.message["correlation_id"], result))
+            return result, exc_info
+
+    monkeypatch.setattr(deferred_rpc, "Responder", MockedResponder)
+    container = MockedContainer()
+    entrypoint = get_entrypoint(container)
+    entrypoint.method_name = "process_sync"
+    queue_consumer = MockedQueueConsumer(prefetch_count=2)
+    entrypoint.rpc_consumer = MockedRpcConsumer(queue_consumer, replies)
+
+    waiter = SyncJobWaiter()
+    for job_id in ("jb-1", "jb-2", "jb-3"):
+        message = {"correlation_id": job_id}
+        assert queue_consumer.deliver(message)
+        deferred = DeferredReply(event=waiter.register(job_id), finish="finish", timeout=10, args=(job_id,))
+        entrypoint.handle_result(message, SimpleNamespace(data={}), deferred, None)
+    assert queue_consumer.unacked == []
+
+    message = {"correlation_id": "get_all"}
+    assert queue_consumer.deliver(message)
+    entrypoint.handle_result(message, SimpleNamespace(data={}), "jobs", None)
+    assert replies == [("get_all", "jobs")]
+    assert queue_consumer.unacked == []
+
+    for job_id in ("jb-1", "jb-2", "jb-3"):
+        waiter.notify(job_id)
+    for thread in container.threads:
+        thread.wait()
+    assert replies[1:] == [("jb-1", "jb-1 finished"), ("jb-2", "jb-2 finished"), ("jb-3", "jb-3 finished")]
+    assert queue_consumer.unacked == []
@@ -0,0 +1,25 @@
+"""add process document
+
+Revision ID: 3c4f8a2d9b61
+Revises: f970bc0608e5
+Create Date: 2026-10-17 10:12:31.482113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c4f8a2d9b61'
+down_revision = 'f970bc0608e5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Filled for existing predefined processes on the first listing
+    op.add_column("process_graphs", sa.Column("document", sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column("process_graphs", "document")
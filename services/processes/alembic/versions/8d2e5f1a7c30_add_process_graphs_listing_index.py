@@ -0,0 +1,24 @@
+"""add process graphs listing index
+
+Revision ID: 8d2e5f1a7c30
+Revises: 3c4f8a2d9b61
+Create Date: 2026-10-17 14:07:48.920114
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2e5f1a7c30'
+down_revision = '3c4f8a2d9b61'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Used by the keyset pagination of a user's process graphs
+    op.create_index('ix_process_graphs_user_id_created_at_id', 'process_graphs', ['user_id', 'created_at', 'id'])
+
+
+def downgrade():
+    op.drop_index('ix_process_graphs_user_id_created_at_id', table_name='process_graphs')
@@ -0,0 +1,169 @@
+"""Provides an in-process catalogue of predefined processes and collection metadata used for validation.
+
+Loading all predefined processes from the database and the collection metadata from the data service for every
+validation is expensive. The catalogue keeps both in memory until they are invalidated - the processes when a
+predefined process is added, the collections when the data service refreshed its cache.
+
+Each part of the catalogue has a version which is increased on invalidation, so data loaded concurrently with an
+invalidation is never stored.
+
+Validation results are stored in a bounded LRU cache keyed by the hash of the canonical JSON of the validated process
+together with the catalogue versions, so identical processes are only validated once per catalogue state.
+"""
+
+import json
+import logging
+from collections import OrderedDict
+from hashlib import sha256
+from threading import Lock
+from typing import Any, Dict, List, Optional, Tuple
+
+from dynaconf import settings
+
+LOGGER = logging.getLogger('standardlog')
+
+
+class Catalogue:
+    """Versioned in-memory catalogue of predefined processes and collection metadata."""
+
+    def __init__(self) -> None:
+        """Initialise Catalogue."""
+        self._lock = Lock()
+        self.processes_version = 0
+        self.collections_version = 0
+        self._processes: Optional[List[dict]] = None
+        self._collections: Dict[str, Optional[dict]] = {}
+
+    def get_processes(self) -> Optional[List[dict]]:
+        """Return all predefined processes or None if they are not stored."""
+        with self._lock:
+            return self._processes
+
+    def set_processes(self, processes: List[dict], version: int) -> None:
+        """Store all predefined processes.
+
+        Args:
+            processes: The specs of all predefined processes.
+            version: The processes_version before the processes were loaded, they are dropped if it changed since.
+        """
+        with self._lock:
+            if version == self.processes_version:
+                self._processes = processes
+
+    def get_collections(self, collection_ids: List[str]) -> Tuple[List[dict], List[str]]:
+        """Return the stored metadata of the given collections together with the identifiers not stored yet.
+
+        Args:
+            collection_ids: The identifiers of the requested collections.
+        """
+        with self._lock:
+            missing = [collection_id for collection_id in collection_ids if collection_id not in self._collections]
+            collections = [self._collections[collection_id] for collection_id in collection_ids
+                           if self._collections.get(collection_id) is not None]
+        return collections, missing
+
+    def set_collections(self, collection_ids: List[str], collections: List[dict], version: int) -> None:
+        """Store the metadata of the given collections.
+
+        Identifiers without metadata (e.g. not existing collections) are stored as well, so they are not requested
+        again.
+
+        Args:
+            collection_ids: The identifiers of the requested collections.
+            collections: The metadata of the collections found for these identifiers.
+            version: The collections_version before the collections were loaded, they are dropped if it changed since.
+        """
+        loaded = {collection["id"]: collection for collection in collections}
+        with self._lock:
+            if version == self.collections_version:
+                self._collections.update({collection_id: loaded.get(collection_id)
+                                          for collection_id in collection_ids})
+
+    def invalidate_processes(self) -> None:
+        """Drop all stored predefined processes."""
+        with self._lock:
+            self.processes_version += 1
+            self._processes = None
+        LOGGER.debug("Invalidated predefined processes of the catalogue")
+
+    def invalidate_collections(self) -> None:
+        """Drop all stored collection metadata."""
+        with self._lock:
+            self.collections_version += 1
+            self._collections = {}
+        LOGGER.debug("Invalidated collections of the catalogue")
+
+
+catalogue = Catalogue()
+"""Catalogue shared by all workers of the processes service."""
+
+
+class ValidationCache:
+    """Bounded LRU cache of validation errors per process and catalogue version.
+
+    Attributes:
+        hits: The number of lookups answered from the cache.
+        misses: The number of lookups not found in the cache.
+    """
+
+    def __init__(self, maxsize: int = None) -> None:
+        """Initialise ValidationCache, the size defaults to the setting VALIDATION_CACHE_SIZE."""
+        self._maxsize = maxsize
+        self._lock = Lock()
+        self._entries: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def maxsize(self) -> int:
+        """Return the maximum number of stored validation results."""
+        if self._maxsize is not None:
+            return self._maxsize
+        return settings.get("VALIDATION_CACHE_SIZE", 1024)
+
+    def get_key(self, process: Dict[str, Any], catalogue: Catalogue) -> str:
+        """Return the cache key of a process validated against the current state of the catalogue.
+
+        Args:
+            process: The process to validate.
+            catalogue: The catalogue the process is validated against.
+        """
+        canonical = json.dumps(process, sort_keys=True, separators=(",", ":"))
+        return sha256(
+            f"{catalogue.processes_version}:{catalogue.collections_version}:{canonical}".encode()
+        ).hexdigest()
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        """Return a copy of the stored validation errors or None if the key is not stored."""
+        with self._lock:
+            errors = self._entries.get(key)
+            if errors is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return [dict(error) for error in errors]
+
+    def set(self, key: str, errors: List[dict]) -> None:
+        """Store a copy of validation errors, the least recently used entry is dropped if the cache is full."""
+        with self._lock:
+            self._entries[key] = [dict(error) for error in errors]
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Drop all stored validation results and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self) -> Dict[str, int]:
+        """Return the hit and miss counters together with the current and maximum size."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "size": len(self._entries), "maxsize": self.maxsize}
+
+
+validation_cache = ValidationCache()
+"""Validation results shared by all workers of the processes service."""
@@ -19,6 +19,9 @@ class SettingKeys(Enum):
     E.g.: the one for version 1.0.0: https://raw.githubusercontent.com/Open-EO/openeo-processes/1.0.0/
     """
 
+    VALIDATION_CACHE_SIZE = "VALIDATION_CACHE_SIZE"
+    """The maximum number of validation results of process graphs kept in memory - default 1024."""
+
     # Connection to RabbitMQ
     RABBIT_HOST = "RABBIT_HOST"
     """The host name of the RabbitMQ - e.g. `rabbitmq`.
@@ -101,6 +104,7 @@ def initialise_settings() -> None:
     settings.validators.register(
         Validator(SettingKeys.PROCESSES_GITHUB_URL.value, must_exist=True, condition=utils.check_processes_github_url,
                   when=not_doc),
+        Validator(SettingKeys.VALIDATION_CACHE_SIZE.value, default=1024, is_type_of=int),
 
         Validator(SettingKeys.RABBIT_HOST.value, must_exist=True, when=not_doc_unittest),
         Validator(SettingKeys.RABBIT_PORT.value, must_exist=True, is_type_of=int, when=not_doc_unittest),
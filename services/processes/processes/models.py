@@ -5,12 +5,13 @@ This includes all required table definitions and auxiliary data structures.
 
 import enum
 from datetime import datetime
-from typing import Any, Tuple
+from typing import Any, List, Tuple
 
-from sqlalchemy import Boolean, CheckConstraint, Column, DateTime, Enum, Float, ForeignKey, Integer, JSON, String,\
-    TEXT, UniqueConstraint
+from sqlalchemy import Boolean, CheckConstraint, Column, DateTime, Enum, Float, ForeignKey, Index, Integer, JSON, \
+    String, TEXT, UniqueConstraint
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, selectinload
+from sqlalchemy.orm.strategy_options import Load
 
 Base: Any = declarative_base()
 
@@ -43,6 +44,9 @@ class ProcessGraph(Base):
     """Base model for a process graph."""
 
     __tablename__ = 'process_graphs'
+    __table_args__ = (
+        Index('ix_process_graphs_user_id_created_at_id', 'user_id', 'created_at', 'id'),
+    )
 
     id = Column(String, primary_key=True)  # noqa A003
     """Unique string identifier of a process_graph."""
@@ -69,6 +73,12 @@ class ProcessGraph(Base):
     """UTC datetime the job was created (current UTC datetime)."""
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
     """UTC datetime any column of this job was last updated (current UTC datetime)."""
+    document = Column(JSON, nullable=True)
+    """The serialized process description of a predefined process (optional).
+
+    This is a denormalized copy of the process and all related entities used to list predefined processes without
+    loading each relationship.
+    """
 
     categories = relationship('Category', cascade='all, delete, delete-orphan')
     """A list of categories of type :py:class:`~processes.models.Category`."""
@@ -276,3 +286,34 @@ class Link(Base):
     """A string that hints at the format used to represent data at the provided URI (optional)."""
     title = Column(String, nullable=True)
     """Used as a human-readable label for a link (optional)."""
+
+
+def _get_schema_load_options(schemas: Load, depth: int) -> List[Load]:
+    """Return the options to eagerly load schemas including the schemas of their parameters up to the given depth."""
+    options = [schemas.selectinload(Schema.types), schemas.selectinload(Schema.enums)]
+    if depth > 0:
+        parameter_schemas = schemas.selectinload(Schema.parameters).selectinload(Parameter.schemas)
+        options.extend(_get_schema_load_options(parameter_schemas, depth - 1))
+    return options
+
+
+def get_eager_load_options(depth: int = 2) -> List[Load]:
+    """Return query options to load process graphs together with all related entities.
+
+    Each relationship is loaded with a single additional query for all process graphs (selectin loading). Parameters of
+    schemas (e.g. of callbacks) are nested, they are eagerly loaded up to the given depth and lazily below.
+
+    Args:
+        depth: The number of nested parameter levels to load eagerly.
+    """
+    options = [
+        selectinload(ProcessGraph.categories),
+        selectinload(ProcessGraph.exceptions),
+        selectinload(ProcessGraph.links),
+        selectinload(ProcessGraph.examples),
+    ]
+    options.extend(_get_schema_load_options(
+        selectinload(ProcessGraph.parameters).selectinload(Parameter.schemas), depth))
+    options.extend(_get_schema_load_options(
+        selectinload(ProcessGraph.returns).selectinload(Return.schemas), depth))
+    return options
@@ -0,0 +1,91 @@
+"""Provides keyset pagination for listings of database entries.
+
+Entries are ordered by their creation time and identifier. A page is requested with a `limit` and an opaque `cursor`
+pointing to the last entry of the previous page, so the database continues from an index position instead of
+skipping all previous rows.
+"""
+
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+from typing import Any, List, Optional, Tuple
+from urllib.parse import urlencode
+
+from sqlalchemy import Column, tuple_
+from sqlalchemy.orm import Query
+
+CURSOR_DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S.%f"
+
+
+def encode_cursor(created_at: datetime, entry_id: str) -> str:
+    """Return the cursor pointing to the entry with the given creation time and identifier."""
+    return urlsafe_b64encode(f"{created_at.strftime(CURSOR_DATETIME_FORMAT)}|{entry_id}".encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Return the creation time and identifier of the entry a cursor points to.
+
+    Raises:
+        ValueError: The cursor is not valid.
+    """
+    try:
+        created_at, entry_id = urlsafe_b64decode(cursor.encode()).decode().split("|", 1)
+        return datetime.strptime(created_at, CURSOR_DATETIME_FORMAT), entry_id
+    except (TypeError, ValueError, UnicodeError) as err:
+        raise ValueError(f"The cursor '{cursor}' is not valid.") from err
+
+
+def check_limit(limit: Optional[int]) -> None:
+    """Check the requested number of entries per page.
+
+    Raises:
+        ValueError: The limit is not a positive integer.
+    """
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+        raise ValueError(f"The limit '{limit}' is not a positive integer.")
+
+
+def paginate(query: Query, created_at: Column, entry_id: Column, limit: Optional[int] = None,
+             cursor: Optional[str] = None) -> Tuple[List[Any], Optional[str]]:
+    """Return a page of entries of the query together with the cursor of the next page.
+
+    Args:
+        query: The query selecting all entries.
+        created_at: The creation time column of the entries.
+        entry_id: The identifier column of the entries.
+        limit: The maximum number of returned entries, all remaining entries if None.
+        cursor: The cursor returned with the previous page, starts at the first entry if None.
+
+    Returns:
+        The entries of the page and the cursor of the next page, None if this is the last page.
+
+    Raises:
+        ValueError: The limit or the cursor are not valid.
+    """
+    check_limit(limit)
+    if cursor:
+        query = query.filter(tuple_(created_at, entry_id) > decode_cursor(cursor))
+    query = query.order_by(created_at, entry_id)
+    if limit is None:
+        return query.all(), None
+
+    # Fetch a single additional entry to know whether there is a next page
+    entries = query.limit(limit + 1).all()
+    if len(entries) <= limit:
+        return entries, None
+    last = entries[limit - 1]
+    return entries[:limit], encode_cursor(getattr(last, created_at.key), getattr(last, entry_id.key))
+
+
+def get_next_links(endpoint: str, limit: Optional[int], next_cursor: Optional[str]) -> List[dict]:
+    """Return the openEO pagination links of a listing.
+
+    The link is relative to the API version root (e.g. 'jobs?limit=10&cursor=...') and resolved by the gateway.
+
+    Args:
+        endpoint: The endpoint of the listing, e.g. 'jobs'.
+        limit: The number of entries per page.
+        next_cursor: The cursor of the next page, no link is returned if None.
+    """
+    if next_cursor is None:
+        return []
+    return [{"rel": "next", "href": f"{endpoint}?{urlencode({'limit': limit, 'cursor': next_cursor})}"}]
@@ -0,0 +1,125 @@
+"""Provides bulk loading of predefined process specifications into the processes database.
+
+Process specifications are read from a local bundle - either a directory or a (compressed) tarball of the
+openeo-processes repository - so a deployment can be seeded without requesting each process from GitHub. Only
+processes which differ from the stored ones are replaced, all within a single transaction.
+"""
+
+import json
+import logging
+import tarfile
+from copy import deepcopy
+from os import listdir, path
+from pathlib import PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from .models import Base, ProcessDefinitionEnum, ProcessGraph
+from .schema import ProcessGraphPredefinedSchema
+
+LOGGER = logging.getLogger('standardlog')
+
+
+def load_process_specs(bundle_path: str, process_names: Optional[Iterable[str]] = None) -> Dict[str, dict]:
+    """Load process specifications from a directory or a tarball.
+
+    Only JSON files on the top level of the bundle are considered, in a tarball also the JSON files inside a single
+    top level folder (as in release archives). Files without an 'id' are skipped.
+
+    Args:
+        bundle_path: The path to a directory or a tarball (.tar, .tar.gz, .tgz, ...) of process specifications.
+        process_names: Only return the processes with these names, all if None.
+
+    Returns:
+        The process specifications by process name.
+    """
+    specs: Dict[str, dict] = {}
+    if path.isdir(bundle_path):
+        for filename in sorted(listdir(bundle_path)):
+            if filename.endswith(".json"):
+                with open(path.join(bundle_path, filename)) as spec_file:
+                    _add_spec(specs, json.load(spec_file))
+    else:
+        with tarfile.open(bundle_path) as bundle:
+            for member in bundle.getmembers():
+                if member.isfile() and member.name.endswith(".json") and len(PurePosixPath(member.name).parts) <= 2:
+                    spec_file = bundle.extractfile(member)
+                    if spec_file is not None:
+                        _add_spec(specs, json.load(spec_file))
+
+    if process_names is not None:
+        process_names = set(process_names)
+        missing = process_names - specs.keys()
+        if missing:
+            LOGGER.warning(f"Processes {sorted(missing)} are not part of the bundle {bundle_path}.")
+        specs = {name: spec for name, spec in specs.items() if name in process_names}
+    LOGGER.info(f"Loaded {len(specs)} process specifications from {bundle_path}.")
+    return specs
+
+
+def _add_spec(specs: Dict[str, dict], spec: dict) -> None:
+    """Add a process specification by its id if it has one."""
+    if isinstance(spec, dict) and isinstance(spec.get("id"), str):
+        specs[spec["id"]] = spec
+
+
+def _apply_column_defaults(obj: Base) -> None:
+    """Set the scalar column defaults of an unsaved object and all related objects like a flush would do."""
+    mapper = inspect(obj).mapper
+    for column_property in mapper.column_attrs:
+        column = column_property.columns[0]
+        if getattr(obj, column_property.key) is None and column.default is not None and column.default.is_scalar:
+            setattr(obj, column_property.key, column.default.arg)
+    for relationship_property in mapper.relationships:
+        related = getattr(obj, relationship_property.key)
+        if related is None:
+            continue
+        for related_obj in (related if relationship_property.uselist else [related]):
+            _apply_column_defaults(related_obj)
+
+
+def upsert_predefined(db: Session, process_specs: List[dict]) -> Tuple[List[str], List[str]]:
+    """Create or replace the given predefined processes if they differ from the stored ones.
+
+    The specifications are compared in their serialized form, so only actual changes cause a replacement. All changes
+    are committed in a single transaction.
+
+    Args:
+        db: The database session.
+        process_specs: The specifications of the predefined processes.
+
+    Returns:
+        The names of the created or replaced processes and the names of the unchanged processes.
+    """
+    stored = {process_graph.id_openeo: process_graph for process_graph in db.query(ProcessGraph)
+              .filter_by(process_definition=ProcessDefinitionEnum.predefined)
+              .filter(ProcessGraph.id_openeo.in_([spec["id"] for spec in process_specs])).all()}
+
+    changed: List[str] = []
+    unchanged: List[str] = []
+    for spec in process_specs:
+        # Loading modifies the given dictionary
+        spec = dict(deepcopy(spec), process_definition=ProcessDefinitionEnum.predefined)
+        process_graph = ProcessGraphPredefinedSchema().load(spec)
+        # Serialize the process as it would be stored
+        _apply_column_defaults(process_graph)
+        document = ProcessGraphPredefinedSchema().dump(process_graph)
+
+        existing = stored.get(spec["id"])
+        if existing is not None:
+            existing_document = existing.document or ProcessGraphPredefinedSchema().dump(existing)
+            if existing_document == document:
+                unchanged.append(spec["id"])
+                continue
+            db.delete(existing)
+            db.flush()
+
+        process_graph.document = document
+        db.add(process_graph)
+        changed.append(spec["id"])
+
+    db.commit()
+    LOGGER.info(f"Stored {len(changed)} changed pre-defined processes, {len(unchanged)} were unchanged.")
+    return changed, unchanged
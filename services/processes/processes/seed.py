@@ -0,0 +1,68 @@
+"""Command line interface to seed the processes database with predefined processes from a local bundle.
+
+The database connection is configured with the same environment variables as the service (OEO_DB_*). If OEO_RABBIT_HOST
+is set running processes services are notified about the changed processes.
+
+Example:
+    python -m processes.seed openeo-processes-1.0.0.tar.gz --only ../../supported_processes.json
+"""
+
+import argparse
+import json
+import logging
+from os import environ
+from typing import List, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from .process_specs import load_process_specs, upsert_predefined
+
+LOGGER = logging.getLogger('standardlog')
+
+
+def get_db_url() -> str:
+    """Return the url of the processes database configured in the environment."""
+    return f"postgresql://{environ.get('OEO_DB_USER')}:{environ.get('OEO_DB_PASSWORD')}" \
+           f"@{environ.get('OEO_DB_HOST')}:{environ.get('OEO_DB_PORT')}/{environ.get('OEO_DB_NAME')}"
+
+
+def notify_services(changed: List[str]) -> None:
+    """Dispatch the event invalidating the predefined processes of all running processes services."""
+    if not changed or not environ.get("OEO_RABBIT_HOST"):
+        return
+    from nameko.standalone.events import event_dispatcher
+    amqp_uri = f"pyamqp://{environ.get('OEO_RABBIT_USER')}:{environ.get('OEO_RABBIT_PASSWORD')}" \
+               f"@{environ.get('OEO_RABBIT_HOST')}:{environ.get('OEO_RABBIT_PORT')}"
+    dispatch = event_dispatcher({"AMQP_URI": amqp_uri})
+    dispatch("processes", "predefined_processes_changed", {"process_names": changed})
+
+
+def main(args: Optional[List[str]] = None) -> None:
+    """Load the process specifications of a bundle and store all changed ones in the database."""
+    parser = argparse.ArgumentParser(description="Seed the processes database with predefined processes.")
+    parser.add_argument("bundle", help="Directory or tarball holding one JSON specification per process.")
+    parser.add_argument("--only", help="JSON file listing the processes to add under 'processes' "
+                                       "(e.g. supported_processes.json), all processes of the bundle if not given.")
+    parser.add_argument("--db-url", default=None, help="Database url, by default built from the OEO_DB_* variables.")
+    parsed = parser.parse_args(args)
+    logging.basicConfig(level=logging.INFO)
+
+    process_names = None
+    if parsed.only:
+        with open(parsed.only) as only_file:
+            process_names = json.load(only_file)["processes"]
+    process_specs = load_process_specs(parsed.bundle, process_names)
+
+    session = sessionmaker(bind=create_engine(parsed.db_url or get_db_url()))()
+    try:
+        changed, unchanged = upsert_predefined(session, list(process_specs.values()))
+    finally:
+        session.close()
+    notify_services(changed)
+    LOGGER.info(f"Changed processes: {changed}")
+    LOGGER.info(f"{len(unchanged)} processes were unchanged.")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,17 +2,21 @@
 import json
 import logging
 from copy import deepcopy
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Union
 
 import requests
 from dynaconf import settings
 from jsonschema import ValidationError
+from nameko.events import BROADCAST, EventDispatcher, event_handler
 from nameko.rpc import RpcProxy, rpc
 from nameko_sqlalchemy import DatabaseSession
 from openeo_pg_parser.validate import validate_process_graph
 
+from .dependencies.catalogue import catalogue, validation_cache
 from .dependencies.settings import initialise_settings
-from .models import Base, ProcessDefinitionEnum, ProcessGraph
+from .models import Base, ProcessDefinitionEnum, ProcessGraph, get_eager_load_options
+from .pagination import get_next_links, paginate
+from .process_specs import upsert_predefined
 from .schema import ProcessGraphFullSchema, ProcessGraphPredefinedSchema, ProcessGraphShortSchema
 
 service_name = "processes"
@@ -70,6 +74,18 @@ class ProcessesService:
     """Database connection to processes database."""
     data_service = RpcProxy("data")
     """Rpc connection to data service."""
+    dispatch = EventDispatcher()
+    """Dispatcher of events to other processes service instances."""
+
+    @event_handler(service_name, "predefined_processes_changed", handler_type=BROADCAST, reliable_delivery=False)
+    def on_predefined_processes_changed(self, payload: Dict[str, Any]) -> None:
+        """Invalidate the predefined processes of the catalogue after any instance changed a predefined process."""
+        catalogue.invalidate_processes()
+
+    @event_handler("data", "collections_refreshed", handler_type=BROADCAST, reliable_delivery=False)
+    def on_collections_refreshed(self, payload: Dict[str, Any]) -> None:
+        """Invalidate the collections of the catalogue after the data service refreshed its cache."""
+        catalogue.invalidate_collections()
 
     @rpc
     def get_user_defined(self, user: Dict[str, Any], process_graph_id: str) -> dict:
@@ -141,15 +157,21 @@ class ProcessesService:
             user: The user object - not used, only given for consistency with all other methods.
         """
         try:
-            process_graphs = self.db.query(ProcessGraph) \
+            process_graphs = self.db.query(ProcessGraph.id, ProcessGraph.document) \
                 .filter_by(process_definition=ProcessDefinitionEnum.predefined) \
                 .order_by(ProcessGraph.created_at).all()
             LOGGER.debug(f"Found {len(process_graphs)} pre-defined processes.")
+
+            # Processes added before documents were stored
+            missing_ids = [process_graph.id for process_graph in process_graphs if process_graph.document is None]
+            documents = self._update_documents(missing_ids) if missing_ids else {}
+
             return {
                 "status": "success",
                 "code": 200,
                 "data": {
-                    "processes": ProcessGraphPredefinedSchema(many=True).dump(process_graphs),
+                    "processes": [process_graph.document or documents[process_graph.id]
+                                  for process_graph in process_graphs],
                     "links": []
                 }
             }
@@ -158,29 +180,38 @@ class ProcessesService:
             return ServiceException(ProcessesService.name, 500, self.get_user_id(user), str(exp)).to_dict()
 
     @rpc
-    def get_all_user_defined(self, user: Dict[str, Any]) -> dict:
+    def get_all_user_defined(self, user: Dict[str, Any], limit: int = None, cursor: str = None) -> dict:
         """Return all available process graphs for the given user.
 
+        If a limit is given only one page of process graphs is returned together with a link to the next page.
+
         Args:
             user: The user object.
+            limit: The maximum number of process graphs to return (optional).
+            cursor: The cursor to the next page as returned in the 'next' link of the previous page (optional).
         """
         try:
-            process_graphs = self.db.query(ProcessGraph) \
+            query = self.db.query(ProcessGraph) \
                 .filter_by(process_definition=ProcessDefinitionEnum.user_defined) \
-                .filter_by(user_id=user["id"]) \
-                .order_by(ProcessGraph.created_at).all()
+                .filter_by(user_id=user["id"])
+            try:
+                process_graphs, next_cursor = paginate(query, ProcessGraph.created_at, ProcessGraph.id,
+                                                       limit=limit, cursor=cursor)
+            except ValueError as exp:
+                return ServiceException(ProcessesService.name, 400, user["id"], str(exp), internal=False,
+                                        links=["#tag/User-Defined-Processes/paths/~1process_graphs/get"]).to_dict()
             LOGGER.info(f"Found {len(process_graphs)} ProcessGraphs for User {user['id']}.")
             return {
                 "status": "success",
                 "code": 200,
                 "data": {
                     "processes": ProcessGraphShortSchema(many=True).dump(process_graphs),
-                    "links": [],
+                    "links": get_next_links("process_graphs", limit, next_cursor),
                 }
             }
         except Exception as exp:
             return ServiceException(ProcessesService.name, 500, user["id"], str(exp),
-                                    links=["#tag/Job-Management/paths/~1process_graphs/get"]).to_dict()
+                                    links=["#tag/User-Defined-Processes/paths/~1process_graphs/get"]).to_dict()
 
     @rpc
     def put_predefined(self, process_name: str, user: Dict[str, Any] = None) -> dict:
@@ -208,8 +239,12 @@ class ProcessesService:
             process_graph_json['process_definition'] = ProcessDefinitionEnum.predefined
             process_graph = ProcessGraphPredefinedSchema().load(process_graph_json)
             self.db.add(process_graph)
+            self.db.flush()
+            process_graph.document = ProcessGraphPredefinedSchema().dump(process_graph)
             self.db.commit()
             LOGGER.info(f"Pre-defined Process {process_name} successfully created.")
+            catalogue.invalidate_processes()
+            self.dispatch("predefined_processes_changed", {"process_name": process_name})
 
             return {
                 "status": "success",
@@ -221,6 +256,31 @@ class ProcessesService:
         except Exception as exp:
             return ServiceException(ProcessesService.name, 500, self.get_user_id(user), str(exp)).to_dict()
 
+    @rpc
+    def put_predefined_many(self, process_specs: List[dict], user: Dict[str, Any] = None) -> dict:
+        """Create or replace multiple predefined processes from their specifications in a single transaction.
+
+        Processes which did not change are not touched, see :func:`~processes.process_specs.upsert_predefined`.
+
+        Args:
+            process_specs: The specifications of the predefined processes, e.g. loaded from a local bundle.
+            user: The user object - not used, only given for consistency with all other methods.
+        """
+        try:
+            changed, unchanged = upsert_predefined(self.db, process_specs)
+            if changed:
+                catalogue.invalidate_processes()
+                self.dispatch("predefined_processes_changed", {"process_names": changed})
+
+            return {
+                "status": "success",
+                "code": 201 if changed else 200,
+                "headers": {"Location": "/processes"},
+                "service_data": {"changed": changed, "unchanged": unchanged},
+            }
+        except Exception as exp:
+            return ServiceException(ProcessesService.name, 500, self.get_user_id(user), str(exp)).to_dict()
+
     @rpc
     def put_user_defined(self, user: Dict[str, Any], process_graph_id: str, **process_graph_args: Any) -> dict:
         """Create a new user-defined process graph using the description send in the request body.
@@ -278,25 +338,27 @@ class ProcessesService:
         """
         # TODO: RESPONSE HEADERS -> OpenEO-Costs
         try:
-            # Get all processes
-            process_response = self.get_all_predefined()
-            if process_response["status"] == "error":
-                return process_response
-            processes = process_response["data"]["processes"]
+            # Identical processes validated against the same catalogue state have the same result
+            cache_key = validation_cache.get_key(process, catalogue)
+            output_errors = validation_cache.get(cache_key)
+            if output_errors is not None:
+                return {
+                    "status": "success",
+                    "code": 200,
+                    "data": {
+                        'errors': output_errors
+                    }
+                }
 
-            # Get all collections (full metadata)
-            data_response = self.data_service.get_all_products()
-            if data_response["status"] == "error":
-                return data_response
-            collections_full_md = []
-            for col in data_response["data"]["collections"]:
-                data_response = self.data_service.get_product_detail(collection_id=col['id'])
-                if data_response["status"] == "error":
-                    return data_response
-                collections_full_md.append(data_response['data'])
+            processes = self._get_catalogue_processes()
+            if isinstance(processes, dict):
+                return processes
+            collections_full_md = self._get_catalogue_collections(process)
+            if isinstance(collections_full_md, dict):
+                return collections_full_md
             try:
                 _ = validate_process_graph(process, processes_src=processes, collections_src=collections_full_md)
-                output_errors: list = []
+                output_errors = []
             except ValidationError as exp:
                 output_errors = [
                     {
@@ -304,6 +366,7 @@ class ProcessesService:
                         'message': str(exp)
                     }
                 ]
+            validation_cache.set(cache_key, output_errors)
 
             return {
                 "status": "success",
@@ -318,6 +381,94 @@ class ProcessesService:
         except Exception as exp:
             return ServiceException(ProcessesService.name, 500, user["id"], str(exp)).to_dict()
 
+    @rpc
+    def get_validation_cache_status(self, user: Dict[str, Any] = None) -> dict:
+        """Return the hit and miss counters and the size of the validation result cache.
+
+        Args:
+            user: The user object - not used, only given for consistency with all other methods.
+        """
+        return {
+            "status": "success",
+            "code": 200,
+            "data": validation_cache.stats(),
+        }
+
+    def _update_documents(self, process_graph_ids: List[str]) -> Dict[str, dict]:
+        """Serialize and store the documents of the given predefined processes.
+
+        All related entities are loaded up front with a constant number of queries.
+
+        Args:
+            process_graph_ids: The internal identifiers of the process graphs.
+
+        Returns:
+            The documents by internal process graph identifier.
+        """
+        process_graphs = self.db.query(ProcessGraph) \
+            .options(*get_eager_load_options()) \
+            .filter(ProcessGraph.id.in_(process_graph_ids)).all()
+        documents = {}
+        for process_graph in process_graphs:
+            process_graph.document = ProcessGraphPredefinedSchema().dump(process_graph)
+            documents[process_graph.id] = process_graph.document
+        self.db.commit()
+        LOGGER.info(f"Stored documents of {len(documents)} pre-defined processes.")
+        return documents
+
+    def _get_catalogue_processes(self) -> Union[List[dict], dict]:
+        """Return all predefined processes from the catalogue, they are loaded if the catalogue is outdated.
+
+        Returns:
+            The predefined processes or the error response if they could not be loaded.
+        """
+        processes = catalogue.get_processes()
+        if processes is None:
+            version = catalogue.processes_version
+            process_response = self.get_all_predefined()
+            if process_response["status"] == "error":
+                return process_response
+            processes = process_response["data"]["processes"]
+            catalogue.set_processes(processes, version)
+        return processes
+
+    def _get_catalogue_collections(self, process: Dict[str, Any]) -> Union[List[dict], dict]:
+        """Return the full metadata of all collections loaded in a process, missing ones are requested at once.
+
+        Returns:
+            The metadata of the collections or the error response of the data service.
+        """
+        collection_ids = self._get_collection_ids(process.get("process_graph", {}))
+        collections_full_md, missing_ids = catalogue.get_collections(collection_ids)
+        if missing_ids:
+            version = catalogue.collections_version
+            data_response = self.data_service.get_products_detail(collection_ids=missing_ids)
+            if data_response["status"] == "error":
+                return data_response
+            collections_full_md.extend(data_response["data"]["collections"])
+            catalogue.set_collections(missing_ids, data_response["data"]["collections"], version)
+        return collections_full_md
+
+    def _get_collection_ids(self, process_graph: Dict[str, Any]) -> List[str]:
+        """Return the sorted identifiers of all collections loaded in a process graph, including nested graphs.
+
+        Args:
+            process_graph: The process graph given as dictionary of nodes.
+        """
+        collection_ids = set()
+        nodes = list(process_graph.values()) if isinstance(process_graph, dict) else []
+        while nodes:
+            node = nodes.pop()
+            if not isinstance(node, dict):
+                continue
+            if node.get("process_id") == "load_collection" and isinstance(node.get("arguments", {}).get("id"), str):
+                collection_ids.add(node["arguments"]["id"])
+            # Callbacks hold their own process graph as argument
+            for argument in node.get("arguments", {}).values():
+                if isinstance(argument, dict) and isinstance(argument.get("process_graph"), dict):
+                    nodes.extend(argument["process_graph"].values())
+        return sorted(collection_ids)
+
     def _exist_and_authorize(self, user_id: str, process_graph_id: str, process_graph: ProcessGraph) \
             -> Optional[ServiceException]:
         """Return Exception if given ProcessGraph does not exist or User is not allowed to access this ProcessGraph.
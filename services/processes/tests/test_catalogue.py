@@ -0,0 +1,59 @@
+"""Unittests for the catalogue of predefined processes and collections used for validation."""
+
+from processes.dependencies.catalogue import Catalogue, ValidationCache
+
+
+def test_processes_invalidated() -> None:
+    """Test processes are stored until invalidated and processes loaded before an invalidation are dropped."""
+    catalogue = Catalogue()
+    assert catalogue.get_processes() is None
+
+    catalogue.set_processes([{"id": "absolute"}], catalogue.processes_version)
+    assert catalogue.get_processes() == [{"id": "absolute"}]
+
+    version = catalogue.processes_version
+    catalogue.invalidate_processes()
+    catalogue.set_processes([{"id": "absolute"}], version)
+    assert catalogue.get_processes() is None
+
+
+def test_collections_missing() -> None:
+    """Test only collections not stored yet are reported as missing, including not existing ones."""
+    catalogue = Catalogue()
+    assert catalogue.get_collections(["s2a_prd_msil1c", "unknown"]) == ([], ["s2a_prd_msil1c", "unknown"])
+
+    catalogue.set_collections(["s2a_prd_msil1c", "unknown"], [{"id": "s2a_prd_msil1c"}],
+                              catalogue.collections_version)
+    assert catalogue.get_collections(["s2a_prd_msil1c", "unknown", "s2b_prd_msil1c"]) == (
+        [{"id": "s2a_prd_msil1c"}], ["s2b_prd_msil1c"]
+    )
+
+    catalogue.invalidate_collections()
+    assert catalogue.get_collections(["s2a_prd_msil1c"]) == ([], ["s2a_prd_msil1c"])
+
+
+def test_validation_cache() -> None:
+    """Test validation results are keyed by the canonical process and the catalogue versions."""
+    catalogue = Catalogue()
+    cache = ValidationCache(maxsize=2)
+    process = {"process_graph": {"abs": {"process_id": "absolute", "arguments": {"x": -1}, "result": True}}}
+    key = cache.get_key(process, catalogue)
+
+    assert cache.get(key) is None
+    cache.set(key, [])
+    assert cache.get(key) == []
+    # Same process with a different key order
+    assert cache.get_key({"process_graph": {"abs": {"result": True, "arguments": {"x": -1},
+                                                    "process_id": "absolute"}}}, catalogue) == key
+
+    catalogue.invalidate_collections()
+    assert cache.get_key(process, catalogue) != key
+
+    cache.set("key_2", [])
+    cache.set("key_3", [{"code": 400, "message": "Invalid"}])
+    assert cache.get(key) is None
+    assert cache.stats() == {"hits": 1, "misses": 2, "size": 2, "maxsize": 2}
+
+    # Changing a returned result does not change the stored one
+    cache.get("key_3")[0]["message"] = "Changed"
+    assert cache.get("key_3") == [{"code": 400, "message": "Invalid"}]
@@ -1,13 +1,16 @@
 """Unittests for processes service api functions."""
 import json
 import os
-from typing import Any, Dict
+from typing import Any, Dict, List
+from urllib.parse import parse_qs, urlparse
 
 import pytest
 from nameko.testing.services import worker_factory
+from sqlalchemy import event
 from sqlalchemy.orm import Session
 
 from processes.models import ProcessGraph
+from processes.process_specs import load_process_specs
 from processes.service import ProcessesService
 
 
@@ -59,6 +62,30 @@ def test_put_pre_defined(db_session: Session, process: str) -> None:
     assert db_session.query(ProcessGraph).filter(ProcessGraph.id_openeo == process).count() == 1
 
 
+def test_put_predefined_many(db_session: Session) -> None:
+    """Test predefined processes are loaded from a local bundle and only changed processes are replaced."""
+    processes_service = mock_processes_service(db_session)
+    bundle_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data", "process_bundle")
+    process_specs = list(load_process_specs(bundle_path).values())
+
+    result = processes_service.put_predefined_many(process_specs=process_specs)
+    assert result["code"] == 201
+    assert result["service_data"] == {"changed": ["absolute"], "unchanged": []}
+    process_id = db_session.query(ProcessGraph).filter(ProcessGraph.id_openeo == "absolute").one().id
+
+    result = processes_service.put_predefined_many(process_specs=process_specs)
+    assert result["code"] == 200
+    assert result["service_data"] == {"changed": [], "unchanged": ["absolute"]}
+    assert db_session.query(ProcessGraph).filter(ProcessGraph.id_openeo == "absolute").one().id == process_id
+
+    process_specs[0]["summary"] = "A new summary"
+    result = processes_service.put_predefined_many(process_specs=process_specs)
+    assert result["service_data"] == {"changed": ["absolute"], "unchanged": []}
+    process_graph = db_session.query(ProcessGraph).filter(ProcessGraph.id_openeo == "absolute").one()
+    assert process_graph.summary == "A new summary"
+    assert process_graph.document["summary"] == "A new summary"
+
+
 def test_get_all_predefined(db_session: Session) -> None:
     """Test predefined processes are returned properly."""
     processes_service = mock_processes_service(db_session, add_processes=True)
@@ -68,10 +95,34 @@ def test_get_all_predefined(db_session: Session) -> None:
     assert result == ref_output
 
 
+def test_get_all_predefined_query_count(db_session: Session) -> None:
+    """Test predefined processes are listed with a constant number of queries."""
+    processes_service = mock_processes_service(db_session, add_processes=True)
+    ref_output = load_json("r_get_all_predefined.json")
+    statements: List[str] = []
+
+    def count_statement(conn: Any, cursor: Any, statement: str, *args: Any) -> None:
+        statements.append(statement)
+    event.listen(db_session.get_bind(), "before_cursor_execute", count_statement)
+    try:
+        assert processes_service.get_all_predefined() == ref_output
+        assert len(statements) == 1
+
+        # Documents of processes stored before documents existed are created with eager loading
+        db_session.query(ProcessGraph).update({ProcessGraph.document: None})
+        db_session.commit()
+        db_session.expire_all()
+        statements.clear()
+        assert processes_service.get_all_predefined() == ref_output
+        assert len(statements) < 30
+    finally:
+        event.remove(db_session.get_bind(), "before_cursor_execute", count_statement)
+
+
 def test_get_all_user_defined(db_session: Session, user: Dict[str, Any]) -> None:
     """Add and return a user_defined processes and check they are formatted correctly."""
     processes_service = mock_processes_service(db_session, add_processes=True)
-    processes_service.data_service.get_all_products.return_value = load_json("collections.json")
+    processes_service.data_service.get_products_detail.return_value = load_json("collections.json")
 
     pg = load_json("process_graph.json")
     processes_service.put_user_defined(user=user, process_graph_id="test_pg_1", **pg)
@@ -83,6 +134,29 @@ def test_get_all_user_defined(db_session: Session, user: Dict[str, Any]) -> None
     assert result == ref_output
 
 
+def test_get_all_user_defined_pages(db_session: Session, user: Dict[str, Any]) -> None:
+    """Return user_defined processes page by page following the next links."""
+    processes_service = mock_processes_service(db_session)
+    processes_service.data_service.get_products_detail.return_value = load_json("collections.json")
+
+    pg = load_json("process_graph.json")
+    for process_graph_id in ["test_pg_1", "test_pg_2", "test_pg_3"]:
+        processes_service.put_user_defined(user=user, process_graph_id=process_graph_id, **pg)
+
+    result = processes_service.get_all_user_defined(user=user, limit=2)
+    assert [process["id"] for process in result["data"]["processes"]] == ["test_pg_1", "test_pg_2"]
+    next_link = result["data"]["links"][0]
+    assert next_link["rel"] == "next"
+    cursor = parse_qs(urlparse(next_link["href"]).query)["cursor"][0]
+
+    result = processes_service.get_all_user_defined(user=user, limit=2, cursor=cursor)
+    assert [process["id"] for process in result["data"]["processes"]] == ["test_pg_3"]
+    assert result["data"]["links"] == []
+
+    result = processes_service.get_all_user_defined(user=user, limit=0)
+    assert result["code"] == 400
+
+
 def test_put_get_user_defined(db_session: Session, user: Dict[str, Any]) -> None:
     """More extensive test for putting and getting a user_defined process.
 
@@ -91,7 +165,7 @@ def test_put_get_user_defined(db_session: Session, user: Dict[str, Any]) -> None
     """
     processes_service = mock_processes_service(db_session, add_processes=True)
 
-    processes_service.data_service.get_all_products.return_value = load_json("collections.json")
+    processes_service.data_service.get_products_detail.return_value = load_json("collections.json")
     pg = load_json("process_graph.json")
     result = processes_service.put_user_defined(user=user, process_graph_id="test_pg", **pg)
     assert result["status"] == "success"
@@ -150,7 +224,7 @@ def test_delete(db_session: Session, user: Dict[str, Any]) -> None:
     """Test the delete process graph method."""
     processes_service = mock_processes_service(db_session, add_processes=True)
 
-    processes_service.data_service.get_all_products.return_value = load_json("collections.json")
+    processes_service.data_service.get_products_detail.return_value = load_json("collections.json")
 
     pg = load_json("process_graph.json")
     processes_service.put_user_defined(user=user, process_graph_id="test_pg", **pg)
@@ -172,3 +246,21 @@ def test_delete_non_existing(db_session: Session, user: Dict[str, Any]) -> None:
     ref_output = load_json("r_delete_non_existing.json")
     ref_output["user_id"] = user["id"]
     assert result == ref_output
+
+
+def test_get_collection_ids() -> None:
+    """Test only the collections loaded in a process graph (including callbacks) are requested for validation."""
+    processes_service = worker_factory(ProcessesService)
+    process_graph = {
+        "load_s2": {"process_id": "load_collection", "arguments": {"id": "s2a_prd_msil1c"}},
+        "reduce": {
+            "process_id": "reduce_dimension",
+            "arguments": {
+                "data": {"from_node": "load_s2"},
+                "reducer": {"process_graph": {
+                    "load_s1": {"process_id": "load_collection", "arguments": {"id": "s1a_csar_grdh_iw"}},
+                }},
+            },
+        },
+    }
+    assert processes_service._get_collection_ids(process_graph) == ["s1a_csar_grdh_iw", "s2a_prd_msil1c"]